@@ -0,0 +1,85 @@
+from collections import namedtuple
+
+# One row per (week, date, exercise type) of a program: the sets' tonnage (weight x reps, summed), their heaviest
+# weight and their best estimated one-rep max, for all of the sets and for the completed ones only. Values are None
+# when there are no such sets.
+SummaryRow = namedtuple("SummaryRow", [
+    "week", "date", "type",
+    "tonnage", "completed_tonnage",
+    "top_weight", "completed_top_weight",
+    "e1rm", "completed_e1rm"
+])
+
+
+def estimated_one_rep_max(weight, reps):
+    # Epley's formula; sets of 0 reps don't estimate anything
+    return weight * (30 + reps) / 30 if reps > 0 else None
+
+
+def greater(first, second):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return max(first, second)
+
+
+def generated_summary_rows(program, skip_weeks):
+    # Summary rows of a Brain program (see brain.DummyProgram), leaving out the weeks in skip_weeks. Reads the
+    # program's columns directly; generated sets are never completed.
+    rows = {}
+    for workout_index in range(program.workout_count):
+        week = program.workout_weeks[workout_index]
+        if week in skip_weeks:
+            continue
+        workout_date = program.workout_date(workout_index)
+        for exercise_index in program.exercise_range(workout_index):
+            key = (week, workout_date, program.exercise_types[exercise_index])
+            tonnage, top_weight, e1rm = rows.get(key, (0, None, None))
+            for set_index in program.set_range(exercise_index):
+                weight, reps = program.set_weights[set_index], program.set_reps[set_index]
+                tonnage += weight * reps
+                top_weight = greater(top_weight, weight)
+                e1rm = greater(e1rm, estimated_one_rep_max(weight, reps))
+            rows[key] = (tonnage, top_weight, e1rm)
+    return [
+        SummaryRow(week, workout_date, exercise_type, tonnage, 0, top_weight, None, e1rm, None)
+        for (week, workout_date, exercise_type), (tonnage, top_weight, e1rm) in rows.items()
+    ]
+
+
+def progression_data(rows, exercise=None):
+    # {exercise type: [one point per session, in date order]} for charting weight progression and estimated 1RM
+    points = {}
+    for row in sorted(rows, key=lambda row: (row.date, row.week, row.type)):
+        if exercise is not None and row.type != exercise:
+            continue
+        points.setdefault(row.type, []).append({
+            "date": row.date.isoformat(),
+            "week": row.week,
+            "top_weight": row.top_weight,
+            "completed_top_weight": row.completed_top_weight,
+            "e1rm": round_or_none(row.e1rm),
+            "completed_e1rm": round_or_none(row.completed_e1rm)
+        })
+    return points
+
+
+def tonnage_data(rows, exercise=None):
+    # {exercise type: [one point per week, in week order]} for charting weekly tonnage
+    weeks = {}
+    for row in rows:
+        if exercise is not None and row.type != exercise:
+            continue
+        tonnage, completed_tonnage = weeks.get((row.type, row.week), (0, 0))
+        weeks[(row.type, row.week)] = (tonnage + (row.tonnage or 0), completed_tonnage + (row.completed_tonnage or 0))
+    points = {}
+    for (exercise_type, week), (tonnage, completed_tonnage) in sorted(weeks.items()):
+        points.setdefault(exercise_type, []).append(
+            {"week": week, "tonnage": tonnage, "completed_tonnage": completed_tonnage}
+        )
+    return points
+
+
+def round_or_none(value):
+    return None if value is None else round(value, 1)
@@ -0,0 +1,86 @@
+from flask import Response, jsonify, request
+from importer import INTEGER_BOUNDS
+
+# Part of every ETag, so changing what the API returns retires the tags clients already hold
+API_FORMAT = 4
+
+
+def conditional_json(tag, build):
+    # Answers 304 without calling build() if the client already has this version; otherwise returns build()'s data as
+    # JSON with a strong ETag. Clients must revalidate before reusing a response.
+    etag = f"{API_FORMAT}-{tag}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# Work for models and for the generated workouts of lazy programs (brain.WorkoutView and friends). Exercise.sets
+# fills in the sets that have no row from the exercise's prescription.
+
+
+def set_data(set):
+    return {"order": set.order, "reps": set.reps, "weight": set.weight, "completed": set.completed}
+
+
+def exercise_data(exercise):
+    return {"id": exercise.id, "type": exercise.type, "sets": [set_data(set) for set in exercise.sets]}
+
+
+def workout_data(workout, workout_id=None, session=None):
+    return {
+        "id": workout_id,
+        "session": session,
+        "name": workout.name,
+        "week": workout.week,
+        "date": workout.date.isoformat(),
+        "exercises": [exercise_data(exercise) for exercise in workout.exercises]
+    }
+
+
+# Most sets a single request can log
+MAX_SET_UPDATES = 500
+
+# Bounds of the numbers a set update can carry, as in imports
+SET_UPDATE_BOUNDS = {
+    "exercise_id": (1, 2 ** 31 - 1),
+    "order": INTEGER_BOUNDS["set"],
+    "weight": INTEGER_BOUNDS["weight"],
+    "reps": INTEGER_BOUNDS["reps"],
+}
+
+
+def parse_number(entry, field, position):
+    value = entry.get(field)
+    # bool is an int in Python, but not a number here
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"sets[{position}].{field} must be a whole number")
+    low, high = SET_UPDATE_BOUNDS[field]
+    if not low <= value <= high:
+        raise ValueError(f"sets[{position}].{field} must be between {low} and {high}")
+    return value
+
+
+def parse_set_updates(payload):
+    # {"sets": [{"exercise_id", "order", "completed", and optionally "weight" and "reps"}, ...]} ->
+    # {(exercise id, set order): (completed, weight or None, reps or None)}. Later entries for the same set win.
+    if not isinstance(payload, dict) or not isinstance(payload.get("sets"), list):
+        raise ValueError('Send a JSON object with a "sets" list')
+    if len(payload["sets"]) > MAX_SET_UPDATES:
+        raise ValueError(f"Send at most {MAX_SET_UPDATES} sets at a time")
+    set_updates = {}
+    for position, entry in enumerate(payload["sets"]):
+        if not isinstance(entry, dict):
+            raise ValueError(f"sets[{position}] must be an object")
+        if not isinstance(entry.get("completed"), bool):
+            raise ValueError(f"sets[{position}].completed must be true or false")
+        key = (parse_number(entry, "exercise_id", position), parse_number(entry, "order", position))
+        set_updates[key] = (
+            entry["completed"],
+            parse_number(entry, "weight", position) if entry.get("weight") is not None else None,
+            parse_number(entry, "reps", position) if entry.get("reps") is not None else None
+        )
+    return set_updates
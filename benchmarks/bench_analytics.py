@@ -0,0 +1,95 @@
+"""Time a program's analytics three ways: walking its ORM objects in Python, the grouped SQL query, and the stored
+summary rows (ANALYTICS_SUMMARY).
+
+"ORM walk" loads every workout, exercise and set row and folds them in Python, as a chart view written against the
+models would. "SQL" is compute_summary_rows. "Summary" reads the exerciseSummaries rows, which are only recomputed
+after the program changes. A tenth of the sets are logged as completed so the set rows are not all implicit.
+
+Usage: python benchmarks/bench_analytics.py [--database-url postgresql://...] [--repeat 10]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy.orm import selectinload
+
+from common import load_app, make_user, make_program_template, make_program, QueryCounter
+from analytics import SummaryRow, estimated_one_rep_max, greater
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (4, 3, 3, 3),
+    (52, 6, 6, 5),
+]
+
+
+def orm_summary_rows(main, program):
+    rows = {}
+    workouts = main.Workout.query.filter_by(program_id=program.id).options(
+        selectinload(main.Workout.exercises).selectinload(main.Exercise.set_rows)).all()
+    for workout in workouts:
+        for exercise in workout.exercises:
+            key = (workout.week, workout.date, exercise.type)
+            tonnage, completed_tonnage, top_weight, completed_top_weight, e1rm, completed_e1rm = rows.get(
+                key, (0, 0, None, None, None, None))
+            for set in exercise.sets:
+                tonnage += set.weight * set.reps
+                top_weight = greater(top_weight, set.weight)
+                e1rm = greater(e1rm, estimated_one_rep_max(set.weight, set.reps))
+                if set.completed:
+                    completed_tonnage += set.weight * set.reps
+                    completed_top_weight = greater(completed_top_weight, set.weight)
+                    completed_e1rm = greater(completed_e1rm, estimated_one_rep_max(set.weight, set.reps))
+            rows[key] = (tonnage, completed_tonnage, top_weight, completed_top_weight, e1rm, completed_e1rm)
+    return [SummaryRow(*key, *values) for key, values in rows.items()]
+
+
+def complete_some_sets(main, program_id):
+    exercises = main.Exercise.query.join(main.Workout).filter(main.Workout.program_id == program_id).all()
+    for exercise in exercises[::10]:
+        main.db.session.add(main.Set(order=1, weight=exercise.weight, reps=exercise.reps, completed=True,
+                                     parent_exercise=exercise))
+    main.db.session.commit()
+
+
+def measure(main, function, program_id, repeat):
+    timings = []
+    for _ in range(repeat):
+        program = main.Program.query.get(program_id)
+        started = time.perf_counter()
+        with QueryCounter(main.db.engine) as counter:
+            rows = function(program)
+        timings.append((time.perf_counter() - started) * 1000)
+        main.db.session.remove()
+    return statistics.median(timings), counter.count, rows
+
+
+def run(main, repeat):
+    user = make_user(main)
+    print(f"{'size':>14} {'sets':>7} {'ORM walk ms':>11} {'SQL ms':>8} {'summary ms':>10} {'queries':>15}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        program_id = make_program(main, user, program_template, weeks).id
+        complete_some_sets(main, program_id)
+        orm_ms, orm_queries, orm_rows = measure(main, lambda program: orm_summary_rows(main, program), program_id, repeat)
+        sql_ms, sql_queries, sql_rows = measure(main, main.compute_summary_rows, program_id, repeat)
+        main.app.config["ANALYTICS_SUMMARY"] = True
+        # The first read stores the summary; the timed ones only read it
+        main.program_summary_rows(main.Program.query.get(program_id))
+        main.db.session.remove()
+        summary_ms, summary_queries, summary_rows = measure(main, main.program_summary_rows, program_id, repeat)
+        main.app.config["ANALYTICS_SUMMARY"] = False
+        assert sorted(orm_rows) == sorted(sql_rows) == sorted(summary_rows)
+        set_count = weeks * days * exercises_per_workout * sets
+        print(f"{f'{weeks}x{days}x{exercises_per_workout}x{sets}':>14} {set_count:>7} {orm_ms:>11.1f} {sql_ms:>8.1f} "
+              f"{summary_ms:>10.1f} {f'{orm_queries} / {sql_queries} / {summary_queries}':>15}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=10)
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.repeat)
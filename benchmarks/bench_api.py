@@ -0,0 +1,66 @@
+"""Time the JSON API with and without a matching If-None-Match: latency, queries and bytes per request.
+
+A revalidated request only authenticates and checks ownership before answering 304, so its cost should not grow with
+the size of the week, workout or template.
+
+Usage: python benchmarks/bench_api.py [--database-url postgresql://...] [--repeat 50]
+"""
+import argparse
+import statistics
+import time
+
+from common import load_app, make_user, make_program_template, make_program, logged_in_client, QueryCounter
+
+SIZES = [
+    # days per week, exercises per workout, sets per exercise
+    (3, 3, 3),
+    (6, 6, 5),
+]
+
+
+def measure(main, client, url, repeat, headers=None):
+    # Returns the median milliseconds, the queries and the bytes of one request
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with QueryCounter(main.db.engine) as counter:
+            response = client.get(url, headers=headers)
+            body = response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+        main.db.session.remove()
+    return statistics.median(timings), len(counter.executions), len(body), response
+
+
+def run(main, repeat):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'size':>7} {'endpoint':<18} {'200 ms':>7} {'queries':>7} {'bytes':>7} {'304 ms':>7} {'queries':>7}")
+    for days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        program_template_id = program_template.id
+        program_id = make_program(main, user, program_template, 4).id
+        workout_id = main.Workout.query.filter_by(program_id=program_id, week=2).first().id
+        main.db.session.remove()
+        endpoints = [
+            ("week", f"/api/programs/{program_id}/weeks/2"),
+            ("workout", f"/api/workouts/{workout_id}"),
+            ("program template", f"/api/program-templates/{program_template_id}"),
+        ]
+        for name, url in endpoints:
+            full_ms, full_queries, full_bytes, response = measure(main, client, url, repeat)
+            assert response.status_code == 200, (url, response.status_code)
+            etag = response.headers["ETag"]
+            cached_ms, cached_queries, _, response = measure(main, client, url, repeat, {"If-None-Match": etag})
+            assert response.status_code == 304, (url, response.status_code)
+            print(f"{days}x{exercises_per_workout}x{sets:<3} {name:<18} {full_ms:>7.2f} {full_queries:>7} {full_bytes:>7} "
+                  f"{cached_ms:>7.2f} {cached_queries:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=50)
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.repeat)
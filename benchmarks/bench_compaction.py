@@ -0,0 +1,60 @@
+"""Compare the old per-week renumbering loop show_program ran on GET with main.compact_program_weeks.
+
+Each run builds a program, empties week 2 and times closing the gap.
+
+Usage: python benchmarks/bench_compaction.py [--database-url postgresql://...]
+"""
+import argparse
+
+from common import load_app, make_user, make_program_template, make_program, QueryCounter, timed
+
+WEEKS = [26, 104, 208, 520]
+
+
+def legacy_compact(main, program):
+    # The loop show_program used to run when a requested week had no workouts
+    Workout = main.Workout
+    first_week = Workout.query.filter_by(parent_program=program).order_by(Workout.date).first().week
+    last_week = Workout.query.filter_by(parent_program=program).order_by(Workout.date.desc()).first().week
+    current_week = first_week
+    week_update = 1
+    while current_week <= last_week:
+        workouts_in_week = Workout.query.filter_by(parent_program=program, week=current_week).all()
+        if workouts_in_week:
+            for workout in workouts_in_week:
+                setattr(workout, "week", week_update)
+            week_update += 1
+        current_week += 1
+    setattr(program, "weeks", current_week - 1)
+    main.db.session.commit()
+
+
+def batched_compact(main, program):
+    main.compact_program_weeks(program.id)
+    main.db.session.commit()
+
+
+def run(main):
+    user = make_user(main)
+    program_template = make_program_template(main, user, 3, 4, 4)
+    print(f"{'weeks':>5} {'legacy (s)':>11} {'queries':>7} {'batched (s)':>12} {'queries':>7}")
+    for weeks in WEEKS:
+        results = []
+        for compact in (legacy_compact, batched_compact):
+            program = make_program(main, user, program_template, weeks)
+            main.delete_workouts(main.Workout.program_id == program.id, main.Workout.week == 2)
+            main.db.session.commit()
+            with QueryCounter(main.db.engine) as counter:
+                elapsed, _ = timed(compact, main, program)
+            results += [elapsed, counter.count]
+            assert main.db.session.query(main.func.max(main.Workout.week)).filter(main.Workout.program_id == program.id).scalar() == weeks - 1
+        print(f"{weeks:>5} {results[0]:>11.3f} {results[1]:>7} {results[2]:>12.3f} {results[3]:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main)
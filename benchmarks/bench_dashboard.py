@@ -0,0 +1,54 @@
+"""Time the dashboard's first and last pages for users with more and more programs.
+
+Each page lists at most DASHBOARD_PAGE_SIZE templates and programs and summarizes the programs with one grouped query,
+so its latency and query count should stay flat as a user's programs pile up, wherever the page is.
+
+Usage: python benchmarks/bench_dashboard.py [--database-url postgresql://...] [--repeat 20]
+"""
+import argparse
+import statistics
+import time
+
+from common import load_app, make_user, make_program_template, make_program, logged_in_client, QueryCounter
+
+PROGRAM_COUNTS = [10, 100, 500]
+
+
+def measure(main, client, url, repeat):
+    # Returns the median milliseconds and the queries of one request
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with QueryCounter(main.db.engine) as counter:
+            response = client.get(url)
+            response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+        main.db.session.remove()
+    assert response.status_code == 200, (url, response.status_code)
+    return statistics.median(timings), len(counter.executions)
+
+
+def run(main, repeat):
+    print(f"{'programs':>8} {'first ms':>8} {'queries':>7} {'last ms':>8} {'queries':>7}")
+    for program_count in PROGRAM_COUNTS:
+        user = make_user(main, f"dashboard{program_count}")
+        client = logged_in_client(main, user)
+        program_template = make_program_template(main, user, 3, 3, 3)
+        program_ids = [make_program(main, user, program_template, 4).id for _ in range(program_count)]
+        main.db.session.remove()
+        # The last page starts after the last full page's final program
+        last_page_after = program_ids[(len(program_ids) - 1) // main.DASHBOARD_PAGE_SIZE * main.DASHBOARD_PAGE_SIZE - 1] \
+            if len(program_ids) > main.DASHBOARD_PAGE_SIZE else 0
+        first_ms, first_queries = measure(main, client, "/dashboard", repeat)
+        last_ms, last_queries = measure(main, client, f"/dashboard?programs_after={last_page_after}", repeat)
+        print(f"{program_count:>8} {first_ms:>8.2f} {first_queries:>7} {last_ms:>8.2f} {last_queries:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=20)
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.repeat)
@@ -0,0 +1,45 @@
+"""Time delete_program at several program sizes, with its statement count and peak Python memory.
+
+Usage: python benchmarks/bench_delete.py [--database-url postgresql://...]
+"""
+import argparse
+import tracemalloc
+
+from common import load_app, make_user, make_program_template, make_program, logged_in_client, QueryCounter, timed
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (4, 3, 3, 3),
+    (12, 4, 5, 5),
+    (52, 6, 6, 5),
+    (156, 6, 6, 5),
+]
+
+
+def run(main):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'weeks':>5} {'sets':>7} {'time (s)':>9} {'queries':>7} {'peak KiB':>9}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        program = make_program(main, user, program_template, weeks)
+        program_id = program.id
+        set_count = main.db.session.query(main.func.sum(main.Exercise.set_count)).join(main.Workout).filter(
+            main.Workout.program_id == program_id).scalar()
+        main.db.session.remove()
+        tracemalloc.start()
+        with QueryCounter(main.db.engine) as counter:
+            elapsed, response = timed(client.get, f"/programs/{program_id}/delete")
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert response.status_code == 302, response.status_code
+        print(f"{weeks:>5} {set_count:>7} {elapsed:>9.3f} {counter.count:>7} {peak / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main)
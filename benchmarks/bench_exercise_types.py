@@ -0,0 +1,81 @@
+"""Measure what storing exercise types by id saves: bytes per exercise row, and the make program page's exercise list.
+
+"By name" is the exercises table as it was before exerciseTypes, with each row carrying its type's name; it is
+rebuilt as a scratch table from the same rows to compare. Row bytes are the stored payload (SQLite's dbstat) or
+pg_column_size of each row (Postgres).
+
+Usage: python benchmarks/bench_exercise_types.py [--database-url postgresql://...] [--repeat 20]
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from common import load_app, make_user, make_program_template, make_program, logged_in_client, QueryCounter
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (52, 6, 6, 5),
+    (156, 6, 6, 5),
+]
+
+
+def row_bytes(main, table, program_id):
+    connection = main.db.session.connection()
+    if main.db.engine.dialect.name == "postgresql":
+        return connection.execute(text(f"""
+            SELECT SUM(pg_column_size({table}.*)) FROM {table} JOIN workouts ON workouts.id = {table}.workout_id
+            WHERE workouts.program_id = :program_id
+        """), {"program_id": program_id}).scalar()
+    # The scratch tables only hold the program's rows
+    return connection.execute(text("SELECT SUM(payload) FROM dbstat WHERE name = :table"), {"table": table}).scalar()
+
+
+def run(main, repeat):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'size':>12} {'exercises':>9} {'by name B/row':>13} {'by id B/row':>11} {'make program page ms':>20} {'queries':>7}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        program_template_id = program_template.id
+        program_id = make_program(main, user, program_template, weeks).id
+        for table, type_column in (("exercises_by_name", '"exerciseTypes".name AS type'), ("exercises_by_id", "type_id")):
+            main.db.session.execute(text(f"""
+                CREATE TABLE {table} AS
+                SELECT exercises.id, exercises.workout_id, exercises.set_count, exercises.reps, exercises.weight, {type_column}
+                FROM exercises
+                JOIN "exerciseTypes" ON "exerciseTypes".id = exercises.type_id
+                JOIN workouts ON workouts.id = exercises.workout_id
+                WHERE workouts.program_id = :program_id
+            """), {"program_id": program_id})
+        main.db.session.commit()
+        exercise_count = main.db.session.execute(text("SELECT COUNT(*) FROM exercises_by_id")).scalar()
+        by_name = row_bytes(main, "exercises_by_name", program_id) / exercise_count
+        by_id = row_bytes(main, "exercises_by_id", program_id) / exercise_count
+        main.db.session.execute(text("DROP TABLE exercises_by_name"))
+        main.db.session.execute(text("DROP TABLE exercises_by_id"))
+        main.db.session.commit()
+        main.db.session.remove()
+
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with QueryCounter(main.db.engine) as counter:
+                response = client.get(f"/program-templates/{program_template_id}/make_program")
+                response.get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+            main.db.session.remove()
+        assert response.status_code == 200, response.status_code
+        print(f"{f'{weeks}x{days}x{exercises_per_workout}x{sets}':>12} {exercise_count:>9} {by_name:>13.1f} {by_id:>11.1f} "
+              f"{statistics.median(timings):>20.2f} {counter.count:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=20)
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.repeat)
@@ -0,0 +1,72 @@
+"""Time the streamed CSV export at several program sizes: time to the first chunk, total time and peak Python memory.
+
+The naive column builds the same rows through Program.workouts and the other relationships, for comparison.
+
+Usage: python benchmarks/bench_export.py [--database-url postgresql://...]
+"""
+import argparse
+import time
+import tracemalloc
+
+from common import load_app, make_user, make_program_template, make_program, logged_in_client
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (4, 3, 3, 3),
+    (52, 6, 6, 5),
+    (156, 6, 6, 5),
+]
+
+
+def naive_rows(program):
+    return [
+        (workout.date, workout.week, workout.name, exercise.type, set.order, set.reps, set.weight, set.completed)
+        for workout in program.workouts
+        for exercise in workout.exercises
+        for set in exercise.sets
+    ]
+
+
+def stream(client, url):
+    # Returns the seconds to the first chunk, the total seconds and the bytes received
+    started = time.perf_counter()
+    response = client.get(url)
+    chunks = iter(response.response)
+    received = len(next(chunks))
+    first_chunk = time.perf_counter() - started
+    for chunk in chunks:
+        received += len(chunk)
+    response.close()
+    return first_chunk, time.perf_counter() - started, received
+
+
+def run(main):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'weeks':>5} {'rows':>7} {'first (ms)':>10} {'total (s)':>9} {'KiB sent':>9} {'peak KiB':>9} {'naive peak KiB':>14}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        program_id = make_program(main, user, program_template, weeks).id
+
+        main.db.session.remove()
+        tracemalloc.start()
+        rows = len(naive_rows(main.Program.query.get(program_id)))
+        naive_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        main.db.session.remove()
+        tracemalloc.start()
+        first_chunk, total, received = stream(client, f"/programs/{program_id}/export.csv")
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{weeks:>5} {rows:>7} {first_chunk * 1000:>10.2f} {total:>9.3f} {received / 1024:>9.1f} "
+              f"{peak / 1024:>9.1f} {naive_peak / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main)
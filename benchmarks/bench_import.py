@@ -0,0 +1,60 @@
+"""Time CSV program imports through /programs/import at several sizes and report rows per second.
+
+Each file is written in the export format, with one invalid row in every thousand to exercise error reporting.
+
+Usage: python benchmarks/bench_import.py [--database-url postgresql://...]
+"""
+import argparse
+import io
+import re
+from datetime import date, timedelta
+
+from common import load_app, make_user, logged_in_client, QueryCounter, timed
+
+SET_COUNTS = [1000, 10000, 100000]
+
+
+def make_csv(set_count):
+    lines = ["date,week,workout,exercise,set,reps,weight,completed"]
+    starting_date = date(2021, 1, 4)
+    for number in range(set_count):
+        # 5 sets per exercise, 6 exercises per workout, 4 workouts per week
+        workout_number = number // 30
+        workout_date = starting_date + timedelta(7 * (workout_number // 4) + workout_number % 4)
+        exercise = ["Squat", "Bench Press", "Deadlift", "Curl", "Chin up", "Overhead Press"][number // 5 % 6]
+        if number % 1000 == 999:
+            exercise = "Not an exercise"
+        lines.append(f"{workout_date.isoformat()},{workout_number // 4 + 1},Workout {workout_number % 4 + 1},"
+                     f"{exercise},{number % 5 + 1},5,{100 + workout_number},{'true' if number % 3 == 0 else 'false'}")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def run(main):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'rows':>7} {'KiB':>7} {'imported':>8} {'errors':>6} {'time (s)':>9} {'rows/s':>9} {'queries':>7}")
+    for set_count in SET_COUNTS:
+        data = make_csv(set_count)
+        main.db.session.remove()
+        with QueryCounter(main.db.engine) as counter:
+            elapsed, response = timed(
+                client.post,
+                "/programs/import",
+                data={"name": f"Import {set_count}", "file": (io.BytesIO(data), "program.csv")},
+                content_type="multipart/form-data"
+            )
+        assert response.status_code == 200, response.status_code
+        page = response.data.decode()
+        imported = int(re.search(r"Imported (\d+) sets", page).group(1))
+        errors = re.search(r"(\d+) rows were skipped", page)
+        print(f"{set_count:>7} {len(data) / 1024:>7.0f} {imported:>8} {int(errors.group(1)) if errors else 0:>6} "
+              f"{elapsed:>9.3f} {set_count / elapsed:>9.0f} {counter.count:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main)
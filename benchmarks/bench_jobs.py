@@ -0,0 +1,70 @@
+"""Compare how long a make_program POST holds the request with and without ASYNC_JOBS.
+
+Synchronous requests return once the program is generated and inserted. With ASYNC_JOBS the request returns once the
+job is queued, and /jobs/<id> is polled until the program exists.
+
+Usage: python benchmarks/bench_jobs.py [--database-url postgresql://...]
+"""
+import argparse
+import os
+import re
+import time
+
+os.environ["ASYNC_JOBS"] = "1"
+
+from common import load_app, make_user, make_program_template, template_exercises, logged_in_client
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (12, 4, 5, 5),
+    (52, 6, 6, 5),
+    (156, 6, 6, 5),
+]
+
+
+def post_make_program(main, client, program_template, weeks):
+    data = {"name": "Benchmark", "weeks": weeks, "starting_date": "2021-01-04"}
+    for count, exercise in enumerate(template_exercises(program_template)):
+        data[f"exercises-{count}-starting_weight"] = 100
+        data[f"exercises-{count}-increment"] = 5
+    url = f"/program-templates/{program_template.id}/make_program"
+    main.db.session.remove()
+    started = time.perf_counter()
+    response = client.post(url, data=data)
+    main.db.session.remove()
+    return time.perf_counter() - started, started, response
+
+
+def run(main):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'weeks':>5} {'sync (s)':>9} {'async response (s)':>18} {'async done (s)':>14}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+
+        main.app.config["ASYNC_JOBS"] = False
+        sync_elapsed, _, _ = post_make_program(main, client, program_template, weeks)
+
+        main.app.config["ASYNC_JOBS"] = True
+        program_template = main.ProgramTemplate.query.get(program_template.id)
+        async_elapsed, started, response = post_make_program(main, client, program_template, weeks)
+        job_id = int(re.search(r"job=(\d+)", response.location).group(1))
+        while True:
+            status = client.get(f"/jobs/{job_id}").get_json()["status"]
+            main.db.session.remove()
+            if status in ("done", "failed"):
+                break
+            time.sleep(0.01)
+        assert status == "done", status
+        done_elapsed = time.perf_counter() - started
+        print(f"{weeks:>5} {sync_elapsed:>9.3f} {async_elapsed:>18.3f} {done_elapsed:>14.3f}")
+    main.job_queue.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main)
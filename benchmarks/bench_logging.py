@@ -0,0 +1,124 @@
+"""Simulate many users logging sets at once: the batched PATCH /api/workouts/<id>/sets against one request per set.
+
+Every thread is a different user working through their own program, logging every set of one workout at a time.
+"batched" sends the workout's sets in one PATCH. "per set" sends one request per set, each loading the workout, walking
+its exercises and sets, and committing, as a checkbox-per-request endpoint would. Reports sets logged per second,
+workout latency percentiles and statements per workout.
+
+Usage: python benchmarks/bench_logging.py [--duration 2] [--database-url postgresql://...]
+"""
+import argparse
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from bench_pool import percentile
+from common import load_app, make_user, make_program_template, make_program, logged_in_client, QueryCounter
+
+CONCURRENCY = [1, 4, 16]
+
+
+def add_per_set_route(main):
+    # The naive endpoint, registered only for this benchmark
+    @main.app.route("/bench/workouts/<int:workout_id>/sets/<int:exercise_id>/<int:order>", methods=["POST"])
+    @main.protect_workout
+    def log_one_set(workout_id, exercise_id, order):
+        workout = g.workout
+        for exercise in workout.exercises:
+            if exercise.id != exercise_id:
+                continue
+            saved_set = next((set for set in exercise.set_rows if set.order == order), None)
+            if saved_set is None:
+                saved_set = main.Set(order=order, weight=exercise.weight, reps=exercise.reps, parent_exercise=exercise)
+                main.db.session.add(saved_set)
+            saved_set.completed = request.get_json()["completed"]
+        main.touch_program(workout.program_id)
+        main.db.session.commit()
+        return jsonify({"logged": 1})
+
+
+def make_users(main, count):
+    users = []
+    for number in range(count):
+        user = make_user(main, f"lifter{number}")
+        program_template = make_program_template(main, user, 4, 5, 5)
+        program = make_program(main, user, program_template, 4)
+        workouts = main.Workout.query.filter_by(program_id=program.id).order_by(main.Workout.id).all()
+        sets = [[(exercise.id, order) for exercise in workout.exercises for order in range(1, exercise.set_count + 1)] for workout in workouts]
+        users.append((logged_in_client(main, user), [workout.id for workout in workouts], sets))
+    main.db.session.remove()
+    return users
+
+
+def log_workout(client, workout_id, sets, completed, batched):
+    if batched:
+        body = {"sets": [{"exercise_id": exercise_id, "order": order, "completed": completed} for exercise_id, order in sets]}
+        responses = [client.patch(f"/api/workouts/{workout_id}/sets", json=body)]
+    else:
+        responses = [
+            client.post(f"/bench/workouts/{workout_id}/sets/{exercise_id}/{order}", json={"completed": completed})
+            for exercise_id, order in sets
+        ]
+    return sum(response.status_code != 200 for response in responses)
+
+
+def load(main, users, duration, batched):
+    latencies = []
+    logged = [0]
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(client, workout_ids, sets):
+        own_latencies = []
+        own_logged = own_errors = 0
+        count = 0
+        while time.perf_counter() < deadline:
+            index = count % len(workout_ids)
+            started = time.perf_counter()
+            own_errors += log_workout(client, workout_ids[index], sets[index], count // len(workout_ids) % 2 == 0, batched)
+            own_latencies.append(time.perf_counter() - started)
+            own_logged += len(sets[index])
+            count += 1
+        with lock:
+            latencies.extend(own_latencies)
+            logged[0] += own_logged
+            errors[0] += own_errors
+
+    threads = [threading.Thread(target=worker, args=user) for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return logged[0] / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), errors[0]
+
+
+def run(main, duration):
+    add_per_set_route(main)
+    users = make_users(main, max(CONCURRENCY))
+    client, workout_ids, sets = users[0]
+    for batched in (True, False):
+        with QueryCounter(main.db.engine) as counter:
+            log_workout(client, workout_ids[0], sets[0], True, batched)
+        main.db.session.remove()
+        print(f"{'batched' if batched else 'per set'}: {counter.count} statements to log a workout of {len(sets[0])} sets")
+    print(f"\n{'threads':>7} {'mode':<8} {'sets/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for threads in CONCURRENCY:
+        for batched in (True, False):
+            sets_per_second, p50, p99, errors = load(main, users[:threads], duration, batched)
+            print(f"{threads:>7} {'batched' if batched else 'per set':<8} {sets_per_second:>8.0f} {p50 * 1000:>8.2f} "
+                  f"{p99 * 1000:>8.2f} {errors:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per concurrency level and mode")
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.duration)
@@ -0,0 +1,84 @@
+"""Compare the per-row ORM program materialization with main.insert_program.
+
+Usage: python benchmarks/bench_make_program.py [--database-url postgresql://...] [--repeat 3]
+"""
+import argparse
+from datetime import date
+
+from common import load_app, make_user, make_program_template, template_exercises, timed
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (4, 3, 3, 3),
+    (12, 4, 5, 5),
+    (26, 5, 6, 5),
+    (52, 6, 6, 5),
+]
+
+
+def orm_insert_program(main, dummy_program, name, user_id):
+    # The materialization make_program used before insert_program: one ORM object per row
+    type_ids = main.exercise_catalog.type_ids(user_id)
+    new_program = main.Program(name=name, user_id=user_id, weeks=dummy_program.weeks)
+    main.db.session.add(new_program)
+    for workout_index in range(dummy_program.workout_count):
+        new_workout = main.Workout(
+            name=dummy_program.workout_names[workout_index],
+            week=dummy_program.workout_weeks[workout_index],
+            date=dummy_program.workout_date(workout_index),
+            parent_program=new_program
+        )
+        main.db.session.add(new_workout)
+        for exercise_index in dummy_program.exercise_range(workout_index):
+            new_exercise = main.Exercise(type_id=type_ids[dummy_program.exercise_types[exercise_index]], parent_workout=new_workout)
+            main.db.session.add(new_exercise)
+            for set_index in dummy_program.set_range(exercise_index):
+                main.db.session.add(main.Set(
+                    weight=dummy_program.set_weights[set_index],
+                    reps=dummy_program.set_reps[set_index],
+                    order=dummy_program.set_orders[set_index],
+                    completed=False,
+                    parent_exercise=new_exercise
+                ))
+    main.db.session.flush()
+    return new_program.id
+
+
+def run(main, repeat):
+    user = make_user(main)
+    print(f"{'weeks':>5} {'days':>4} {'ex':>3} {'sets':>4} {'rows':>7} {'orm (s)':>9} {'bulk (s)':>9} {'speedup':>8}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        exercises = template_exercises(program_template)
+        results = {}
+        for label, materialize in (("orm", orm_insert_program), ("bulk", None)):
+            best = None
+            for _ in range(repeat):
+                dummy_program = main.brain.make_dummy_program(
+                    program_template=program_template,
+                    starting_date=date(2021, 1, 4),
+                    weeks=weeks,
+                    starting_weights={exercise: 100 for exercise in exercises},
+                    increments={exercise: 5 for exercise in exercises}
+                )
+                if materialize:
+                    elapsed, _ = timed(materialize, main, dummy_program, "Benchmark", user.id)
+                else:
+                    elapsed, _ = timed(main.insert_program, dummy_program, "Benchmark", user.id)
+                elapsed_commit, _ = timed(main.db.session.commit)
+                elapsed += elapsed_commit
+                best = elapsed if best is None else min(best, elapsed)
+            results[label] = best
+        rows = weeks * days * (1 + exercises_per_workout * (1 + sets))
+        print(f"{weeks:>5} {days:>4} {exercises_per_workout:>3} {sets:>4} {rows:>7} "
+              f"{results['orm']:>9.3f} {results['bulk']:>9.3f} {results['orm'] / results['bulk']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.repeat)
@@ -0,0 +1,113 @@
+"""Measure the memory Brain.make_dummy_program allocates per set, using tracemalloc.
+
+The legacy row shows the object-per-row representation Brain used to build (every field wrapped in a 1-tuple).
+
+Usage: python benchmarks/bench_memory.py
+"""
+import tracemalloc
+from datetime import date
+from types import SimpleNamespace
+
+import common  # noqa: F401 (puts the repo on sys.path)
+from brain import Brain
+from exercises import exercises
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (12, 3, 5, 5),
+    (52, 6, 6, 5),
+    (156, 6, 6, 5),
+]
+
+
+class LegacyWorkout:
+    def __init__(self, name, week, date, parent_program):
+        self.name = name,
+        self.week = week,
+        self.date = date,
+        self.parent_program = parent_program,
+        self.exercises = []
+
+
+class LegacyExercise:
+    def __init__(self, exercise_type):
+        self.type = exercise_type,
+        self.sets = []
+
+
+class LegacySet:
+    def __init__(self, weight, reps, order):
+        self.weight = weight,
+        self.reps = reps,
+        self.order = order,
+
+
+def make_template(days_per_week, exercises_per_workout, sets_per_exercise):
+    return SimpleNamespace(id=f"{days_per_week}x{exercises_per_workout}x{sets_per_exercise}", version=0, workout_templates=[
+        SimpleNamespace(
+            name=f"Workout {day_id}",
+            days=[SimpleNamespace(id=day_id)],
+            schedule_week=0,
+            exercise_templates=[
+                SimpleNamespace(
+                    type=exercises[(day_id + num) % len(exercises)],
+                    set_count=sets_per_exercise,
+                    reps=5
+                )
+                for num in range(exercises_per_workout)
+            ]
+        )
+        for day_id in range(1, days_per_week + 1)
+    ])
+
+
+def to_legacy(dummy_program):
+    workouts = []
+    for workout_index in range(dummy_program.workout_count):
+        new_workout = LegacyWorkout(
+            name=dummy_program.workout_names[workout_index],
+            week=dummy_program.workout_weeks[workout_index],
+            date=dummy_program.workout_date(workout_index),
+            parent_program=dummy_program
+        )
+        workouts.append(new_workout)
+        for exercise_index in dummy_program.exercise_range(workout_index):
+            new_exercise = LegacyExercise(dummy_program.exercise_types[exercise_index])
+            new_workout.exercises.append(new_exercise)
+            for set_index in dummy_program.set_range(exercise_index):
+                new_exercise.sets.append(LegacySet(
+                    weight=dummy_program.set_weights[set_index],
+                    reps=dummy_program.set_reps[set_index],
+                    order=dummy_program.set_orders[set_index]
+                ))
+    return workouts
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current - before, peak - before, result
+
+
+def run():
+    brain = Brain()
+    print(f"{'weeks':>5} {'days':>4} {'ex':>3} {'sets/ex':>7} {'sets':>7} {'columnar B/set':>15} {'peak B/set':>11} {'legacy B/set':>13}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_template(days, exercises_per_workout, sets)
+        weights = {exercise: 100 for exercise in exercises}
+        increments = {exercise: 5 for exercise in exercises}
+        retained, peak, dummy_program = measure(
+            brain.make_dummy_program, program_template, date(2021, 1, 4), weeks, weights, increments
+        )
+        legacy_retained, _, _ = measure(to_legacy, dummy_program)
+        set_count = dummy_program.set_count
+        print(f"{weeks:>5} {days:>4} {exercises_per_workout:>3} {sets:>7} {set_count:>7} "
+              f"{retained / set_count:>15.1f} {peak / set_count:>11.1f} {legacy_retained / set_count:>13.1f}")
+
+
+if __name__ == "__main__":
+    run()
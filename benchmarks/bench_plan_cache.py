@@ -0,0 +1,71 @@
+"""Time making programs from one template with the Brain's plan cache cold and warm.
+
+A cold make_program walks the template's workouts, days and exercises to compile its plan; later ones reuse the
+plan until the template is edited. Reports the statements and time of each make_program POST, then edits the
+template and checks that the next program has the new exercise.
+
+Usage: python benchmarks/bench_plan_cache.py [--database-url postgresql://...] [--repeat 5]
+"""
+import argparse
+
+from common import load_app, make_user, make_program_template, template_exercises, logged_in_client, QueryCounter, timed
+
+SIZES = [
+    # days per week, exercises per workout, sets per exercise
+    (3, 3, 3),
+    (6, 6, 5),
+]
+
+
+def make_program_data(program_template, weeks):
+    data = {"name": "Benchmark", "weeks": weeks, "starting_date": "2021-01-04"}
+    for count, exercise in enumerate(template_exercises(program_template)):
+        data[f"exercises-{count}-starting_weight"] = 100
+        data[f"exercises-{count}-increment"] = 5
+    return data
+
+
+def post(main, client, url, data):
+    main.db.session.remove()
+    with QueryCounter(main.db.engine) as counter:
+        elapsed, response = timed(client.post, url, data=data)
+    assert response.status_code == 302, response.status_code
+    main.db.session.remove()
+    return elapsed, counter.count
+
+
+def run(main, repeat):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'size':>7} {'cold queries':>12} {'warm queries':>12} {'cold (ms)':>9} {'warm (ms)':>9}")
+    for days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        url = f"/program-templates/{program_template.id}/make_program"
+        data = make_program_data(program_template, 4)
+        main.brain.forget_plans(program_template.id)
+        cold_elapsed, cold_queries = post(main, client, url, data)
+        warm = [post(main, client, url, data) for _ in range(repeat)]
+        warm_elapsed = min(elapsed for elapsed, _ in warm)
+        print(f"{days}x{exercises_per_workout}x{sets:<3} {cold_queries:>12} {warm[-1][1]:>12} "
+              f"{cold_elapsed * 1000:>9.1f} {warm_elapsed * 1000:>9.1f}")
+
+    # An edit bumps the template's version, so the next program is made from a fresh plan
+    workout_template_id = main.ProgramTemplate.query.get(program_template.id).workout_templates[0].id
+    client.post(f"/workout-templates/{workout_template_id}", data={"type": main.exercise_catalog.type_ids()["Squat"], "sets": 2, "reps_per_set": 8})
+    main.db.session.remove()
+    program_template = main.ProgramTemplate.query.get(program_template.id)
+    post(main, client, url, make_program_data(program_template, 4))
+    program = main.Program.query.order_by(main.Program.id.desc()).first()
+    prescriptions = {(exercise.type, exercise.set_count, exercise.reps) for workout in program.workouts for exercise in workout.exercises}
+    assert ("Squat", 2, 8) in prescriptions, prescriptions
+    print(f"\nplan cache: {main.brain.plan_hits} hits, {main.brain.plan_misses} misses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=5)
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.repeat)
@@ -0,0 +1,94 @@
+"""Load test the program, workout and dashboard pages from concurrent threads and report throughput and pool waits.
+
+Each thread has its own Flask test client and requests the pages in turn for --duration seconds. For every level of
+concurrency it prints requests per second, latency percentiles and the connection pool's checkouts, mean and
+maximum wait and timeouts. Use a small --pool-size to see threads queue for connections.
+
+Usage: python benchmarks/bench_pool.py [--pool-size 5] [--max-overflow 10] [--database-url postgresql://...]
+"""
+import argparse
+import os
+import threading
+import time
+
+CONCURRENCY = [1, 2, 4, 8, 16]
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))]
+
+
+def load(main, urls, clients, duration):
+    from pooling import pool_stats
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        client = clients[offset]
+        own_latencies = []
+        count = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = client.get(urls[count % len(urls)])
+            own_latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            count += 1
+        with lock:
+            latencies.extend(own_latencies)
+
+    before = pool_stats(main.db.engine.pool)
+    threads = len(clients)
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = pool_stats(main.db.engine.pool)
+
+    latencies.sort()
+    checkouts = after["checkouts"] - before["checkouts"]
+    wait = after["wait_seconds"] - before["wait_seconds"]
+    print(f"{threads:>7} {len(latencies) / elapsed:>8.0f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+          f"{percentile(latencies, 0.99) * 1000:>8.2f} {checkouts:>9} {wait / max(checkouts, 1) * 1000:>13.3f} "
+          f"{after['max_wait_seconds'] * 1000:>12.2f} {after['timeouts'] - before['timeouts']:>8} {len(errors):>6}")
+
+
+def run(main, duration):
+    from common import make_user, make_program_template, make_program, logged_in_client
+    user = make_user(main)
+    program_template = make_program_template(main, user, 4, 5, 5)
+    program = make_program(main, user, program_template, 12)
+    workout_id = main.Workout.query.filter_by(program_id=program.id).first().id
+    urls = [f"/programs/{program.id}/week/{week}" for week in range(1, 13)] + [f"/workouts/{workout_id}", "/dashboard"]
+    clients = [logged_in_client(main, user) for _ in range(max(CONCURRENCY))]
+    main.db.session.remove()
+    print(f"{'threads':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'checkouts':>9} {'mean wait ms':>13} "
+          f"{'max wait ms':>12} {'timeouts':>8} {'errors':>6}")
+    for threads in CONCURRENCY:
+        load(main, urls, clients[:threads], duration)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=10)
+    parser.add_argument("--pool-timeout", type=float, default=30)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per concurrency level")
+    arguments = parser.parse_args()
+    # The pool is configured when main is imported
+    os.environ["DB_POOL_SIZE"] = str(arguments.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(arguments.max_overflow)
+    os.environ["DB_POOL_TIMEOUT"] = str(arguments.pool_timeout)
+    # Measure the pages rather than the week table cache
+    os.environ["GRID_CACHE"] = "none"
+
+    from common import load_app
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main, arguments.duration)
@@ -0,0 +1,81 @@
+"""Time Brain.make_dummy_program on long periodized programs: a 4-week rotating schedule, increments every 3 sessions,
+a deload every 4th week and rounding to 5 lbs., against the same template with the default linear progression.
+
+Time and peak memory per set should stay flat as programs get longer.
+
+Usage: python benchmarks/bench_progression.py [--repeat 3]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import date
+from types import SimpleNamespace
+
+import common  # noqa: F401 (puts the repo on sys.path)
+from brain import Brain
+from exercises import exercises
+
+WEEKS = [52, 260, 520, 1040]
+DAYS_PER_WEEK = 6
+EXERCISES_PER_WORKOUT = 6
+SETS_PER_EXERCISE = 5
+SCHEDULE_WEEKS = 4
+
+PERIODIZED = {"increment_frequency": 3, "smallest_weight_plate": 5, "deload_every": 4, "deload_percent": 10}
+
+
+def make_template(schedule_weeks):
+    # Each day has one workout per week of the schedule, with a different mix of exercises
+    return SimpleNamespace(id=f"schedule-{schedule_weeks}", version=0, workout_templates=[
+        SimpleNamespace(
+            name=f"Day {day_id} week {week}",
+            days=[SimpleNamespace(id=day_id)],
+            schedule_week=week if schedule_weeks > 1 else 0,
+            exercise_templates=[
+                SimpleNamespace(
+                    type=exercises[(day_id + week + num) % len(exercises)],
+                    set_count=SETS_PER_EXERCISE,
+                    reps=5
+                )
+                for num in range(EXERCISES_PER_WORKOUT)
+            ]
+        )
+        for day_id in range(1, DAYS_PER_WEEK + 1)
+        for week in range(1, schedule_weeks + 1)
+    ])
+
+
+def measure(brain, program_template, weeks, progression, repeat):
+    weights = {exercise: 100 for exercise in exercises}
+    increments = {exercise: 5 for exercise in exercises}
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        dummy_program = brain.make_dummy_program(program_template, date(2021, 1, 4), weeks, weights, increments, progression)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    brain.make_dummy_program(program_template, date(2021, 1, 4), weeks, weights, increments, progression)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return dummy_program.set_count, best, peak
+
+
+def run(repeat):
+    brain = Brain()
+    linear_template = make_template(1)
+    periodized_template = make_template(SCHEDULE_WEEKS)
+    print(f"{'weeks':>5} {'sets':>7} {'linear us/set':>13} {'periodized us/set':>17} {'periodized peak B/set':>21}")
+    for weeks in WEEKS:
+        set_count, linear, _ = measure(brain, linear_template, weeks, None, repeat)
+        periodized_set_count, periodized, peak = measure(brain, periodized_template, weeks, PERIODIZED, repeat)
+        assert set_count == periodized_set_count
+        print(f"{weeks:>5} {set_count:>7} {linear / set_count * 1e6:>13.2f} {periodized / set_count * 1e6:>17.2f} "
+              f"{peak / set_count:>21.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+    run(arguments.repeat)
@@ -0,0 +1,64 @@
+"""Count the rows a generated program stores, and the statements it takes to add an exercise to a template.
+
+"Row per set" is what the sets table held before exercises carried their set count, reps and weight: one row for
+every set. Now sets only get a row when they differ from their exercise's prescription or are completed, so
+generated programs store none.
+
+Usage: python benchmarks/bench_set_rows.py [--database-url postgresql://...]
+"""
+import argparse
+from datetime import date
+
+from common import load_app, make_user, make_program_template, template_exercises, logged_in_client, QueryCounter, timed
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (4, 3, 3, 3),
+    (52, 6, 6, 5),
+    (156, 6, 6, 5),
+]
+
+
+def count_rows(main, program_id):
+    Workout, Exercise, Set = main.Workout, main.Exercise, main.Set
+    workouts = Workout.query.filter_by(program_id=program_id).count()
+    exercises = Exercise.query.join(Workout).filter(Workout.program_id == program_id).count()
+    sets = main.db.session.query(main.func.sum(Exercise.set_count)).join(Workout).filter(Workout.program_id == program_id).scalar()
+    set_rows = Set.query.join(Exercise).join(Workout).filter(Workout.program_id == program_id).count()
+    return workouts, exercises, sets, set_rows
+
+
+def run(main):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    print(f"{'weeks':>5} {'sets':>7} {'rows (row per set)':>18} {'rows':>7} {'insert (s)':>10}")
+    for weeks, days, exercises_per_workout, sets in SIZES:
+        program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+        exercises = template_exercises(program_template)
+        dummy_program = main.brain.make_dummy_program(
+            program_template=program_template,
+            starting_date=date(2021, 1, 4),
+            weeks=weeks,
+            starting_weights={exercise: 100 for exercise in exercises},
+            increments={exercise: 5 for exercise in exercises}
+        )
+        elapsed, program_id = timed(main.insert_program, dummy_program, "Benchmark", user.id)
+        main.db.session.commit()
+        workouts, exercises, set_total, set_rows = count_rows(main, program_id)
+        print(f"{weeks:>5} {set_total:>7} {workouts + exercises + set_total:>18} {workouts + exercises + set_rows:>7} {elapsed:>10.3f}")
+
+    workout_template_id = program_template.workout_templates[0].id
+    main.db.session.remove()
+    with QueryCounter(main.db.engine) as counter:
+        response = client.post(f"/workout-templates/{workout_template_id}", data={"type": main.exercise_catalog.type_ids()["Squat"], "sets": 10, "reps_per_set": 5})
+    assert response.status_code == 302, response.status_code
+    print(f"\nAdding a 10 set exercise to a template: {counter.count} statements, no set template rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    arguments = parser.parse_args()
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        run(main)
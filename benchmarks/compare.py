@@ -0,0 +1,34 @@
+"""Compare two benchmarks/suite.py JSON reports.
+
+Usage: python benchmarks/compare.py before.json after.json [--metric p50]
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as file:
+        report = json.load(file)
+    return report, {(result["scenario"], json.dumps(result["size"], sort_keys=True)): result for result in report["results"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metric", default="p50", choices=["p50", "p90", "p99", "max", "mean"])
+    arguments = parser.parse_args()
+
+    before_report, before = load(arguments.before)
+    after_report, after = load(arguments.after)
+    print(f"before: {before_report['commit']} ({before_report['database']})")
+    print(f"after:  {after_report['commit']} ({after_report['database']})")
+    print(f"{'scenario':<26} {'size':>10} {'before ms':>10} {'after ms':>10} {'change':>8} {'queries':>15}")
+    for key in sorted(before.keys() & after.keys()):
+        scenario, size = key
+        size = json.loads(size)
+        label = f"{size['weeks']}x{size['days']}x{size['exercises']}x{size['sets']}"
+        old = before[key]["latency_ms"][arguments.metric]
+        new = after[key]["latency_ms"][arguments.metric]
+        queries = f"{before[key]['queries_mean']:.0f} -> {after[key]['queries_mean']:.0f}"
+        print(f"{scenario:<26} {label:>10} {old:>10.2f} {new:>10.2f} {(new - old) / old * 100 if old else 0:>+7.0f}% {queries:>15}")
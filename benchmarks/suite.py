@@ -0,0 +1,252 @@
+"""Reproducible benchmark suite for program generation, materialization, rendering and deletion.
+
+Seeds a database (a temporary SQLite file unless --database-url is given) with a user, a program template and
+programs of each requested size, then times every scenario through the Flask test client. For each scenario it
+reports latency percentiles, the mean number of SQL statements and the peak traced Python memory of one extra
+run, and saves everything as JSON.
+
+Usage:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --sizes 4x3x3x3 52x6x6x5 --iterations 20 --database-url postgresql://localhost/musqlo
+    python benchmarks/suite.py --lazy --output lazy.json
+    python benchmarks/compare.py before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from common import (
+    ROOT, load_app, make_user, make_program_template, make_program, template_exercises, logged_in_client, QueryCounter
+)
+
+DEFAULT_SIZES = ["4x3x3x3", "12x4x5x5", "52x6x6x5"]
+
+
+def parse_size(text):
+    weeks, days, exercises_per_workout, sets = (int(part) for part in text.split("x"))
+    return {"weeks": weeks, "days": days, "exercises": exercises_per_workout, "sets": sets}
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+# SCENARIOS
+# Each scenario gets the benchmark context and the size, prepares whatever the measured call destroys or needs,
+# and returns a function that performs the measured call. The session is reset before every scenario, so scenarios
+# look objects up again by id.
+
+
+def current_user(context):
+    return context["main"].User.query.get(context["user_id"])
+
+
+def current_program_template(context):
+    return context["main"].ProgramTemplate.query.get(context["program_template_id"])
+
+
+def generate_program(context, size):
+    program_template = current_program_template(context)
+    exercises = template_exercises(program_template)
+
+    def run():
+        return context["main"].brain.make_dummy_program(
+            program_template=program_template,
+            starting_date=date(2021, 1, 4),
+            weeks=size["weeks"],
+            starting_weights={exercise: 100 for exercise in exercises},
+            increments={exercise: 5 for exercise in exercises}
+        )
+    return run
+
+
+def post_make_program(context, size):
+    program_template = current_program_template(context)
+    data = {"name": "Benchmark", "weeks": size["weeks"], "starting_date": "2021-01-04"}
+    for count, exercise in enumerate(template_exercises(program_template)):
+        data[f"exercises-{count}-starting_weight"] = 100
+        data[f"exercises-{count}-increment"] = 5
+    return lambda: context["client"].post(f"/program-templates/{program_template.id}/make_program", data=data)
+
+
+def get_show_program(context, size):
+    url = f"/programs/{context['program_id']}/week/{max(1, size['weeks'] // 2)}"
+    return lambda: context["client"].get(url)
+
+
+def get_show_program_template(context, size):
+    url = f"/program-templates/{context['program_template_id']}"
+    return lambda: context["client"].get(url)
+
+
+def get_show_workout(context, size):
+    url = context["workout_url"]
+    return lambda: context["client"].get(url)
+
+
+def delete_workout(context, size):
+    main = context["main"]
+    program = make_program(main, current_user(context), current_program_template(context), size["weeks"])
+    if program.is_lazy:
+        # Saves the generated week, then deletes its first session
+        url = f"/programs/{program.id}/week/1/sessions/0/delete"
+    else:
+        workout = main.Workout.query.filter_by(program_id=program.id, week=1).first()
+        url = f"/week/{workout.week}/workouts/{workout.id}/delete"
+    return lambda: context["client"].get(url)
+
+
+def delete_program(context, size):
+    program = make_program(context["main"], current_user(context), current_program_template(context), size["weeks"])
+    url = f"/programs/{program.id}/delete"
+    return lambda: context["client"].get(url)
+
+
+def delete_program_template(context, size):
+    program_template = make_program_template(context["main"], current_user(context), size["days"], size["exercises"], size["sets"])
+    url = f"/program-templates/{program_template.id}/delete"
+    return lambda: context["client"].get(url)
+
+
+def delete_workout_template(context, size):
+    program_template = make_program_template(context["main"], current_user(context), size["days"], size["exercises"], size["sets"])
+    url = f"/workout-templates/{program_template.workout_templates[0].id}/delete"
+    return lambda: context["client"].get(url)
+
+
+def delete_exercise_template(context, size):
+    program_template = make_program_template(context["main"], current_user(context), size["days"], size["exercises"], size["sets"])
+    url = f"/exercise-templates/{program_template.workout_templates[0].exercise_templates[0].id}/delete"
+    return lambda: context["client"].get(url)
+
+
+def delete_user(context, size):
+    main = context["main"]
+    doomed_user = make_user(main, "doomed")
+    program_template = make_program_template(main, doomed_user, size["days"], size["exercises"], size["sets"])
+    make_program(main, doomed_user, program_template, size["weeks"])
+    client = logged_in_client(main, doomed_user)
+    return lambda: client.get("/user/delete")
+
+
+SCENARIOS = {
+    "brain.make_dummy_program": generate_program,
+    "make_program (POST)": post_make_program,
+    "show_program": get_show_program,
+    "show_program_template": get_show_program_template,
+    "show_workout": get_show_workout,
+    "delete_workout": delete_workout,
+    "delete_program": delete_program,
+    "delete_workout_template": delete_workout_template,
+    "delete_exercise_template": delete_exercise_template,
+    "delete_program_template": delete_program_template,
+    "delete_user": delete_user,
+}
+
+
+def measure(context, scenario, size, iterations):
+    main = context["main"]
+    latencies = []
+    query_counts = []
+    for _ in range(iterations):
+        main.db.session.remove()
+        run = scenario(context, size)
+        with QueryCounter(main.db.engine) as counter:
+            started = time.perf_counter()
+            response = run()
+            latencies.append(time.perf_counter() - started)
+        if hasattr(response, "status_code") and response.status_code >= 400:
+            raise RuntimeError(f"{scenario.__name__} returned {response.status_code}")
+        query_counts.append(counter.count)
+
+    # Tracing slows everything down, so peak memory comes from one separate run
+    main.db.session.remove()
+    run = scenario(context, size)
+    tracemalloc.start()
+    run()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p90": percentile(latencies, 0.90) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": latencies[-1] * 1000,
+            "mean": sum(latencies) / len(latencies) * 1000,
+        },
+        "queries_mean": sum(query_counts) / len(query_counts),
+        "peak_memory_kib": peak_bytes / 1024,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(main, sizes, iterations, only):
+    user = make_user(main)
+    context = {"main": main, "user_id": user.id, "client": logged_in_client(main, user)}
+    results = []
+    for size in sizes:
+        program_template = make_program_template(main, current_user(context), size["days"], size["exercises"], size["sets"])
+        context["program_template_id"] = program_template.id
+        program = make_program(main, current_user(context), program_template, size["weeks"])
+        context["program_id"] = program.id
+        if program.is_lazy:
+            context["workout_url"] = f"/programs/{program.id}/week/1/sessions/0"
+        else:
+            context["workout_url"] = f"/workouts/{main.Workout.query.filter_by(program_id=program.id).first().id}"
+        label = f"{size['weeks']}x{size['days']}x{size['exercises']}x{size['sets']}"
+        for name, scenario in SCENARIOS.items():
+            if only and name not in only:
+                continue
+            result = measure(context, scenario, size, iterations)
+            results.append({"scenario": name, "size": size, **result})
+            latency = result["latency_ms"]
+            print(f"{name:<26} {label:>10} p50 {latency['p50']:>9.2f} ms  p90 {latency['p90']:>9.2f} ms  "
+                  f"p99 {latency['p99']:>9.2f} ms  queries {result['queries_mean']:>7.1f}  peak {result['peak_memory_kib']:>9.1f} KiB")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="weeks x days per week x exercises x sets")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--cache", default="none", help="GRID_CACHE backend to benchmark with (default: none)")
+    parser.add_argument("--lazy", action="store_true", help="benchmark lazy programs (LAZY_PROGRAMS=1)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    arguments = parser.parse_args()
+
+    os.environ["GRID_CACHE"] = arguments.cache
+    os.environ["LAZY_PROGRAMS"] = "1" if arguments.lazy else "0"
+    main = load_app(arguments.database_url)
+    with main.app.app_context():
+        results = run_suite(main, [parse_size(size) for size in arguments.sizes], arguments.iterations, arguments.only)
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "database": main.db.engine.dialect.name,
+            "cache": arguments.cache,
+            "lazy": arguments.lazy,
+            "results": results,
+        }
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved {len(results)} results to {arguments.output}")
@@ -1,128 +1,357 @@
-from datetime import timedelta
+from array import array
+from collections import namedtuple
+from datetime import date, timedelta
 import time
+from cache import MemoryBackend
+
+# Read-only views of one generated workout, shaped like the Workout, Exercise and Set models
+WorkoutView = namedtuple("WorkoutView", ["name", "week", "date", "exercises"])
+ExerciseView = namedtuple("ExerciseView", ["type", "sets", "id"], defaults=(None,))
+SetView = namedtuple("SetView", ["weight", "reps", "order", "completed"], defaults=(False,))
+
+# How weights go up: by the exercise's increment every increment_frequency sessions of it, rounded to a multiple of
+# smallest_weight_plate (0 for no rounding). Every deload_every-th week (0 for never) is deload_percent lighter and
+# doesn't count towards the next increment.
+Progression = namedtuple(
+    "Progression",
+    ["increment_frequency", "smallest_weight_plate", "deload_every", "deload_percent"],
+    defaults=(1, 0, 0, 0)
+)
+
 
 class DummyProgram:
-    def __init__(self, starting_date, weeks, starting_weights, increments):
+    # Columnar program: one flat array per field. Workouts point at their first exercise and exercises at their first
+    # set, so a workout's exercises (or an exercise's sets) run up to the next workout's (or exercise's) first one.
+    __slots__ = (
+        "starting_date", "weeks", "starting_weights", "increments", "progression",
+        "workout_names", "workout_weeks", "workout_dates", "workout_first_exercise",
+        "exercise_types", "exercise_first_set",
+        "set_weights", "set_reps", "set_orders",
+    )
+
+    def __init__(self, starting_date, weeks, starting_weights, increments, progression=Progression()):
         self.starting_date = starting_date
         self.weeks = weeks
         self.starting_weights = starting_weights
         self.increments = increments
-        self.increment_frequency = 0
-        self.smallest_weight_plate = 0
-        self.workouts = []
+        self.progression = progression
+        self.workout_names = []
+        self.workout_weeks = array("i")
+        self.workout_dates = array("i")  # Date ordinals
+        self.workout_first_exercise = array("i")
+        self.exercise_types = []
+        self.exercise_first_set = array("i")
+        # Weights keep growing by their increment every session, so they get 64 bits
+        self.set_weights = array("q")
+        self.set_reps = array("i")
+        self.set_orders = array("i")
+
+    @property
+    def workout_count(self):
+        return len(self.workout_names)
+
+    @property
+    def exercise_count(self):
+        return len(self.exercise_types)
+
+    @property
+    def set_count(self):
+        return len(self.set_weights)
+
+    def add_workout(self, name, week, date):
+        self.workout_names.append(name)
+        self.workout_weeks.append(week)
+        self.workout_dates.append(date.toordinal())
+        self.workout_first_exercise.append(len(self.exercise_types))
+        return len(self.workout_names) - 1
+
+    def add_exercise(self, exercise_type):
+        self.exercise_types.append(exercise_type)
+        self.exercise_first_set.append(len(self.set_weights))
+        return len(self.exercise_types) - 1
+
+    def add_set(self, weight, reps, order):
+        self.set_weights.append(weight)
+        self.set_reps.append(reps)
+        self.set_orders.append(order)
+        return len(self.set_weights) - 1
+
+    def workout_date(self, workout_index):
+        return date.fromordinal(self.workout_dates[workout_index])
+
+    def exercise_range(self, workout_index):
+        end = self.workout_first_exercise[workout_index + 1] if workout_index + 1 < len(self.workout_names) else len(self.exercise_types)
+        return range(self.workout_first_exercise[workout_index], end)
+
+    def set_range(self, exercise_index):
+        end = self.exercise_first_set[exercise_index + 1] if exercise_index + 1 < len(self.exercise_types) else len(self.set_weights)
+        return range(self.exercise_first_set[exercise_index], end)
+
+    def rows(self):
+        # (date, week, workout name, exercise type, set order, reps, weight) for every set, in program order
+        for workout_index in range(self.workout_count):
+            name = self.workout_names[workout_index]
+            week = self.workout_weeks[workout_index]
+            workout_date = self.workout_date(workout_index)
+            for exercise_index in self.exercise_range(workout_index):
+                exercise_type = self.exercise_types[exercise_index]
+                for set_index in self.set_range(exercise_index):
+                    yield (workout_date, week, name, exercise_type,
+                           self.set_orders[set_index], self.set_reps[set_index], self.set_weights[set_index])
+
+    def workout(self, workout_index):
+        return WorkoutView(
+            name=self.workout_names[workout_index],
+            week=self.workout_weeks[workout_index],
+            date=self.workout_date(workout_index),
+            exercises=[
+                ExerciseView(
+                    type=self.exercise_types[exercise_index],
+                    sets=[
+                        SetView(weight=self.set_weights[set_index], reps=self.set_reps[set_index], order=self.set_orders[set_index])
+                        for set_index in self.set_range(exercise_index)
+                    ]
+                )
+                for exercise_index in self.exercise_range(workout_index)
+            ]
+        )
+
+
+class WeightTable:
+    # Working weights by exercise type and number of counted sessions before, each computed once: a table per exercise
+    # is extended as far as the program gets, so generating a program costs one lookup per exercise session
+    def __init__(self, starting_weights, increments, progression):
+        self.starting_weights = starting_weights
+        self.increments = increments
+        self.progression = progression
+        self.tables = {}
+        self.deload_tables = {}
+
+    def round(self, weight):
+        plate = self.progression.smallest_weight_plate
+        if plate <= 0:
+            return weight
+        # To the nearest multiple, halves up
+        return (2 * weight + plate) // (2 * plate) * plate
 
+    def weight(self, exercise_type, done, deload=False):
+        table = self.tables.get(exercise_type)
+        if table is None:
+            table = self.tables[exercise_type] = array("q")
+        if done >= len(table):
+            starting_weight = self.starting_weights[exercise_type]
+            increment = self.increments[exercise_type]
+            frequency = self.progression.increment_frequency
+            table.extend(self.round(starting_weight + increment * (n // frequency)) for n in range(len(table), done + 1))
+        if not deload:
+            return table[done]
 
-class DummyWorkout:
-    def __init__(self, name, week, date, parent_program):
-        self.name = name,
-        self.week = week,
-        self.date = date,
-        self.parent_program = parent_program,
-        self.exercises = []
+        deload_table = self.deload_tables.get(exercise_type)
+        if deload_table is None:
+            deload_table = self.deload_tables[exercise_type] = array("q")
+        if done >= len(deload_table):
+            kept_percent = 100 - self.progression.deload_percent
+            deload_table.extend(self.round(table[n] * kept_percent // 100) for n in range(len(deload_table), done + 1))
+        return deload_table[done]
 
 
-class DummyExercise:
-    def __init__(self, exercise_type):
-        self.type = exercise_type,
-        self.sets = []
+def schedule_week(workout):
+    # Workouts in plans saved before schedules could span several weeks have no schedule week
+    return workout[2] if len(workout) > 2 else 0
 
 
-class DummySet:
-    def __init__(self, weight, reps, order):
-        self.weight = weight,
-        self.reps = reps,
-        self.order = order,
+def count_exercises(sessions):
+    # How many times each exercise type was performed before every session in the list, and in the whole list
+    before = []
+    total = {}
+    for weekday, workout in sessions:
+        before.append(dict(total))
+        for exercise_type, reps_per_set in workout[1]:
+            total[exercise_type] = total.get(exercise_type, 0) + 1
+    return before, total
 
 
 class Brain:
-    def make_dummy_program(self, program_template, starting_date, weeks, starting_weights, increments):
+    def __init__(self, plan_cache_size=256):
+        # Plans by (program template id, template version). Every edit to a template bumps its version, so entries are
+        # never stale; the ones for old versions age out of the LRU.
+        self.plans = MemoryBackend(plan_cache_size)
+        self.plan_hits = 0
+        self.plan_misses = 0
+
+    def get_plan(self, program_template):
+        # make_plan, without walking the template's workouts, days and exercises again after the first time
+        key = (program_template.id, program_template.version)
+        plan = self.plans.get(key)
+        if plan is not None:
+            self.plan_hits += 1
+            return plan
+        self.plan_misses += 1
+        plan = self.make_plan(program_template)
+        self.plans.set(key, plan)
+        return plan
+
+    def forget_plans(self, program_template_id):
+        # Needed when a template is deleted, since SQLite can hand its id to the next one, which starts at version 0
+        self.plans.discard((program_template_id,))
+
+    def make_plan(self, program_template):
+        # Weekday (0 = Monday) -> (name, exercises, schedule week) of the workouts on that day, in template order.
+        # Schedule week 0 means every week; otherwise the workout is on that week of an N-week schedule, where N is
+        # the highest schedule week in the plan.
+        plan = [[] for _ in range(7)]
+        for workout_template in program_template.workout_templates:
+            exercises = tuple(
+                (exercise_template.type, (exercise_template.reps,) * exercise_template.set_count)
+                for exercise_template in workout_template.exercise_templates
+            )
+            weekdays = {day.id - 1 for day in workout_template.days}
+            for weekday in range(7):
+                if weekday in weekdays:
+                    plan[weekday].append((workout_template.name, exercises, workout_template.schedule_week))
+        return tuple(tuple(workouts) for workouts in plan)
+
+    def split_weeks(self, plan, starting_date):
+        # Week 1 runs from the starting date to the following Sunday, or is the whole next week if that stretch has no
+        # workouts. Every later week runs Monday to Sunday and has the sessions of the next week of the schedule.
+        # Programs start at the first schedule week with workouts, so a schedule whose first weeks are empty doesn't
+        # begin with blank weeks. Returns the Monday of week 1, the (weekday, workout) sessions of week 1 and those of
+        # each schedule week, in program order.
+        schedule_length = max((schedule_week(workout) for workouts in plan for workout in workouts), default=0) or 1
+        schedule = [
+            [
+                (weekday, workout)
+                for weekday, workouts in enumerate(plan) for workout in workouts
+                if schedule_week(workout) in (0, week)
+            ]
+            for week in range(1, schedule_length + 1)
+        ]
+        first_scheduled = next((index for index, sessions in enumerate(schedule) if sessions), 0)
+        schedule = schedule[first_scheduled:] + schedule[:first_scheduled]
+        first_monday = starting_date - timedelta(starting_date.weekday())
+        first_week = [session for session in schedule[0] if session[0] >= starting_date.weekday()]
+        if not first_week:
+            first_monday += timedelta(7)
+            first_week = schedule[0]
+        return first_monday, first_week, schedule
+
+    def week_monday(self, plan, starting_date, week):
+        return self.split_weeks(plan, starting_date)[0] + timedelta(7 * (week - 1))
+
+    def make_schedule(self, plan, starting_date, weeks, only_week=None, deload_every=0):
+        # Yields (week, date, workout, counted sessions of its exercises before it, deload) for every session of the
+        # program, or of only_week. Sessions in deload weeks are not counted.
+        first_monday, first_week, schedule = self.split_weeks(plan, starting_date)
+        if not any(schedule) or weeks < 1:
+            return
+
+        first_week_counts = count_exercises(first_week)
+        schedule_counts = [count_exercises(sessions) for sessions in schedule]
+
+        # Programs always get at least two weeks, as they did with the original day-by-day generator
+        last_week = max(weeks, 2)
+        if only_week is not None:
+            last_week = min(last_week, only_week)
+
+        # Counted sessions of each exercise type before the current week
+        done = {}
+        for week in range(1, last_week + 1):
+            if week == 1:
+                sessions, (before, total) = first_week, first_week_counts
+            else:
+                schedule_index = (week - 1) % len(schedule)
+                sessions, (before, total) = schedule[schedule_index], schedule_counts[schedule_index]
+            deload = deload_every > 0 and week % deload_every == 0
+            if only_week is None or week == only_week:
+                monday = first_monday + timedelta(7 * (week - 1))
+                for (weekday, workout), counted in zip(sessions, before):
+                    done_before = {
+                        exercise_type: done.get(exercise_type, 0) + (0 if deload else counted.get(exercise_type, 0))
+                        for exercise_type, reps_per_set in workout[1]
+                    }
+                    yield week, monday + timedelta(weekday), workout, done_before, deload
+            if not deload:
+                done = {exercise_type: done.get(exercise_type, 0) + total.get(exercise_type, 0) for exercise_type in done.keys() | total.keys()}
+
+    def count_sessions(self, plan, starting_date, weeks, skip_weeks=frozenset(), today=None):
+        # (workouts, sets, date of the first workout on or after today) of weeks 1 to weeks of the program, leaving out
+        # skip_weeks: what make_schedule would yield, without stepping through the weeks. The schedule repeats, so the
+        # totals are week 1's, plus whole schedule cycles, plus the schedule weeks of the last partial cycle.
+        first_monday, first_week, schedule = self.split_weeks(plan, starting_date)
+        if not any(schedule) or weeks < 1:
+            return 0, 0, None
+
+        def week_sessions(week):
+            return first_week if week == 1 else schedule[(week - 1) % len(schedule)]
+
+        def week_sets(sessions):
+            return sum(len(reps_per_set) for weekday, workout in sessions for exercise_type, reps_per_set in workout[1])
+
+        workout_count, set_count = len(first_week), week_sets(first_week)
+        # Week w > 1 is schedule week (w - 1) % length, so over weeks 2 to weeks each schedule week comes up once per
+        # whole cycle, and weeks 1 to remainder of it once more
+        whole_cycles, remainder = divmod(weeks - 1, len(schedule))
+        for index, sessions in enumerate(schedule):
+            repeats = whole_cycles + (1 <= index <= remainder)
+            workout_count += repeats * len(sessions)
+            set_count += repeats * week_sets(sessions)
+        for week in skip_weeks:
+            if 1 <= week <= weeks:
+                workout_count -= len(week_sessions(week))
+                set_count -= week_sets(week_sessions(week))
+
+        next_date = None
+        if today is not None:
+            # From the week today is in, past skipped weeks and schedule weeks without workouts
+            week = max(1, (today - first_monday).days // 7 + 1)
+            while next_date is None and week <= weeks:
+                if week not in skip_weeks:
+                    monday = first_monday + timedelta(7 * (week - 1))
+                    next_date = min(
+                        (monday + timedelta(weekday) for weekday, workout in week_sessions(week) if monday + timedelta(weekday) >= today),
+                        default=None
+                    )
+                week += 1
+        return workout_count, set_count, next_date
+
+    def make_dummy_program(self, program_template, starting_date, weeks, starting_weights, increments, progression=None):
+        plan = self.get_plan(program_template)
+        return self.expand_plan(plan, starting_date, weeks, starting_weights, increments, progression=progression)
+
+    def expand_plan(self, plan, starting_date, weeks, starting_weights, increments, only_week=None, progression=None):
+        # Plans and progressions stored as JSON come back as lists and dicts, which work just the same
+        progression = Progression(**progression) if progression else Progression()
         new_program = DummyProgram(
             starting_date=starting_date,
             weeks=weeks,
             starting_weights=starting_weights,
-            increments=increments
+            increments=increments,
+            progression=progression
         )
-
-        week = 1
-        first_pass = True
-        while week <= new_program.weeks:
-            while week == 1:
-                if first_pass:
-
-                    # Find first and last days of current week
-                    first_day_of_the_week = new_program.starting_date
-                    last_day_of_the_week = first_day_of_the_week
-                    while last_day_of_the_week.weekday() != 6:
-                        last_day_of_the_week += timedelta(1)
-
-                workout_date = first_day_of_the_week
-                while workout_date <= last_day_of_the_week:
-                    for workout_template in program_template.workout_templates:
-                        for day in workout_template.days:
-                            if day.id - 1 == workout_date.weekday():
-                                new_workout = self.make_dummy_workout(
-                                    workout_template=workout_template,
-                                    program=new_program,
-                                    week=week,
-                                    date=workout_date
-                                )
-                                self.update_weights(new_workout)
-                                break
-                    workout_date += timedelta(1)
-
-                # Check if any dummy workouts were created
-                if new_program.workouts:
-                    week += 1
-                else:
-                    first_day_of_the_week = last_day_of_the_week + timedelta(1)
-                    last_day_of_the_week = first_day_of_the_week + timedelta(6)
-                    first_pass = False
-
-            first_day_of_the_week = last_day_of_the_week + timedelta(1)
-            last_day_of_the_week = first_day_of_the_week + timedelta(6)
-
-            workout_date = first_day_of_the_week
-            while workout_date <= last_day_of_the_week:
-                for workout_template in program_template.workout_templates:
-                    for day in workout_template.days:
-                        if day.id - 1 == workout_date.weekday():
-                            new_workout = self.make_dummy_workout(
-                                workout_template=workout_template,
-                                program=new_program,
-                                week=week,
-                                date=workout_date
-                            )
-                            self.update_weights(new_workout)
-                            break
-                workout_date += timedelta(1)
-            week += 1
+        weights = WeightTable(starting_weights, increments, progression)
+        schedule = self.make_schedule(plan, starting_date, weeks, only_week, deload_every=progression.deload_every)
+        for week, date, workout, done, deload in schedule:
+            self.make_dummy_workout(
+                workout=workout,
+                program=new_program,
+                week=week,
+                date=date,
+                done=done,
+                weights=weights,
+                deload=deload
+            )
         return new_program
 
-    def make_dummy_workout(self, workout_template, program, week, date):
-        new_workout = DummyWorkout(
-            name=workout_template.name,
-            week=week,
-            date=date,
-            parent_program=program
-        )
-        program.workouts.append(new_workout)
-        for exercise_template in workout_template.exercise_templates:
-            new_exercise = DummyExercise(
-                exercise_type=exercise_template.type,
-            )
-            new_workout.exercises.append(new_exercise)
-            set_order = 1
-            for set_template in exercise_template.set_templates:
-                weight = program.starting_weights[new_exercise.type[0]]
-                new_set = DummySet(
-                    weight=weight,  # TODO Finesse
-                    reps=set_template.reps,
+    def make_dummy_workout(self, workout, program, week, date, done, weights, deload=False):
+        name, exercises = workout[:2]
+        workout_index = program.add_workout(name=name, week=week, date=date)
+        for exercise_type, reps_per_set in exercises:
+            program.add_exercise(exercise_type)
+            weight = weights.weight(exercise_type, done[exercise_type], deload)
+            for set_order, reps in enumerate(reps_per_set, start=1):
+                program.add_set(
+                    weight=weight,
+                    reps=reps,
                     order=set_order
                 )
-                set_order += 1
-                new_exercise.sets.append(new_set)
-        return new_workout
-
-    def update_weights(self, workout):
-        for exercise in workout.exercises:
-            workout.parent_program[0].starting_weights[exercise.type[0]] += workout.parent_program[0].increments[exercise.type[0]]
\ No newline at end of file
+        return workout_index
@@ -0,0 +1,136 @@
+import glob
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Keys are tuples of ints and strings. discard(prefix) drops every key that starts with the given tuple.
+
+
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def discard(self, prefix):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryBackend:
+    # Bounded in-process LRU. Each gunicorn worker keeps its own.
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self.entries[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key[:len(prefix)] == prefix]:
+                del self.entries[key]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class FileSystemBackend:
+    # One pickle per key, shared by every worker on the machine
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, "-".join(str(part) for part in key) + ".pickle")
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as file:
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, value):
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(file_descriptor, "wb") as file:
+            pickle.dump(value, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, self.path(key))
+
+    def discard(self, prefix):
+        pattern = os.path.join(self.directory, "-".join(str(part) for part in prefix) + "-*.pickle")
+        for path in glob.glob(pattern):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __len__(self):
+        return len(glob.glob(os.path.join(self.directory, "*.pickle")))
+
+
+def make_backend(name, max_entries=1024, directory=None):
+    if name == "memory":
+        return MemoryBackend(max_entries)
+    if name == "filesystem":
+        return FileSystemBackend(directory or os.path.join(tempfile.gettempdir(), "musqlo-cache"))
+    if name == "none":
+        return NullBackend()
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class GridCache:
+    # Read-through cache for the tables show_program builds, keyed by (program id, week, program version, user id).
+    # Bumping Program.version on every change makes older entries unreachable, and they age out of the LRU.
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_build(self, program, week, user_id, build):
+        key = (program.id, week, program.version, user_id)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = build()
+        if value is not None:
+            self.backend.set(key, value)
+        return value
+
+    def invalidate(self, program_id):
+        # Drops the local entries of a program right away. Required when a program is deleted, since SQLite can hand its
+        # id to the next program, which starts again at version 0
+        self.invalidations += 1
+        self.backend.discard((program_id,))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
@@ -1,3 +1,6 @@
+import threading
+
+# The shared exercises every user can pick; migration 0008 seeds the exerciseTypes table with them
 exercises = [
     "Bench Press",
     "Bent Over Row",
@@ -13,4 +16,65 @@ exercises = [
     "Seated Overhead Press",
     "Seated Row",
     "Squat"
-]
\ No newline at end of file
+]
+
+
+class ExerciseCatalog:
+    # Exercise type names by id, cached in this process. Types are shared (user_id NULL) or a user's own, and are
+    # never renamed, so a cached name never goes stale: ids missing from the cache are loaded on first use. The
+    # table's model needs id, name and user_id columns.
+    def __init__(self, db, type_model):
+        self.db = db
+        self.type_model = type_model
+        self.names = {}
+        self.shared = None
+        self.lock = threading.Lock()
+
+    def shared_types(self):
+        # [(id, name)] of the shared types in name order, loaded once
+        if self.shared is None:
+            rows = self.db.session.query(self.type_model.id, self.type_model.name).filter(
+                self.type_model.user_id.is_(None)).order_by(self.type_model.name).all()
+            with self.lock:
+                self.names.update(rows)
+                self.shared = [tuple(row) for row in rows]
+        return self.shared
+
+    def user_types(self, user_id):
+        # [(id, name)] of the user's own types in name order; read every time, since another process may have added one
+        rows = self.db.session.query(self.type_model.id, self.type_model.name).filter(
+            self.type_model.user_id == user_id).order_by(self.type_model.name).all()
+        with self.lock:
+            self.names.update(rows)
+        return [tuple(row) for row in rows]
+
+    def choices(self, user_id):
+        return self.shared_types() + self.user_types(user_id)
+
+    def type_ids(self, user_id=None):
+        # {name: id} of the types the user can pick: the shared ones and, given a user, their own
+        type_ids = {name: type_id for type_id, name in self.shared_types()}
+        if user_id is not None:
+            type_ids.update((name, type_id) for type_id, name in self.user_types(user_id))
+        return type_ids
+
+    def name(self, type_id):
+        name = self.names.get(type_id)
+        if name is None:
+            if self.shared is None:
+                self.shared_types()
+            name = self.names.get(type_id)
+        if name is None:
+            name = self.db.session.query(self.type_model.name).filter(self.type_model.id == type_id).scalar()
+            with self.lock:
+                self.names[type_id] = name
+        return name
+
+    def add(self, user_id, name):
+        # Adds one of the user's own types and returns its id; the caller commits
+        new_type = self.type_model(name=name, user_id=user_id)
+        self.db.session.add(new_type)
+        self.db.session.flush()
+        with self.lock:
+            self.names[new_type.id] = name
+        return new_type.id
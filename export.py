@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+
+# One exported row per set, in this column order
+EXPORT_COLUMNS = ["date", "week", "workout", "exercise", "set", "reps", "weight", "completed"]
+
+# Rows written into each chunk of a streamed export
+ROWS_PER_CHUNK = 500
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    # Send the header on its own so the download starts before the first rows are fetched
+    yield take(buffer)
+    for count, (workout_date, *values) in enumerate(rows, start=1):
+        writer.writerow([workout_date.isoformat(), *values])
+        if count % ROWS_PER_CHUNK == 0:
+            yield take(buffer)
+    yield take(buffer)
+
+
+def ndjson_chunks(rows):
+    lines = []
+    for workout_date, *values in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, [workout_date.isoformat(), *values]))))
+        if len(lines) == ROWS_PER_CHUNK:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def take(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return text
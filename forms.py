@@ -1,9 +1,18 @@
+from datetime import timedelta
 from flask_wtf import FlaskForm, Form
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, SubmitField, PasswordField, IntegerField, SelectField, SelectMultipleField, FieldList, FormField
 from wtforms.widgets import ListWidget, CheckboxInput
 from wtforms.fields.html5 import DateField
-from wtforms.validators import DataRequired
-from exercises import exercises
+from wtforms.validators import DataRequired, Optional, NumberRange, Length, ValidationError
+from importer import INTEGER_BOUNDS
+
+# Longest schedule a template can rotate through before it repeats
+MAX_SCHEDULE_WEEKS = 4
+
+# Longest program the make program form accepts. Lazy programs are stored in constant time whatever their length, but
+# their analytics and exports generate every week when read.
+MAX_PROGRAM_WEEKS = 520
 
 
 class LoginForm(FlaskForm):
@@ -43,30 +52,62 @@ class NewWorkoutForm(FlaskForm):
                 ('7', 'Sunday'),
             ],
         validators=[DataRequired()])
+    schedule_week = SelectField(
+        "Weeks",
+        choices=[(0, "Every week")] + [(week, f"Week {week} of the schedule") for week in range(1, MAX_SCHEDULE_WEEKS + 1)],
+        coerce=int,
+        default=0)
     add = SubmitField("Add")
 
 
 class AddExerciseForm(FlaskForm):
-    type = SelectField("Exercise", choices=exercises)
-    sets = IntegerField("Sets", validators=[DataRequired()])
-    reps_per_set = IntegerField("Reps per set", validators=[DataRequired()])
+    # Choices are the user's exercise catalog, set by the view
+    type = SelectField("Exercise", choices=[], coerce=int)
+    sets = IntegerField("Sets", validators=[DataRequired(), NumberRange(*INTEGER_BOUNDS["set"])])
+    reps_per_set = IntegerField("Reps per set", validators=[DataRequired(), NumberRange(*INTEGER_BOUNDS["reps"])])
     add = SubmitField("Add exercise")
 
 
+class NewExerciseTypeForm(FlaskForm):
+    name = StringField("Exercise's name", validators=[DataRequired(), Length(max=200)])
+    create = SubmitField("Create exercise")
+
+
 class SetWeightsForm(Form):
-    starting_weight = IntegerField("Starting weight", validators=[DataRequired()], render_kw={"class": "form-control"})
-    increment = IntegerField("Weight increment (per session)", validators=[DataRequired()], render_kw={"class": "form-control"})
+    starting_weight = IntegerField("Starting weight", validators=[DataRequired(), NumberRange(*INTEGER_BOUNDS["weight"])], render_kw={"class": "form-control"})
+    increment = IntegerField("Weight increment (per session)", validators=[DataRequired(), NumberRange(*INTEGER_BOUNDS["weight"])], render_kw={"class": "form-control"})
 
 
 class MakeProgramForm(FlaskForm):
     name = StringField("Program's name", validators=[DataRequired()])
-    weeks = IntegerField("Duration (in weeks)", validators=[DataRequired()])
+    weeks = IntegerField("Duration (in weeks)", validators=[DataRequired(), NumberRange(min=1, max=MAX_PROGRAM_WEEKS)])
     starting_date = DateField("Starting date", format='%Y-%m-%d', validators=[DataRequired()])
     exercises = FieldList(FormField(SetWeightsForm))
+    increment_frequency = IntegerField("Increase weights every (sessions)", default=1, validators=[Optional(), NumberRange(min=1)])
+    smallest_weight_plate = IntegerField("Round weights to a multiple of (lbs.)", default=0, validators=[Optional(), NumberRange(min=0)])
+    deload_every = IntegerField("Deload every (weeks, 0 for never)", default=0, validators=[Optional(), NumberRange(min=0)])
+    deload_percent = IntegerField("Deload by (%)", default=10, validators=[Optional(), NumberRange(min=0, max=100)])
     make = SubmitField("Make program")
 
+    def validate_starting_date(self, field):
+        # The program's last date has to be a valid date. Week 1 can start the week after the starting date, and
+        # programs are generated with at least two weeks.
+        if field.data is None or not isinstance(self.weeks.data, int) or not 1 <= self.weeks.data <= MAX_PROGRAM_WEEKS:
+            # Left to the weeks field's own errors
+            return
+        try:
+            field.data + timedelta(weeks=max(self.weeks.data, 2) + 1)
+        except OverflowError:
+            raise ValidationError("The program has to end before the year 10000.")
+
 class ChangePasswordForm(FlaskForm):
     current_password = PasswordField("Current password", validators=[DataRequired()])
     reenter = PasswordField("Re-enter", validators=[DataRequired()])
     new_password = PasswordField("New password")
     change = SubmitField("Change")
+
+
+class ImportProgramForm(FlaskForm):
+    name = StringField("Program's name", validators=[DataRequired()])
+    file = FileField("CSV file", validators=[FileRequired(), FileAllowed(["csv"], "Upload a .csv file.")])
+    upload = SubmitField("Import program")
@@ -0,0 +1,16 @@
+import os
+
+# Heroku sets WEB_CONCURRENCY from the dyno size
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+# Import the app once in the master and fork it into the workers
+preload_app = os.environ.get("GUNICORN_PRELOAD") == "1"
+
+
+def post_fork(server, worker):
+    # A preloaded app may have opened pooled connections in the master. Sockets must not be shared between
+    # processes, so every worker drops the copies it inherited and starts with an empty pool of its own. The master
+    # serves no requests, so closing its connections from here does no harm.
+    if preload_app:
+        from main import db
+        db.engine.dispose()
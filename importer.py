@@ -0,0 +1,153 @@
+import csv
+import io
+from collections import namedtuple
+from datetime import date
+from brain import DummyProgram
+from export import EXPORT_COLUMNS
+
+TRUE_VALUES = frozenset(["true", "yes", "y", "1"])
+FALSE_VALUES = frozenset(["false", "no", "n", "0", ""])
+
+# Inclusive bounds of the integer columns
+INTEGER_BOUNDS = {
+    "week": (1, 10000),
+    "set": (1, 1000),
+    "reps": (0, 10000),
+    "weight": (0, 100000),
+}
+
+# Only the first errors are kept for the report; the rest are counted
+MAX_REPORTED_ERRORS = 1000
+
+ImportedSet = namedtuple("ImportedSet", EXPORT_COLUMNS)
+
+
+def parse_integer(value, column):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{column} must be a whole number, got '{value}'")
+    low, high = INTEGER_BOUNDS[column]
+    if not low <= number <= high:
+        raise ValueError(f"{column} must be between {low} and {high}, got {number}")
+    return number
+
+
+def parse_row(values, valid_exercises):
+    raw = dict(zip(EXPORT_COLUMNS, (value.strip() for value in values)))
+    try:
+        workout_date = date.fromisoformat(raw["date"])
+    except ValueError:
+        raise ValueError(f"date must look like 2021-01-31, got '{raw['date']}'")
+    if not raw["workout"] or len(raw["workout"]) > 200:
+        raise ValueError("workout must have a name of at most 200 characters")
+    if raw["exercise"] not in valid_exercises:
+        raise ValueError(f"unknown exercise '{raw['exercise']}'")
+    completed = raw["completed"].lower()
+    if completed not in TRUE_VALUES and completed not in FALSE_VALUES:
+        raise ValueError(f"completed must be true or false, got '{raw['completed']}'")
+    return ImportedSet(
+        date=workout_date,
+        week=parse_integer(raw["week"], "week"),
+        workout=raw["workout"],
+        exercise=raw["exercise"],
+        set=parse_integer(raw["set"], "set"),
+        reps=parse_integer(raw["reps"], "reps"),
+        weight=parse_integer(raw["weight"], "weight"),
+        completed=completed in TRUE_VALUES
+    )
+
+
+class ProgramReader:
+    # Reads a program in the export's CSV format from a binary file, one row at a time, into columnar batches.
+    # Invalid rows are skipped and reported in errors as (line number, message). valid_exercises is the set of
+    # exercise names rows may use: the shared ones and the user's own (see ExerciseCatalog.type_ids).
+    def __init__(self, file, batch_size, valid_exercises):
+        self.file = file
+        self.batch_size = batch_size
+        self.valid_exercises = valid_exercises
+        self.set_count = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def read_sets(self):
+        reader = csv.reader(io.TextIOWrapper(self.file, encoding="utf-8-sig", newline=""))
+        header = [column.strip().lower() for column in next(reader, [])]
+        missing_columns = [column for column in EXPORT_COLUMNS if column not in header]
+        if missing_columns:
+            self.add_error(1, f"missing columns: {', '.join(missing_columns)}")
+            return
+        positions = [header.index(column) for column in EXPORT_COLUMNS]
+        for row in reader:
+            if not any(row):
+                continue
+            try:
+                yield reader.line_num, parse_row(
+                    [row[position] if position < len(row) else "" for position in positions], self.valid_exercises
+                )
+            except ValueError as error:
+                self.add_error(reader.line_num, str(error))
+
+    def read_exercises(self):
+        # Yields the sets of each exercise in set order. Within a workout, an exercise's rows are consecutive rows of
+        # one type, in any order, and the next exercise starts when the type changes or a set number comes up again.
+        # Exercises whose sets are not numbered 1, 2, 3... are skipped, with an error for each of their rows.
+        rows, orders = [], set()
+        for line_number, imported_set in self.read_sets():
+            if rows and (imported_set.set in orders or exercise_key(imported_set) != exercise_key(rows[0][1])):
+                yield from self.checked_exercise(rows)
+                rows, orders = [], set()
+            rows.append((line_number, imported_set))
+            orders.add(imported_set.set)
+        if rows:
+            yield from self.checked_exercise(rows)
+
+    def checked_exercise(self, rows):
+        rows.sort(key=lambda row: row[1].set)
+        if rows[-1][1].set == len(rows):
+            yield [imported_set for line_number, imported_set in rows]
+            return
+        # Set numbers are distinct, so the first one out of place is right after the missing one
+        missing = next(order for order, (line_number, imported_set) in enumerate(rows, start=1) if imported_set.set != order)
+        first = rows[0][1]
+        for line_number, imported_set in sorted(rows):
+            self.add_error(
+                line_number,
+                f"{first.exercise} in {first.workout} on {first.date.isoformat()} has no set {missing}: sets must be numbered 1, 2, 3..."
+            )
+
+    def batches(self):
+        # Yields (DummyProgram, indices of its completed sets) holding at least batch_size sets each, except the
+        # last. Rows of one workout are consecutive and a batch never splits a workout. Sets are added in set order,
+        # so each exercise's sets are numbered by their position in it, as insert_workouts saves them.
+        batch, completed_sets = None, set()
+        current_workout = None
+        for imported_sets in self.read_exercises():
+            first = imported_sets[0]
+            workout = exercise_key(first)[:3]
+            if workout != current_workout:
+                if batch is not None and batch.set_count >= self.batch_size:
+                    yield batch, completed_sets
+                    batch = None
+                if batch is None:
+                    batch, completed_sets = DummyProgram(starting_date=None, weeks=0, starting_weights={}, increments={}), set()
+                batch.add_workout(name=first.workout, week=first.week, date=first.date)
+                current_workout = workout
+            batch.add_exercise(first.exercise)
+            for imported_set in imported_sets:
+                set_index = batch.add_set(weight=imported_set.weight, reps=imported_set.reps, order=imported_set.set)
+                if imported_set.completed:
+                    completed_sets.add(set_index)
+                self.set_count += 1
+        if batch is not None:
+            yield batch, completed_sets
+
+
+def exercise_key(imported_set):
+    # The workout a row belongs to, and its exercise type
+    return imported_set.date, imported_set.week, imported_set.workout, imported_set.exercise
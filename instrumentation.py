@@ -0,0 +1,185 @@
+import threading
+import time
+import tracemalloc
+
+from flask import Response, g, has_request_context, request
+from flask import signals_available, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestMetrics:
+    __slots__ = ("started", "statements", "sql_seconds", "template_seconds", "template_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = []
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_started = None
+
+
+class EndpointMetrics:
+    __slots__ = ("requests", "buckets", "seconds", "sql_statements", "sql_seconds", "template_seconds", "peak_bytes")
+
+    def __init__(self):
+        self.requests = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.seconds = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.peak_bytes = 0
+
+
+class Instrumentation:
+    # Opt-in per-request profiling: wall time, SQL statement count and time, template render time and (with
+    # trace_allocations) peak Python allocations. Each response gets a Server-Timing header, totals per endpoint
+    # are served at /metrics in Prometheus text format, and requests slower than slow_request_ms are logged with
+    # the statements they ran.
+    def __init__(self, app=None, slow_request_ms=500, trace_allocations=False):
+        self.slow_request_ms = slow_request_ms
+        self.trace_allocations = trace_allocations
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.extra_metrics = []
+        self.logger = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.logger = app.logger
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self.after_cursor_execute)
+        # Template timing relies on Flask's signals, which need blinker
+        if signals_available:
+            before_render_template.connect(self.before_render, app)
+            template_rendered.connect(self.after_render, app)
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        app.add_url_rule("/metrics", "metrics", self.metrics)
+
+    def register(self, name, kind, description, function):
+        # Adds a single-valued metric to /metrics, read from function() at scrape time and left out when it is None
+        self.extra_metrics.append((name, kind, description, function))
+
+    # REQUEST HOOKS
+
+    def start_request(self):
+        g.request_metrics = RequestMetrics()
+        if self.trace_allocations:
+            # Peaks are process-wide, so concurrent requests in one worker share them
+            tracemalloc.reset_peak()
+
+    def finish_request(self, response):
+        metrics = g.pop("request_metrics", None)
+        if metrics is None:
+            return response
+        seconds = time.perf_counter() - metrics.started
+        peak_bytes = tracemalloc.get_traced_memory()[1] if self.trace_allocations else 0
+
+        server_timing = [
+            f"app;dur={seconds * 1000:.1f}",
+            f'db;dur={metrics.sql_seconds * 1000:.1f};desc="{len(metrics.statements)} queries"',
+            f"tpl;dur={metrics.template_seconds * 1000:.1f}",
+        ]
+        if self.trace_allocations:
+            server_timing.append(f'mem;desc="peak {peak_bytes // 1024} KiB"')
+        response.headers.add("Server-Timing", ", ".join(server_timing))
+
+        endpoint = request.endpoint or "unmatched"
+        with self.lock:
+            totals = self.endpoints.setdefault(endpoint, EndpointMetrics())
+            totals.requests += 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    totals.buckets[index] += 1
+            totals.seconds += seconds
+            totals.sql_statements += len(metrics.statements)
+            totals.sql_seconds += metrics.sql_seconds
+            totals.template_seconds += metrics.template_seconds
+            totals.peak_bytes = max(totals.peak_bytes, peak_bytes)
+
+        if seconds * 1000 >= self.slow_request_ms:
+            statements = "\n".join(f"  {duration * 1000:.1f} ms  {statement}" for statement, duration in metrics.statements)
+            self.logger.warning(
+                "Slow request: %s %s took %.1f ms (%d queries, %.1f ms in SQL)\n%s",
+                request.method, request.full_path, seconds * 1000, len(metrics.statements), metrics.sql_seconds * 1000,
+                statements
+            )
+        return response
+
+    # SQL AND TEMPLATE EVENTS
+
+    # The start time goes on the statement's execution context, which is discarded with the statement whether or not
+    # it succeeds. Statements SQLAlchemy runs without a context, such as its dialect's own checks, are not timed.
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        if has_request_context():
+            metrics = g.get("request_metrics")
+            if metrics is not None:
+                metrics.statements.append((statement, duration))
+                metrics.sql_seconds += duration
+
+    def before_render(self, sender, template, context, **extra):
+        metrics = g.get("request_metrics")
+        if metrics is not None:
+            metrics.template_started = time.perf_counter()
+
+    def after_render(self, sender, template, context, **extra):
+        metrics = g.get("request_metrics")
+        if metrics is not None and metrics.template_started is not None:
+            metrics.template_seconds += time.perf_counter() - metrics.template_started
+            metrics.template_started = None
+
+    # PROMETHEUS ENDPOINT
+
+    def metrics(self):
+        lines = []
+
+        def family(name, kind, description):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            family("musqlo_request_duration_seconds", "histogram", "Request wall time.")
+            for endpoint, totals in endpoints:
+                for bound, count in zip(DURATION_BUCKETS, totals.buckets):
+                    lines.append(f'musqlo_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'musqlo_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {totals.requests}')
+                lines.append(f'musqlo_request_duration_seconds_sum{{endpoint="{endpoint}"}} {totals.seconds}')
+                lines.append(f'musqlo_request_duration_seconds_count{{endpoint="{endpoint}"}} {totals.requests}')
+            for name, description, attribute in (
+                ("musqlo_sql_statements_total", "SQL statements executed.", "sql_statements"),
+                ("musqlo_sql_duration_seconds_total", "Time spent executing SQL.", "sql_seconds"),
+                ("musqlo_template_duration_seconds_total", "Time spent rendering templates.", "template_seconds"),
+            ):
+                family(name, "counter", description)
+                for endpoint, totals in endpoints:
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {getattr(totals, attribute)}')
+            if self.trace_allocations:
+                family("musqlo_peak_allocated_bytes", "gauge", "Largest peak of traced Python allocations in one request.")
+                for endpoint, totals in endpoints:
+                    lines.append(f'musqlo_peak_allocated_bytes{{endpoint="{endpoint}"}} {totals.peak_bytes}')
+
+        for name, kind, description, function in self.extra_metrics:
+            value = function()
+            if value is None:
+                # Not available in this configuration
+                continue
+            family(name, kind, description)
+            lines.append(f"{name} {value}")
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+
+
+class JobQueue:
+    # Runs slow work on a pool of threads in this process, tracking each job in a database table so any worker
+    # process can report its status. The table's model needs id, user_id, kind, status, result, error, created_at
+    # and finished_at columns. Jobs are lost if the process exits before they finish.
+    def __init__(self, app, db, job_model, max_workers):
+        self.app = app
+        self.db = db
+        self.job_model = job_model
+        self.max_workers = max_workers
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def submit(self, kind, user_id, function, arguments):
+        # Returns the new job's id right away. function(**arguments) runs with an app context and its own session;
+        # whatever JSON-serializable value it returns becomes the job's result.
+        job = self.job_model(kind=kind, user_id=user_id, status="queued", created_at=datetime.utcnow())
+        self.db.session.add(job)
+        self.db.session.commit()
+        self.get_executor().submit(self.run, job.id, function, arguments)
+        return job.id
+
+    def get_executor(self):
+        # Started on first use, so each gunicorn worker gets its own threads after forking
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            return self.executor
+
+    def run(self, job_id, function, arguments):
+        with self.app.app_context():
+            try:
+                self.update(job_id, status="running")
+                try:
+                    result = function(**arguments)
+                except Exception as error:
+                    self.db.session.rollback()
+                    self.app.logger.exception("Job %s failed", job_id)
+                    self.update(job_id, status="failed", error=str(error)[:500], finished_at=datetime.utcnow())
+                else:
+                    self.update(job_id, status="done", result=result, finished_at=datetime.utcnow())
+            finally:
+                self.db.session.remove()
+
+    def update(self, job_id, **values):
+        self.job_model.query.filter_by(id=job_id).update(values, synchronize_session=False)
+        self.db.session.commit()
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
@@ -0,0 +1,31 @@
+from collections import namedtuple
+
+# What the week tables need to know about a workout to link to it. Workouts of lazy programs that have not been
+# saved yet have no id and are found by their position (session) in the week instead.
+WorkoutCell = namedtuple("WorkoutCell", ["id", "name", "session"], defaults=(None,))
+
+
+def make_layers(daily_workouts):
+    # daily_workouts has one list per weekday (Monday first) of (workout cell, exercise descriptions) pairs.
+    # A layer is one table row of workouts followed by as many rows as its longest workout has exercises; empty
+    # cells are 0.
+    most_workouts_in_one_day = max((len(workouts) for workouts in daily_workouts), default=0)
+
+    workout_layers = []
+    exercise_layers = []
+    for num in range(most_workouts_in_one_day):
+        layer = [workouts[num] if num < len(workouts) else None for workouts in daily_workouts]
+        workout_layers.append([element[0] if element else 0 for element in layer])
+
+        most_exercises_in_layer = max((len(element[1]) for element in layer if element), default=0)
+        exercise_layer = []
+        for row_number in range(most_exercises_in_layer):
+            row = []
+            for element in layer:
+                if element and row_number < len(element[1]):
+                    row.append(element[1][row_number])
+                else:
+                    row.append(0)
+            exercise_layer.append(row)
+        exercise_layers.append(exercise_layer)
+    return workout_layers, exercise_layers
@@ -1,15 +1,28 @@
-from flask import Flask, render_template, redirect, url_for, flash, abort, jsonify
+from flask import Flask, render_template, redirect, url_for, flash, abort, jsonify, g, request, Response, stream_with_context
 from flask_bootstrap import Bootstrap
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
 from flask_login import UserMixin, login_user, LoginManager, login_required, current_user, logout_user
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean
-from sqlalchemy.orm import relationship
-from forms import LoginForm, RegisterForm, NewProgramForm, NewWorkoutForm, AddExerciseForm, MakeProgramForm, ChangePasswordForm
-from brain import Brain
-from datetime import timedelta
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Boolean, Float, JSON, Index, func, text, case, select, true, bindparam
+from sqlalchemy.orm import relationship, selectinload, contains_eager
+from forms import LoginForm, RegisterForm, NewProgramForm, NewWorkoutForm, AddExerciseForm, NewExerciseTypeForm, MakeProgramForm, ChangePasswordForm, ImportProgramForm
+from brain import Brain, SetView
+from layers import WorkoutCell, make_layers
+from cache import GridCache, make_backend
+from instrumentation import Instrumentation
+from export import csv_chunks, ndjson_chunks
+from importer import ProgramReader
+from jobs import JobQueue
+from exercises import ExerciseCatalog
+from pooling import pool_options, pool_stats
+from api import conditional_json, workout_data, parse_set_updates
+from analytics import SummaryRow, generated_summary_rows, progression_data, tonnage_data
+from datetime import date, timedelta
 from wtforms.fields import Label
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import secure_filename
 from functools import wraps
+from itertools import groupby
 from dotenv import load_dotenv
 import os
 
@@ -22,10 +35,56 @@ Bootstrap(app)
 # CONNECT TO DATABASE
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL", "sqlite:///workout.db")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_options(app.config['SQLALCHEMY_DATABASE_URI'], os.environ)
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith(("postgres://", "postgresql")):
+    # Send executemany() batches to Postgres as multi-row VALUES statements
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']["executemany_mode"] = "values"
 db = SQLAlchemy(app)
+# SQLite can't alter most columns in place, so migrations copy the table instead
+migrate = Migrate(app, db, render_as_batch=True)
 
 # CREATE BRAIN
-brain = Brain()
+app.config['PLAN_CACHE_SIZE'] = int(os.environ.get("PLAN_CACHE_SIZE", 256))
+brain = Brain(plan_cache_size=app.config['PLAN_CACHE_SIZE'])
+# Lazy programs store the Brain's inputs and generate each week when it is viewed, saving it only once it is edited
+app.config['LAZY_PROGRAMS'] = os.environ.get("LAZY_PROGRAMS") == "1"
+# Generate and insert eager programs on background threads instead of in the request
+app.config['ASYNC_JOBS'] = os.environ.get("ASYNC_JOBS") == "1"
+app.config['JOB_WORKERS'] = int(os.environ.get("JOB_WORKERS", 2))
+# Keep each program's analytics in the exerciseSummaries table, refreshed week by week as the program is edited
+app.config['ANALYTICS_SUMMARY'] = os.environ.get("ANALYTICS_SUMMARY") == "1"
+
+# CREATE WEEK TABLE CACHE
+app.config['GRID_CACHE'] = os.environ.get("GRID_CACHE", "memory")
+app.config['GRID_CACHE_SIZE'] = int(os.environ.get("GRID_CACHE_SIZE", 1024))
+app.config['GRID_CACHE_DIR'] = os.environ.get("GRID_CACHE_DIR")
+grid_cache = GridCache(make_backend(
+    app.config['GRID_CACHE'],
+    max_entries=app.config['GRID_CACHE_SIZE'],
+    directory=app.config['GRID_CACHE_DIR']
+))
+
+# INSTRUMENTATION (OPT-IN)
+app.config['INSTRUMENTATION'] = os.environ.get("INSTRUMENTATION") == "1"
+if app.config['INSTRUMENTATION']:
+    instrumentation = Instrumentation(
+        app,
+        slow_request_ms=float(os.environ.get("SLOW_REQUEST_MS", 500)),
+        trace_allocations=os.environ.get("INSTRUMENTATION_TRACEMALLOC") == "1"
+    )
+    instrumentation.register("musqlo_grid_cache_hits_total", "counter", "Week table cache hits.", lambda: grid_cache.hits)
+    instrumentation.register("musqlo_grid_cache_misses_total", "counter", "Week table cache misses.", lambda: grid_cache.misses)
+    instrumentation.register("musqlo_grid_cache_entries", "gauge", "Week tables in the cache.", lambda: len(grid_cache.backend))
+    instrumentation.register("musqlo_plan_cache_hits_total", "counter", "Template plan cache hits.", lambda: brain.plan_hits)
+    instrumentation.register("musqlo_plan_cache_misses_total", "counter", "Template plan cache misses.", lambda: brain.plan_misses)
+    instrumentation.register("musqlo_db_pool_checked_out", "gauge", "Database connections in use.",
+                             lambda: pool_stats(db.engine.pool)["checked_out"])
+    instrumentation.register("musqlo_db_pool_checkouts_total", "counter", "Database connection checkouts.",
+                             lambda: pool_stats(db.engine.pool).get("checkouts"))
+    instrumentation.register("musqlo_db_pool_timeouts_total", "counter", "Checkouts that gave up waiting for a connection.",
+                             lambda: pool_stats(db.engine.pool).get("timeouts"))
+    instrumentation.register("musqlo_db_pool_wait_seconds_total", "counter", "Time spent getting database connections.",
+                             lambda: pool_stats(db.engine.pool).get("wait_seconds"))
 
 # LOGIN MANAGER
 login_manager = LoginManager()
@@ -55,9 +114,10 @@ class User(UserMixin, db.Model):
 class ProgramTemplate(db.Model):
     __tablename__ = "programTemplates"
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     user = relationship("User", back_populates="program_templates")
     name = Column(String(250), nullable=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     workout_templates = relationship("WorkoutTemplate", back_populates="parent_program_template")
 
 
@@ -65,7 +125,9 @@ class WorkoutTemplate(db.Model):
     __tablename__ = "workoutTemplates"
     id = Column(Integer, primary_key=True)
     name = Column(String(250), nullable=False)
-    program_template_id = Column(Integer, ForeignKey("programTemplates.id"))
+    program_template_id = Column(Integer, ForeignKey("programTemplates.id"), index=True)
+    # 0 for every week, or the week of the template's multi-week schedule the workout is on
+    schedule_week = Column(Integer, nullable=False, default=0, server_default="0")
     parent_program_template = relationship("ProgramTemplate", back_populates="workout_templates")
     exercise_templates = relationship("ExerciseTemplate", back_populates="parent_workout_template")
     days = relationship('Day',
@@ -94,143 +156,195 @@ class WorkoutDay(db.Model):
         primary_key=True)
 
 
+class ExerciseType(db.Model):
+    # Shared exercises have no user_id; the others belong to the user who added them. Ids are never reused, so the
+    # exercise catalog can cache names by id.
+    __tablename__ = "exerciseTypes"
+    __table_args__ = (
+        Index("ix_exerciseTypes_user_id_name", "user_id", "name", unique=True),
+        {"sqlite_autoincrement": True}
+    )
+    id = Column(Integer, primary_key=True)
+    name = Column(String(200), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+
+
 class ExerciseTemplate(db.Model):
     __tablename__ = "exerciseTemplates"
     id = Column(Integer, primary_key=True)
-    type = Column(String(200), nullable=False)
-    workout_template_id = Column(Integer, ForeignKey("workoutTemplates.id"))
+    type_id = Column(Integer, ForeignKey("exerciseTypes.id"), nullable=False, index=True)
+    workout_template_id = Column(Integer, ForeignKey("workoutTemplates.id"), index=True)
+    # Every set of an exercise template has the same reps
+    set_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reps = Column(Integer, nullable=False, default=0, server_default="0")
     parent_workout_template = relationship("WorkoutTemplate", back_populates="exercise_templates")
-    set_templates = relationship("SetTemplate", back_populates="parent_exercise_template")
-
 
-class SetTemplate(db.Model):
-    __tablename__ = "setTemplates"
-    id = Column(Integer, primary_key=True)
-    reps = Column(Integer, nullable=False)
-    exercise_id = Column(Integer, ForeignKey("exerciseTemplates.id"))
-    parent_exercise_template = relationship("ExerciseTemplate", back_populates="set_templates")
+    @property
+    def type(self):
+        return exercise_catalog.name(self.type_id)
 
 
 class Program(db.Model):
     __tablename__ = "programs"
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     user = relationship("User", back_populates="programs")
     name = Column(String(200), nullable=False)
     weeks = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set only for lazy programs: the Brain plan and progression the weeks are generated from, and the weeks that
+    # have been saved as workouts
+    plan = Column(JSON)
+    starting_date = Column(Date)
+    starting_weights = Column(JSON)
+    increments = Column(JSON)
+    progression = Column(JSON)
+    materialized_weeks = Column(JSON)
+    # The version the program's exerciseSummaries rows were computed at, if it has any
+    analytics_version = Column(Integer)
     workouts = relationship("Workout", back_populates="parent_program")
 
+    @property
+    def is_lazy(self):
+        return self.plan is not None
+
 
 class Workout(db.Model):
     __tablename__ = "workouts"
+    # Serves show_program's (program_id, week) lookup in date order, and every program_id filter on its own
+    __table_args__ = (Index("ix_workouts_program_id_week_date", "program_id", "week", "date"),)
     id = Column(Integer, primary_key=True)
     name = Column(String(200), nullable=False)
     week = Column(Integer, nullable=False)
     date = Column(Date, nullable=False)
     program_id = Column(Integer, ForeignKey("programs.id"))
     parent_program = relationship("Program", back_populates="workouts")
-    exercises = relationship("Exercise", back_populates="parent_workout")
+    exercises = relationship("Exercise", back_populates="parent_workout", order_by="Exercise.id")
 
 
 class Exercise(db.Model):
     __tablename__ = "exercises"
     id = Column(Integer, primary_key=True)
-    type = Column(String(200), nullable=False)
-    workout_id = Column(Integer, ForeignKey("workouts.id"))
+    type_id = Column(Integer, ForeignKey("exerciseTypes.id"), nullable=False, index=True)
+    workout_id = Column(Integer, ForeignKey("workouts.id"), index=True)
+    # Sets 1 to set_count are done for reps at weight, except where set_rows has a row for the set
+    set_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reps = Column(Integer, nullable=False, default=0, server_default="0")
+    weight = Column(Integer, nullable=False, default=0, server_default="0")
     parent_workout = relationship("Workout", back_populates="exercises")
-    sets = relationship("Set", back_populates="parent_exercise")
+    set_rows = relationship("Set", back_populates="parent_exercise", order_by="Set.order")
+
+    @property
+    def type(self):
+        return exercise_catalog.name(self.type_id)
+
+    @property
+    def sets(self):
+        saved_sets = {set.order: set for set in self.set_rows}
+        return [
+            saved_sets.get(order) or SetView(weight=self.weight, reps=self.reps, order=order)
+            for order in range(1, self.set_count + 1)
+        ]
 
 
 class Set(db.Model):
+    # Only for the sets of an exercise that differ from its prescription or have been completed
     __tablename__ = "sets"
+    __table_args__ = (Index("ix_sets_exercise_id_order", "exercise_id", "order", unique=True),)
     id = Column(Integer, primary_key=True)
     weight = Column(Integer, nullable=False)
     reps = Column(Integer, nullable=False)
     order = Column(Integer, nullable=False)
     completed = Column(Boolean, nullable=False)
     exercise_id = Column(Integer, ForeignKey("exercises.id"))
-    parent_exercise = relationship("Exercise", back_populates="sets")
+    parent_exercise = relationship("Exercise", back_populates="set_rows")
+
+
+class ExerciseSummary(db.Model):
+    # A program's analytics.SummaryRow rows, stored when ANALYTICS_SUMMARY is on
+    __tablename__ = "exerciseSummaries"
+    # One row per session and exercise type; also serves the program_id and (program_id, week) lookups
+    __table_args__ = (
+        Index("ix_exerciseSummaries_program_id_week_date_type_id", "program_id", "week", "date", "type_id", unique=True),
+    )
+    id = Column(Integer, primary_key=True)
+    program_id = Column(Integer, ForeignKey("programs.id"))
+    week = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    type_id = Column(Integer, ForeignKey("exerciseTypes.id"), nullable=False, index=True)
+    tonnage = Column(Integer, nullable=False)
+    completed_tonnage = Column(Integer, nullable=False)
+    top_weight = Column(Integer)
+    completed_top_weight = Column(Integer)
+    e1rm = Column(Float)
+    completed_e1rm = Column(Float)
+
+
+class Job(db.Model):
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    kind = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)  # queued, running, done or failed
+    result = Column(JSON)
+    error = Column(String(500))
+    created_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
 
-# # CREATE TABLES THEN COMMENT OUT
-# db.create_all()
-#
-# # POPULATE DAYS TABLE THEN COMMENT OUT
-# days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-# for day in days:
-#     new_day = Day(name=day)
-#     db.session.add(new_day)
-# db.session.commit()
+
+# CREATE JOB QUEUE
+job_queue = JobQueue(app, db, Job, max_workers=app.config['JOB_WORKERS'])
+
+# CREATE EXERCISE CATALOG
+exercise_catalog = ExerciseCatalog(db, ExerciseType)
+
+# CREATE TABLES AND POPULATE DAYS TABLE: flask db upgrade (see migrations/)
 
 
 # USER AUTHENTICATION
 
 
-def protect_program_template(f):
-    @wraps(f)
-    def decorated_function(program_template_id, *args, **kwargs):
-        requested_program_template = ProgramTemplate.query.get(program_template_id)
-        if requested_program_template.user_id != current_user.id:
-            return abort(403)
-        return f(program_template_id, *args, **kwargs)
-    return decorated_function
-
-def protect_exercise_template(f):
-    @wraps(f)
-    def decorated_function(exercise_template_id, *args, **kwargs):
-        requested_exercise_template = ExerciseTemplate.query.get(exercise_template_id)
-        if requested_exercise_template.parent_workout_template.parent_program_template.user_id != current_user.id:
-            return abort(403)
-        return f(exercise_template_id, *args, **kwargs)
-    return decorated_function
-
-def protect_workout_template(f):
-    @wraps(f)
-    def decorated_function(workout_template_id, *args, **kwargs):
-        requested_workout_template = WorkoutTemplate.query.get(workout_template_id)
-        if requested_workout_template.parent_program_template.user_id != current_user.id:
-            return abort(403)
-        return f(workout_template_id, *args, **kwargs)
-    return decorated_function
-
-
-def protect_program(f):
-    @wraps(f)
-    def decorated_function(program_id, *args, **kwargs):
-        requested_program = Program.query.get(program_id)
-        if requested_program.user_id != current_user.id:
-            return abort(403)
-        return f(program_id, *args, **kwargs)
-    return decorated_function
-
-
-def protect_program_week(f):
-    @wraps(f)
-    def decorated_function(program_id, week, *args, **kwargs):
-        requested_program = Program.query.get(program_id)
-        if requested_program.user_id != current_user.id:
-            return abort(403)
-        return f(program_id, week, *args, **kwargs)
-    return decorated_function
-
-
-def protect_workout(f):
-    @wraps(f)
-    def decorated_function(workout_id, *args, **kwargs):
-        requested_workout = Workout.query.get(workout_id)
-        if requested_workout.parent_program.user_id != current_user.id:
-            return abort(403)
-        return f(workout_id, *args, **kwargs)
-    return decorated_function
-
-
-def protect_workout_week(f):
-    @wraps(f)
-    def decorated_function(workout_id, week, *args, **kwargs):
-        requested_workout = Workout.query.get(workout_id)
-        if requested_workout.parent_program.user_id != current_user.id:
-            return abort(403)
-        return f(workout_id, week, *args, **kwargs)
-    return decorated_function
+def protect(argument, model, *path, load=()):
+    # Loads the object named by the view's <argument> together with the parents in path, up to the one holding
+    # user_id, in a single joined query. The view finds it in flask.g under the argument's name minus "_id".
+    owner_loader = None
+    for relationship_attribute in path:
+        owner_loader = contains_eager(relationship_attribute) if owner_loader is None else owner_loader.contains_eager(relationship_attribute)
+    options = ([owner_loader] if owner_loader is not None else []) + list(load)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_user.is_authenticated:
+                return login_manager.unauthorized()
+            query = model.query
+            for relationship_attribute in path:
+                query = query.join(relationship_attribute)
+            requested_object = query.options(*options).filter(model.id == kwargs[argument]).first()
+            if requested_object is None:
+                return abort(404)
+            owner = requested_object
+            for relationship_attribute in path:
+                owner = getattr(owner, relationship_attribute.key)
+            if owner.user_id != current_user.id:
+                return abort(403)
+            setattr(g, argument[:-len("_id")], requested_object)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+protect_program_template = protect("program_template_id", ProgramTemplate)
+protect_workout_template = protect("workout_template_id", WorkoutTemplate, WorkoutTemplate.parent_program_template)
+protect_exercise_template = protect(
+    "exercise_template_id",
+    ExerciseTemplate,
+    ExerciseTemplate.parent_workout_template,
+    WorkoutTemplate.parent_program_template
+)
+protect_program = protect("program_id", Program)
+protect_workout = protect("workout_id", Workout, Workout.parent_program)
+
 
 @app.route("/", methods=["GET", "POST"])
 def home():
@@ -311,11 +425,13 @@ def logout():
 # SHOW
 
 
+# Templates and programs listed per dashboard page
+DASHBOARD_PAGE_SIZE = 20
+
+
 @app.route("/dashboard", methods=["GET", "POST"])
 @login_required
 def dashboard():
-    all_templates = ProgramTemplate.query.filter(ProgramTemplate.user_id == current_user.id).all()
-    all_programs = Program.query.filter(Program.user_id == current_user.id).all()
     new_program_form = NewProgramForm()
     if new_program_form.validate_on_submit():
         new_program_template = ProgramTemplate(
@@ -325,74 +441,138 @@ def dashboard():
         db.session.add(new_program_template)
         db.session.commit()
         return redirect(url_for("show_program_template", program_template_id=new_program_template.id))
-    return render_template("dashboard.html", templates=all_templates, programs=all_programs, form=new_program_form)
+
+    # Each list is paged by id: ?templates_after=<id> and ?programs_after=<id> start after the last one shown
+    templates_after = request.args.get("templates_after", 0, type=int)
+    programs_after = request.args.get("programs_after", 0, type=int)
+    templates, next_templates_after = keyset_page(
+        db.session.query(
+            ProgramTemplate.id,
+            ProgramTemplate.name,
+            select([func.count(WorkoutTemplate.id)]).where(
+                WorkoutTemplate.program_template_id == ProgramTemplate.id
+            ).correlate(ProgramTemplate).label("workout_count")
+        ).filter(ProgramTemplate.user_id == current_user.id),
+        ProgramTemplate.id, templates_after
+    )
+    programs, next_programs_after = keyset_page(
+        Program.query.filter(Program.user_id == current_user.id), Program.id, programs_after
+    )
+    return render_template(
+        "dashboard.html",
+        templates=templates,
+        programs=zip(programs, program_summaries(programs)),
+        templates_after=templates_after,
+        programs_after=programs_after,
+        next_templates_after=next_templates_after,
+        next_programs_after=next_programs_after,
+        form=new_program_form
+    )
+
+
+def keyset_page(query, id_column, after):
+    # Returns the first DASHBOARD_PAGE_SIZE rows with ids above after, in id order, and the id to continue after, or
+    # None on the last page. The index on the owner's user_id keeps its rows in id order, so a page costs the same
+    # however far in it is.
+    rows = query.filter(id_column > after).order_by(id_column).limit(DASHBOARD_PAGE_SIZE + 1).all()
+    if len(rows) > DASHBOARD_PAGE_SIZE:
+        return rows[:DASHBOARD_PAGE_SIZE], rows[DASHBOARD_PAGE_SIZE - 1].id
+    return rows, None
+
+
+def program_summaries(programs):
+    # Workouts, sets, completed sets and the next workout's date of each program, in the order given. Saved workouts
+    # are counted with one grouped query; the weeks of lazy programs that are not saved are counted from their plan,
+    # at a cost that doesn't grow with the program's length.
+    today = date.today()
+    completed_sets = select([func.count(Set.id)]).where(
+        (Set.exercise_id == Exercise.id) & (Set.completed == true())
+    ).correlate(Exercise).as_scalar()
+    rows = db.session.query(
+        Workout.program_id,
+        func.count(func.distinct(Workout.id)),
+        func.coalesce(func.sum(Exercise.set_count), 0),
+        func.coalesce(func.sum(completed_sets), 0),
+        func.min(case([(Workout.date >= today, Workout.date)]))
+    ).outerjoin(
+        Exercise, Exercise.workout_id == Workout.id
+    ).filter(
+        Workout.program_id.in_([program.id for program in programs])
+    ).group_by(Workout.program_id).all() if programs else []
+    saved = {program_id: values for program_id, *values in rows}
+
+    summaries = []
+    for program in programs:
+        workout_count, set_count, completed_count, next_date = saved.get(program.id, (0, 0, 0, None))
+        if program.is_lazy:
+            generated_workouts, generated_sets, generated_next_date = brain.count_sessions(
+                program.plan, program.starting_date, program.weeks, frozenset(program.materialized_weeks), today)
+            workout_count += generated_workouts
+            set_count += generated_sets
+            if generated_next_date is not None and (next_date is None or generated_next_date < next_date):
+                next_date = generated_next_date
+        summaries.append({
+            "workouts": workout_count,
+            "sets": set_count,
+            "completed_sets": completed_count,
+            "progress": round(100 * completed_count / set_count) if set_count else 0,
+            "next_date": next_date
+        })
+    return summaries
 
 
 @app.route("/program-templates/<int:program_template_id>", methods=["GET", "POST"])
 @protect_program_template
 def show_program_template(program_template_id):
-    current_program_template = ProgramTemplate.query.get(program_template_id)
+    current_program_template = g.program_template
 
     # TABLE DATA
 
-    daily_workouts = []
-    most_workouts_in_one_day = 0
-    for day_id in range(1, 8):
-        day = Day.query.get(day_id)
-        workouts = [workout_template for workout_template in current_program_template.workout_templates if day in workout_template.days]
-        daily_workouts.append(workouts)
-        if len(workouts) > most_workouts_in_one_day:
-            most_workouts_in_one_day = len(workouts)
-
-    workout_layers = []
-    for num in range(most_workouts_in_one_day):
-        workout_layer = []
-        for workouts in daily_workouts:
-            try:
-                new_workout = workouts[num]
-            except IndexError:
-                workout_layer.append(0)
-            else:
-                workout_layer.append(new_workout)
-        workout_layers.append(workout_layer)
-
-    exercise_layers = []
-    for workout_layer in workout_layers:
-        most_exercises_in_layer = 0
-        for element in workout_layer:
-            if isinstance(element, WorkoutTemplate):
-                if len(element.exercise_templates) > most_exercises_in_layer:
-                    most_exercises_in_layer = len(element.exercise_templates)
-
-        exercise_layer = []
-        for row_number in range(most_exercises_in_layer):
-            row = []
-            for day_number in range(7):
-                element = workout_layer[day_number]
-                if isinstance(element, WorkoutTemplate):
-                    try:
-                        new_exercise = element.exercise_templates[row_number]
-                    except IndexError:
-                        row.append(0)
-                    else:
-                        row.append(f"{new_exercise.type} {len(new_exercise.set_templates)} x {new_exercise.set_templates[0].reps}")
-                else:
-                    row.append(0)
-            exercise_layer.append(row)
-        exercise_layers.append(exercise_layer)
+    # One row per (weekday, workout template, exercise template) with the exercise's set count and reps
+    grid_rows = db.session.query(
+        WorkoutDay.day_id,
+        WorkoutTemplate.id,
+        WorkoutTemplate.name,
+        WorkoutTemplate.schedule_week,
+        ExerciseTemplate.id,
+        ExerciseTemplate.type_id,
+        ExerciseTemplate.set_count,
+        ExerciseTemplate.reps
+    ).select_from(WorkoutTemplate).join(
+        WorkoutDay, WorkoutDay.workout_id == WorkoutTemplate.id
+    ).outerjoin(
+        ExerciseTemplate, ExerciseTemplate.workout_template_id == WorkoutTemplate.id
+    ).filter(
+        WorkoutTemplate.program_template_id == program_template_id
+    ).order_by(
+        WorkoutDay.day_id, WorkoutTemplate.id, ExerciseTemplate.id
+    ).all()
+
+    daily_workouts = [[] for _ in range(7)]
+    for day_id, workout_template_id, workout_template_name, schedule_week, exercise_template_id, type_id, number_of_sets, reps in grid_rows:
+        workouts = daily_workouts[day_id - 1]
+        if not workouts or workouts[-1][0].id != workout_template_id:
+            if schedule_week:
+                workout_template_name = f"{workout_template_name} (week {schedule_week})"
+            workouts.append((WorkoutCell(workout_template_id, workout_template_name), []))
+        if exercise_template_id is not None:
+            workouts[-1][1].append(f"{exercise_catalog.name(type_id)} {number_of_sets} x {reps or 0}")
+    workout_layers, exercise_layers = make_layers(daily_workouts)
 
     # FORM FUNCTIONALITY
 
     new_workout_form = NewWorkoutForm()
     if new_workout_form.validate_on_submit():
         day_ids = new_workout_form.days.data
-        selected_days = [Day.query.get(day_id) for day_id in day_ids]
+        selected_days = Day.query.filter(Day.id.in_(day_ids)).all()
         new_workout_template = WorkoutTemplate(
             name=new_workout_form.name.data,
+            schedule_week=new_workout_form.schedule_week.data,
             parent_program_template=current_program_template,
             days=selected_days
         )
         db.session.add(new_workout_template)
+        touch_program_template(program_template_id)
         db.session.commit()
         return redirect(url_for('show_workout_template', workout_template_id=new_workout_template.id))
     return render_template("show-program-template.html",
@@ -406,62 +586,98 @@ def show_program_template(program_template_id):
 @app.route("/workout-templates/<int:workout_template_id>", methods=["GET", "POST"])
 @protect_workout_template
 def show_workout_template(workout_template_id):
-    current_workout_template = WorkoutTemplate.query.get(workout_template_id)
+    current_workout_template = g.workout_template
     add_exercise_form = AddExerciseForm()
-    if add_exercise_form.validate_on_submit():
+    add_exercise_form.type.choices = exercise_catalog.choices(current_user.id)
+    new_exercise_type_form = NewExerciseTypeForm()
+    if new_exercise_type_form.create.data:
+        if new_exercise_type_form.validate_on_submit():
+            name = new_exercise_type_form.name.data.strip()
+            if name in exercise_catalog.type_ids(current_user.id):
+                flash(f"There already is an exercise called {name}.")
+            else:
+                exercise_catalog.add(current_user.id, name)
+                db.session.commit()
+            return redirect(url_for("show_workout_template", workout_template_id=current_workout_template.id))
+    elif add_exercise_form.validate_on_submit():
         new_exercise_template = ExerciseTemplate(
-            type=add_exercise_form.type.data,
+            type_id=add_exercise_form.type.data,
+            set_count=add_exercise_form.sets.data,
+            reps=add_exercise_form.reps_per_set.data,
             parent_workout_template=current_workout_template)
         db.session.add(new_exercise_template)
+        touch_program_template(current_workout_template.program_template_id)
         db.session.commit()
-
-        number_of_sets = add_exercise_form.sets.data
-        reps_per_set = add_exercise_form.reps_per_set.data
-        for num in range(number_of_sets):
-            new_set_template = SetTemplate(
-                reps=reps_per_set,
-                parent_exercise_template=new_exercise_template
-            )
-            db.session.add(new_set_template)
-            db.session.commit()
-
         return redirect(url_for("show_workout_template", workout_template_id=current_workout_template.id))
-    return render_template("show-workout-template.html", workout=current_workout_template, form=add_exercise_form)
+    return render_template("show-workout-template.html", workout=current_workout_template, form=add_exercise_form,
+                           new_exercise_type_form=new_exercise_type_form)
 
 @app.route("/programs/<int:program_id>/week/<int:week>", methods=["GET", "POST"])
-@protect_program_week
+@protect_program
 def show_program(program_id, week):
-    current_program = Program.query.get(program_id)
+    current_program = g.program
+    # Lazy programs generate any week asked for, so weeks past the end are turned away before anything is built
+    if current_program.is_lazy and not 1 <= week <= current_program.weeks:
+        return redirect(url_for('show_program', program_id=program_id, week=current_program.weeks))
+    week_tables = grid_cache.get_or_build(
+        program=current_program,
+        week=week,
+        user_id=current_user.id,
+        build=lambda: make_week_tables(current_program, week)
+    )
 
     # CHECK IF CURRENT_WEEK HAS WORKOUTS
-    earliest_workout_in_week = Workout.query.filter_by(parent_program=current_program, week=week).order_by(
-        Workout.date).first()
-
-    if not earliest_workout_in_week:
-        earliest_workout_in_program = Workout.query.filter_by(parent_program=current_program).order_by(Workout.date).first()
-        if not earliest_workout_in_program:
+    if not week_tables:
+        # Deleting workouts keeps weeks numbered without gaps, so an empty week is past the end of the program
+        last_week = db.session.query(func.max(Workout.week)).filter(Workout.program_id == program_id).scalar()
+        if last_week is None:
             return redirect(url_for('delete_program', program_id=current_program.id))
-        last_workout_in_program = Workout.query.filter_by(parent_program=current_program).order_by(Workout.date.desc()).first()
-        first_week = earliest_workout_in_program.week
-        last_week = last_workout_in_program.week
-
-        # UPDATE WEEKS AND REFRESH
-        current_week = first_week
-        week_update = 1
-        while current_week <= last_week:
-            workouts_in_week = Workout.query.filter_by(parent_program=current_program, week=current_week).all()
-            if workouts_in_week:
-                for workout in workouts_in_week:
-                    setattr(workout, "week", week_update)
-                week_update += 1
-            current_week += 1
-        setattr(current_program, "weeks", current_week - 1)
-        db.session.commit()
         return redirect(url_for('show_program', program_id=program_id, week=last_week))
 
+    return render_template("show-program.html",
+                           program=current_program,
+                           weeks=current_program.weeks,
+                           current_week=week,
+                           **week_tables
+                           )
+
+
+def generate_week(program, week):
+    return brain.expand_plan(
+        plan=program.plan,
+        starting_date=program.starting_date,
+        weeks=program.weeks,
+        starting_weights=program.starting_weights,
+        increments=program.increments,
+        only_week=week,
+        progression=program.progression
+    )
+
+
+def is_materialized(program, week):
+    return not program.is_lazy or week in program.materialized_weeks
+
+
+def load_week_workouts(program_id, week):
+    # LOAD THE WEEK'S WORKOUTS, EXERCISES AND SETS IN THREE QUERIES
+    return Workout.query.filter_by(program_id=program_id, week=week).order_by(Workout.date, Workout.id).options(
+        selectinload(Workout.exercises).selectinload(Exercise.set_rows)).all()
+
+
+def make_week_tables(program, week):
+    if not is_materialized(program, week):
+        return make_generated_week_tables(program, week)
+
+    workouts_in_week = load_week_workouts(program.id, week)
+    if not workouts_in_week:
+        if program.is_lazy:
+            # Lazy programs keep their weeks even when the user has deleted every workout in one
+            return make_generated_week_tables(program, week, daily_workouts=[[] for _ in range(7)])
+        return None
+
     # TABLE HEAD DATA
 
-    first_day_of_week = earliest_workout_in_week.date
+    first_day_of_week = workouts_in_week[0].date
     while first_day_of_week.weekday() != 0:
         first_day_of_week -= timedelta(1)
 
@@ -469,92 +685,229 @@ def show_program(program_id, week):
 
     # TABLE BODY DATA
 
-    most_workouts_in_one_day = 0
-    daily_workouts = []
-    for day in range(7):
-        workouts = [workout for workout in current_program.workouts if workout.week == week and workout.date.weekday() == day]
-        if len(workouts) > most_workouts_in_one_day:
-            most_workouts_in_one_day = len(workouts)
-        daily_workouts.append(workouts)
-
-    workout_layers = []
-    for num in range(most_workouts_in_one_day):
-        workout_layer = []
-        for workouts in daily_workouts:
-            try:
-                new_workout = workouts[num]
-            except IndexError:
-                workout_layer.append(0)
-            else:
-                workout_layer.append(new_workout)
-        workout_layers.append(workout_layer)
-
-    exercise_layers = []
-    for workout_layer in workout_layers:
-        most_exercises_in_layer = 0
-        for element in workout_layer:
-            if isinstance(element, Workout):
-                if len(element.exercises) > most_exercises_in_layer:
-                    most_exercises_in_layer = len(element.exercises)
-
-        exercise_layer = []
-        for row_number in range(most_exercises_in_layer):
-            row = []
-            for day_number in range(7):
-                element = workout_layer[day_number]
-                if isinstance(element, Workout):
-                    try:
-                        new_exercise = element.exercises[row_number]
-                    except IndexError:
-                        row.append(0)
-                    else:
-                        exercise_weights = [set.weight for set in new_exercise.sets]
-                        row.append(f"{new_exercise.type} {max(exercise_weights)} lbs. (max)")
-                else:
-                    row.append(0)
-            exercise_layer.append(row)
-        exercise_layers.append(exercise_layer)
+    daily_workouts = [[] for _ in range(7)]
+    for workout in workouts_in_week:
+        exercise_descriptions = [
+            f"{exercise.type} {max(set.weight for set in exercise.sets)} lbs. (max)" for exercise in workout.exercises
+        ]
+        daily_workouts[workout.date.weekday()].append((WorkoutCell(workout.id, workout.name), exercise_descriptions))
+    workout_layers, exercise_layers = make_layers(daily_workouts)
 
-    return render_template("show-program.html",
-                           days_of_the_week=days_of_the_week,
-                           program=current_program,
-                           weeks=current_program.weeks,
-                           current_week=week,
-                           workout_layers=workout_layers,
-                           exercise_layers=exercise_layers
-                           )
+    return {
+        "days_of_the_week": days_of_the_week,
+        "workout_layers": workout_layers,
+        "exercise_layers": exercise_layers
+    }
+
+
+def make_generated_week_tables(program, week, daily_workouts=None):
+    first_day_of_week = brain.week_monday(program.plan, program.starting_date, week)
+    days_of_the_week = [(first_day_of_week + timedelta(num)).strftime("%a %m/%d/%y") for num in range(7)]
+
+    if daily_workouts is None:
+        dummy_week = generate_week(program, week)
+        daily_workouts = [[] for _ in range(7)]
+        for session in range(dummy_week.workout_count):
+            workout = dummy_week.workout(session)
+            exercise_descriptions = [
+                f"{exercise.type} {max(set.weight for set in exercise.sets)} lbs. (max)" for exercise in workout.exercises
+            ]
+            daily_workouts[workout.date.weekday()].append((WorkoutCell(None, workout.name, session), exercise_descriptions))
+    workout_layers, exercise_layers = make_layers(daily_workouts)
+
+    return {
+        "days_of_the_week": days_of_the_week,
+        "workout_layers": workout_layers,
+        "exercise_layers": exercise_layers
+    }
 
 
 @app.route("/workouts/<int:workout_id>", methods=["GET", "POST"])
-@protect_workout
+@protect("workout_id", Workout, Workout.parent_program, load=[selectinload(Workout.exercises).selectinload(Exercise.set_rows)])
 def show_workout(workout_id):
-    requested_workout = Workout.query.get(workout_id)
-    return render_template("show-workout.html", workout=requested_workout)
+    requested_workout = g.workout
+    return render_template("show-workout.html",
+                           workout=requested_workout,
+                           program=requested_workout.parent_program,
+                           delete_url=url_for('delete_workout', workout_id=requested_workout.id, week=requested_workout.week)
+                           )
+
+
+@app.route("/programs/<int:program_id>/week/<int:week>/sessions/<int:session>")
+@protect_program
+def show_session(program_id, week, session):
+    # A workout of a lazy program's week that has not been saved, by its position in the week
+    current_program = g.program
+    if is_materialized(current_program, week):
+        return redirect(url_for('show_program', program_id=program_id, week=week))
+    dummy_week = generate_week(current_program, week)
+    if session >= dummy_week.workout_count:
+        return abort(404)
+    return render_template("show-workout.html",
+                           workout=dummy_week.workout(session),
+                           program=current_program,
+                           delete_url=url_for('delete_session', program_id=program_id, week=week, session=session)
+                           )
+
+
+# EXPORT
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def program_export_rows(program):
+    # Every set of the program as (date, week, workout, exercise, set order, reps, weight, completed), fetched in
+    # batches with a server-side cursor where the database supports one, so memory stays flat however long it is
+    exercise_rows = db.session.query(
+        Workout.date,
+        Workout.week,
+        Workout.name,
+        Exercise.id,
+        Exercise.type_id,
+        Exercise.set_count,
+        Exercise.reps,
+        Exercise.weight,
+        Set.order,
+        Set.reps,
+        Set.weight,
+        Set.completed
+    ).join(
+        Exercise, Exercise.workout_id == Workout.id
+    ).outerjoin(
+        Set, Set.exercise_id == Exercise.id
+    ).filter(
+        Workout.program_id == program.id
+    ).order_by(
+        Workout.week, Workout.date, Workout.id, Exercise.id, Set.order
+    ).yield_per(EXPORT_BATCH_SIZE)
+    saved_rows = expand_exercise_rows(exercise_rows)
+    if not program.is_lazy:
+        yield from saved_rows
+        return
+
+    # Lazy programs only have rows for their saved weeks; the others are generated one week at a time
+    saved_weeks = groupby(saved_rows, key=lambda row: row[1])
+    saved_week, rows_in_saved_week = next(saved_weeks, (None, ()))
+    for week in range(1, program.weeks + 1):
+        if is_materialized(program, week):
+            if saved_week == week:
+                yield from rows_in_saved_week
+                saved_week, rows_in_saved_week = next(saved_weeks, (None, ()))
+            continue
+        for row in generate_week(program, week).rows():
+            yield (*row, False)
+
+
+def expand_exercise_rows(exercise_rows):
+    # The query returns each exercise once per saved set (or once, if it has none); fill in the prescribed sets
+    for _, rows in groupby(exercise_rows, key=lambda row: row[3]):
+        rows = list(rows)
+        workout_date, week, workout_name, _, type_id, set_count, reps, weight = rows[0][:8]
+        exercise_type = exercise_catalog.name(type_id)
+        saved_sets = {row[8]: row[9:] for row in rows if row[8] is not None}
+        for order in range(1, set_count + 1):
+            set_reps, set_weight, completed = saved_sets.get(order, (reps, weight, False))
+            yield workout_date, week, workout_name, exercise_type, order, set_reps, set_weight, completed
+
+
+def export_response(program, make_chunks, mimetype, extension):
+    filename = secure_filename(program.name) or "program"
+    response = Response(stream_with_context(make_chunks(program_export_rows(program))), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+@app.route("/programs/<int:program_id>/export.csv")
+@protect_program
+def export_program_csv(program_id):
+    return export_response(g.program, csv_chunks, "text/csv", "csv")
+
+
+@app.route("/programs/<int:program_id>/export.ndjson")
+@protect_program
+def export_program_ndjson(program_id):
+    return export_response(g.program, ndjson_chunks, "application/x-ndjson", "ndjson")
 
 
 # DELETE
 
+# Each helper deletes the rows matching its criteria and everything under them with one DELETE per table, using
+# subqueries instead of loading the objects into the session.
+
+
+def delete_exercise_templates(*criteria):
+    ExerciseTemplate.query.filter(*criteria).delete(synchronize_session=False)
+
+
+def delete_workout_templates(*criteria):
+    workout_template_ids = db.session.query(WorkoutTemplate.id).filter(*criteria)
+    delete_exercise_templates(ExerciseTemplate.workout_template_id.in_(workout_template_ids))
+    WorkoutDay.query.filter(WorkoutDay.workout_id.in_(workout_template_ids)).delete(synchronize_session=False)
+    WorkoutTemplate.query.filter(*criteria).delete(synchronize_session=False)
+
+
+def delete_program_templates(*criteria):
+    program_template_ids = db.session.query(ProgramTemplate.id).filter(*criteria)
+    delete_workout_templates(WorkoutTemplate.program_template_id.in_(program_template_ids))
+    ProgramTemplate.query.filter(*criteria).delete(synchronize_session=False)
+
+
+def delete_workouts(*criteria):
+    workout_ids = db.session.query(Workout.id).filter(*criteria)
+    exercise_ids = db.session.query(Exercise.id).filter(Exercise.workout_id.in_(workout_ids))
+    Set.query.filter(Set.exercise_id.in_(exercise_ids)).delete(synchronize_session=False)
+    Exercise.query.filter(Exercise.workout_id.in_(workout_ids)).delete(synchronize_session=False)
+    Workout.query.filter(*criteria).delete(synchronize_session=False)
+
+
+def delete_programs(*criteria):
+    program_ids = db.session.query(Program.id).filter(*criteria)
+    delete_workouts(Workout.program_id.in_(program_ids))
+    ExerciseSummary.query.filter(ExerciseSummary.program_id.in_(program_ids)).delete(synchronize_session=False)
+    Program.query.filter(*criteria).delete(synchronize_session=False)
+
+
+def touch_program(program_id):
+    # Every change to a program's workouts or sets bumps its version, which retires its cached week tables
+    Program.query.filter_by(id=program_id).update({"version": Program.version + 1}, synchronize_session=False)
+
+
+def touch_program_template(program_template_id):
+    # Every change to a template's workouts or exercises bumps its version, which retires its API ETags
+    ProgramTemplate.query.filter_by(id=program_template_id).update(
+        {"version": ProgramTemplate.version + 1}, synchronize_session=False)
+
+
+def compact_program_weeks(program_id):
+    # Renumber the program's weeks 1, 2, 3... in order, closing any gaps, and update its week count
+    db.session.execute(text("""
+        UPDATE workouts SET week = ranked.new_week
+        FROM (
+            SELECT id, dense_rank() OVER (ORDER BY week) AS new_week FROM workouts WHERE program_id = :program_id
+        ) AS ranked
+        WHERE workouts.id = ranked.id AND workouts.week != ranked.new_week
+    """), {"program_id": program_id})
+    number_of_weeks = db.session.query(func.count(func.distinct(Workout.week))).filter(Workout.program_id == program_id)
+    Program.query.filter_by(id=program_id).update({"weeks": number_of_weeks.as_scalar()}, synchronize_session=False)
+
+
 @app.route("/exercise-templates/<int:exercise_template_id>/delete")
 @protect_exercise_template
 def delete_exercise_template(exercise_template_id):
-    requested_exercise_template = ExerciseTemplate.query.get(exercise_template_id)
+    requested_exercise_template = g.exercise_template
     parent_workout_template_id = requested_exercise_template.workout_template_id
-    for set_template in requested_exercise_template.set_templates:
-        db.session.delete(set_template)
-    db.session.delete(requested_exercise_template)
+    delete_exercise_templates(ExerciseTemplate.id == exercise_template_id)
+    touch_program_template(requested_exercise_template.parent_workout_template.program_template_id)
     db.session.commit()
     return redirect(url_for('show_workout_template', workout_template_id=parent_workout_template_id))
 
 @app.route("/workout-templates/<int:workout_template_id>/delete")
 @protect_workout_template
 def delete_workout_template(workout_template_id):
-    requested_workout_template = WorkoutTemplate.query.get(workout_template_id)
+    requested_workout_template = g.workout_template
     parent_program_template_id = requested_workout_template.program_template_id
-    for exercise_template in requested_workout_template.exercise_templates:
-        for set_template in exercise_template.set_templates:
-            db.session.delete(set_template)
-        db.session.delete(exercise_template)
-    db.session.delete(requested_workout_template)
+    delete_workout_templates(WorkoutTemplate.id == workout_template_id)
+    touch_program_template(parent_program_template_id)
     db.session.commit()
     return redirect(url_for('show_program_template', program_template_id=parent_program_template_id))
 
@@ -562,87 +915,226 @@ def delete_workout_template(workout_template_id):
 @app.route("/program-templates/<int:program_template_id>/delete")
 @protect_program_template
 def delete_program_template(program_template_id):
-    requested_program_template = ProgramTemplate.query.get(program_template_id)
-    for workout_template in requested_program_template.workout_templates:
-        for exercise_template in workout_template.exercise_templates:
-            for set_template in exercise_template.set_templates:
-                db.session.delete(set_template)
-            db.session.delete(exercise_template)
-        db.session.delete(workout_template)
-    db.session.delete(requested_program_template)
+    delete_program_templates(ProgramTemplate.id == program_template_id)
     db.session.commit()
+    brain.forget_plans(program_template_id)
     return redirect(url_for('dashboard'))
 
 
 @app.route("/week/<int:week>/workouts/<int:workout_id>/delete")
-@protect_workout_week
+@protect_workout
 def delete_workout(workout_id, week):
-    requested_workout = Workout.query.get(workout_id)
+    requested_workout = g.workout
     parent_program_id = requested_workout.program_id
-    for exercise in requested_workout.exercises:
-        for set in exercise.sets:
-            db.session.delete(set)
-        db.session.delete(exercise)
-    db.session.delete(requested_workout)
+    workout_week = requested_workout.week
+    delete_workouts(Workout.id == workout_id)
+
+    # Lazy programs keep their weeks, even empty ones, since their sessions are generated by date
+    if requested_workout.parent_program.is_lazy:
+        touch_program(parent_program_id)
+        refresh_summary_weeks(parent_program_id, [workout_week])
+        db.session.commit()
+        grid_cache.invalidate(parent_program_id)
+        return redirect(url_for('show_program', program_id=parent_program_id, week=workout_week))
+
+    # CLOSE THE GAP IF THE WEEK IS NOW EMPTY
+    if not Workout.query.filter_by(program_id=parent_program_id).first():
+        delete_programs(Program.id == parent_program_id)
+        db.session.commit()
+        grid_cache.invalidate(parent_program_id)
+        return redirect(url_for('dashboard'))
+    changed_weeks = [workout_week]
+    if not Workout.query.filter_by(program_id=parent_program_id, week=workout_week).first():
+        # Every later week moves up one. The last one is read from the workouts, since programs are generated with at
+        # least two weeks whatever their week count says; it is the emptied week itself if no later one is left.
+        last_week = db.session.query(func.max(Workout.week)).filter(Workout.program_id == parent_program_id).scalar()
+        compact_program_weeks(parent_program_id)
+        changed_weeks = range(workout_week, max(last_week, workout_week) + 1)
+    touch_program(parent_program_id)
+    refresh_summary_weeks(parent_program_id, changed_weeks)
+    db.session.commit()
+    grid_cache.invalidate(parent_program_id)
+
+    weeks = db.session.query(Program.weeks).filter(Program.id == parent_program_id).scalar()
+    return redirect(url_for('show_program', program_id=parent_program_id, week=min(week, weeks)))
+
+
+@app.route("/programs/<int:program_id>/week/<int:week>/sessions/<int:session>/delete")
+@protect_program
+def delete_session(program_id, week, session):
+    current_program = g.program
+    if is_materialized(current_program, week):
+        # The week was saved since this link was made, so its sessions may have moved
+        return redirect(url_for('show_program', program_id=program_id, week=week))
+    workout_ids = materialize_week(current_program, week)
+    if workout_ids is not None and session < len(workout_ids):
+        delete_workouts(Workout.id == workout_ids[session])
+    refresh_summary_weeks(program_id, [week])
     db.session.commit()
-    return redirect(url_for('show_program', program_id=parent_program_id, week=week))
+    grid_cache.invalidate(program_id)
+    return redirect(url_for('show_program', program_id=program_id, week=week))
 
 
 @app.route("/programs/<int:program_id>/delete")
 @protect_program
 def delete_program(program_id):
-    requested_program = Program.query.get(program_id)
-    for workout in requested_program.workouts:
-        for exercise in workout.exercises:
-            for set in exercise.sets:
-                db.session.delete(set)
-            db.session.delete(exercise)
-        db.session.delete(workout)
-    db.session.delete(requested_program)
+    delete_programs(Program.id == program_id)
     db.session.commit()
+    grid_cache.invalidate(program_id)
     return redirect(url_for('dashboard'))
 
 
 @app.route("/user/delete")
 @login_required
 def delete_user():
-    for program_template in current_user.program_templates:
-        for workout_template in program_template.workout_templates:
-            for exercise_template in workout_template.exercise_templates:
-                for set_template in exercise_template.set_templates:
-                    db.session.delete(set_template)
-                db.session.delete(exercise_template)
-            db.session.delete(workout_template)
-        db.session.delete(program_template)
-    for program in current_user.programs:
-        for workout in program.workouts:
-            for exercise in workout.exercises:
-                for set in exercise.sets:
-                    db.session.delete(set)
-                db.session.delete(exercise)
-            db.session.delete(workout)
-        db.session.delete(program)
-    db.session.delete(current_user)
+    user_id = current_user.id
+    program_ids = [program_id for program_id, in db.session.query(Program.id).filter(Program.user_id == user_id)]
+    program_template_ids = [
+        program_template_id for program_template_id, in db.session.query(ProgramTemplate.id).filter(ProgramTemplate.user_id == user_id)
+    ]
+    delete_program_templates(ProgramTemplate.user_id == user_id)
+    delete_programs(Program.user_id == user_id)
+    ExerciseType.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    Job.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    User.query.filter_by(id=user_id).delete(synchronize_session=False)
     db.session.commit()
+    for program_id in program_ids:
+        grid_cache.invalidate(program_id)
+    for program_template_id in program_template_ids:
+        brain.forget_plans(program_template_id)
     flash("Account deleted.")
     return redirect(url_for('home', _anchor="login"))
 
 
 # MAKE PROGRAM
 
+BULK_INSERT_BATCH_SIZE = 5000
+
+
+def allocate_ids(model, count):
+    if count == 0:
+        return []
+    if db.engine.dialect.name == "postgresql":
+        result = db.session.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+            {"table": model.__tablename__, "count": count}
+        )
+        return [row[0] for row in result]
+    # SQLite: the caller has already written to the database in this transaction, so it holds the write lock and
+    # no other connection can claim ids until we commit
+    first_id = db.session.query(func.coalesce(func.max(model.id), 0)).scalar() + 1
+    return list(range(first_id, first_id + count))
+
+
+def bulk_insert(model, rows):
+    for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+        db.session.execute(model.__table__.insert(), rows[start:start + BULK_INSERT_BATCH_SIZE])
+
+
+def insert_program(dummy_program, name, user_id):
+    new_program = Program(
+        name=name,
+        user_id=user_id,
+        weeks=dummy_program.weeks
+    )
+    db.session.add(new_program)
+    db.session.flush()
+    insert_workouts(dummy_program, new_program.id, exercise_catalog.type_ids(user_id))
+    return new_program.id
+
+
+def insert_workouts(dummy_program, program_id, type_ids, completed_sets=()):
+    # Each exercise is saved with the reps and weight of its first set. Only the sets that differ from those or are
+    # completed get a row, numbered by their position in the exercise. Nothing refers to set ids, so the database
+    # assigns them. type_ids maps the program's exercise names to their ids (see ExerciseCatalog.type_ids).
+    workout_ids = allocate_ids(Workout, dummy_program.workout_count)
+    exercise_ids = allocate_ids(Exercise, dummy_program.exercise_count)
+
+    workout_rows = []
+    exercise_rows = []
+    set_rows = []
+    for workout_index, workout_id in enumerate(workout_ids):
+        workout_rows.append({
+            "id": workout_id,
+            "name": dummy_program.workout_names[workout_index],
+            "week": dummy_program.workout_weeks[workout_index],
+            "date": dummy_program.workout_date(workout_index),
+            "program_id": program_id
+        })
+        for exercise_index in dummy_program.exercise_range(workout_index):
+            exercise_id = exercise_ids[exercise_index]
+            set_range = dummy_program.set_range(exercise_index)
+            reps = dummy_program.set_reps[set_range.start] if set_range else 0
+            weight = dummy_program.set_weights[set_range.start] if set_range else 0
+            exercise_rows.append({
+                "id": exercise_id,
+                "type_id": type_ids[dummy_program.exercise_types[exercise_index]],
+                "set_count": len(set_range),
+                "reps": reps,
+                "weight": weight,
+                "workout_id": workout_id
+            })
+            for order, set_index in enumerate(set_range, start=1):
+                completed = set_index in completed_sets
+                if completed or dummy_program.set_reps[set_index] != reps or dummy_program.set_weights[set_index] != weight:
+                    set_rows.append({
+                        "weight": dummy_program.set_weights[set_index],
+                        "reps": dummy_program.set_reps[set_index],
+                        "order": order,
+                        "completed": completed,
+                        "exercise_id": exercise_id
+                    })
+
+    bulk_insert(Workout, workout_rows)
+    bulk_insert(Exercise, exercise_rows)
+    bulk_insert(Set, set_rows)
+    return workout_ids
+
+
+def insert_lazy_program(plan, name, user_id, starting_date, weeks, starting_weights, increments, progression=None):
+    # One row, however long the program: its weeks are generated from the plan until they are edited
+    new_program = Program(
+        name=name,
+        user_id=user_id,
+        weeks=weeks,
+        plan=plan,
+        starting_date=starting_date,
+        starting_weights=starting_weights,
+        increments=increments,
+        progression=progression,
+        materialized_weeks=[]
+    )
+    db.session.add(new_program)
+    db.session.flush()
+    return new_program.id
+
+
+def materialize_week(program, week):
+    # Saves a generated week of a lazy program as workouts so it can be edited. Returns the new workout ids in
+    # session order, or None if the week was already saved. Bumping the version first takes the program's row lock
+    # (the database's write lock on SQLite, which ignores FOR UPDATE) before the saved weeks are read and ids are
+    # allocated, so concurrent saves of a week wait for each other instead of claiming the same ids.
+    touch_program(program.id)
+    program = Program.query.populate_existing().get(program.id)
+    if week in program.materialized_weeks:
+        return None
+    workout_ids = insert_workouts(generate_week(program, week), program.id, exercise_catalog.type_ids(program.user_id))
+    program.materialized_weeks = sorted(program.materialized_weeks + [week])
+    return workout_ids
+
 
 @app.route("/program-templates/<int:program_template_id>/make_program", methods=["GET", "POST"])
 @protect_program_template
 def make_program(program_template_id):
-    requested_program_template = ProgramTemplate.query.get(program_template_id)
+    requested_program_template = g.program_template
     if not requested_program_template.workout_templates:
         flash("This template has no workouts. Add a workout before making a program.")
         return redirect(url_for('show_program_template', program_template_id=program_template_id))
-    exercises = []
-    for workout_template in requested_program_template.workout_templates:
-        for exercise_template in workout_template.exercise_templates:
-            if exercise_template.type not in exercises:
-                exercises.append(exercise_template.type)
+    # Each exercise of the template once, in the order they first appear
+    type_ids = db.session.query(ExerciseTemplate.type_id).join(WorkoutTemplate).filter(
+        WorkoutTemplate.program_template_id == program_template_id
+    ).order_by(WorkoutTemplate.id, ExerciseTemplate.id)
+    exercises = [exercise_catalog.name(type_id) for type_id in dict.fromkeys(type_id for type_id, in type_ids)]
 
     make_program_form = MakeProgramForm(
         name=requested_program_template.name,
@@ -656,45 +1148,444 @@ def make_program(program_template_id):
     if make_program_form.validate_on_submit():
         starting_weights = {entry.name: entry.starting_weight.data for entry in make_program_form.exercises}
         increments = {entry.name: entry.increment.data for entry in make_program_form.exercises}
-        dummy_program = brain.make_dummy_program(
-            program_template=requested_program_template,
+        progression = {
+            "increment_frequency": make_program_form.increment_frequency.data or 1,
+            "smallest_weight_plate": make_program_form.smallest_weight_plate.data or 0,
+            "deload_every": make_program_form.deload_every.data or 0,
+            "deload_percent": make_program_form.deload_percent.data or 0
+        }
+        if app.config['LAZY_PROGRAMS']:
+            new_program_id = insert_lazy_program(
+                plan=brain.get_plan(requested_program_template),
+                name=make_program_form.name.data,
+                user_id=current_user.id,
+                starting_date=make_program_form.starting_date.data,
+                weeks=make_program_form.weeks.data,
+                starting_weights=starting_weights,
+                increments=increments,
+                progression=progression
+            )
+            db.session.commit()
+            grid_cache.invalidate(new_program_id)
+            return redirect(url_for('show_program', program_id=new_program_id, week=1))
+        program_arguments = dict(
+            program_template_id=program_template_id,
+            name=make_program_form.name.data,
+            user_id=current_user.id,
             starting_date=make_program_form.starting_date.data,
             weeks=make_program_form.weeks.data,
             starting_weights=starting_weights,
-            increments=increments
-            )
-        new_program = Program(
-            name=make_program_form.name.data,
-            user=current_user,
-            weeks=dummy_program.weeks
+            increments=increments,
+            progression=progression
         )
-        db.session.add(new_program)
-        for dummy_workout in dummy_program.workouts:
-            new_workout = Workout(
-                name=dummy_workout.name[0],
-                week=dummy_workout.week[0],
-                date=dummy_workout.date[0],
-                parent_program=new_program
-            )
-            db.session.add(new_workout)
-            for dummy_exercise in dummy_workout.exercises:
-                new_exercise = Exercise(
-                    type=dummy_exercise.type[0],
-                    parent_workout=new_workout
-                )
-                db.session.add(new_exercise)
-                for dummy_set in dummy_exercise.sets:
-                    new_set = Set(
-                        weight=dummy_set.weight[0],
-                        reps=dummy_set.reps[0],
-                        order=dummy_set.order[0],
-                        completed=False,
-                        parent_exercise=new_exercise
-                    )
-                    db.session.add(new_set)
+        if app.config['ASYNC_JOBS']:
+            job_id = job_queue.submit("make_program", current_user.id, generate_program, program_arguments)
+            return redirect(url_for('make_program', program_template_id=program_template_id, job=job_id))
+        new_program_id = generate_program(**program_arguments)["program_id"]
+        return redirect(url_for('show_program', program_id=new_program_id, week=1))
+    return render_template("make-program.html",
+                           form=make_program_form,
+                           template_id=program_template_id,
+                           job_id=request.args.get("job", type=int)
+                           )
+
+
+def generate_program(program_template_id, name, user_id, starting_date, weeks, starting_weights, increments, progression=None):
+    # Runs in the request, or on a job thread with ASYNC_JOBS
+    program_template = ProgramTemplate.query.get(program_template_id)
+    dummy_program = brain.make_dummy_program(
+        program_template=program_template,
+        starting_date=starting_date,
+        weeks=weeks,
+        starting_weights=starting_weights,
+        increments=increments,
+        progression=progression
+        )
+    new_program_id = insert_program(
+        dummy_program=dummy_program,
+        name=name,
+        user_id=user_id
+    )
+    db.session.commit()
+    grid_cache.invalidate(new_program_id)
+    return {"program_id": new_program_id}
+
+
+# JOBS
+
+
+@app.route("/jobs/<int:job_id>")
+@protect("job_id", Job)
+def show_job(job_id):
+    job = g.job
+    status = {"id": job.id, "kind": job.kind, "status": job.status, "error": job.error}
+    if job.status == "done" and job.kind == "make_program":
+        status["url"] = url_for('show_program', program_id=job.result["program_id"], week=1)
+    return jsonify(status)
+
+
+# IMPORT PROGRAM
+
+
+def insert_imported_program(reader, name, user_id, type_ids):
+    # Inserts the valid rows batch by batch in the caller's transaction. Returns None if there were none.
+    new_program = Program(
+        name=name,
+        user_id=user_id,
+        weeks=0
+    )
+    db.session.add(new_program)
+    db.session.flush()
+    for batch, completed_sets in reader.batches():
+        insert_workouts(batch, new_program.id, type_ids, completed_sets)
+    if not reader.set_count:
+        return None
+    # Number the weeks 1, 2, 3... whatever the file used, and set the program's week count
+    compact_program_weeks(new_program.id)
+    return new_program.id
+
+
+@app.route("/programs/import", methods=["GET", "POST"])
+@login_required
+def import_program():
+    import_program_form = ImportProgramForm()
+    reader = None
+    new_program_id = None
+    if import_program_form.validate_on_submit():
+        # The shared exercises and the user's own
+        type_ids = exercise_catalog.type_ids(current_user.id)
+        reader = ProgramReader(
+            import_program_form.file.data.stream,
+            batch_size=BULK_INSERT_BATCH_SIZE,
+            valid_exercises=frozenset(type_ids)
+        )
+        new_program_id = insert_imported_program(
+            reader=reader,
+            name=import_program_form.name.data,
+            user_id=current_user.id,
+            type_ids=type_ids
+        )
+        if new_program_id is None:
+            db.session.rollback()
+        else:
+            db.session.commit()
+            grid_cache.invalidate(new_program_id)
+    return render_template("import-program.html", form=import_program_form, reader=reader, program_id=new_program_id)
+
+
+# API
+
+# Read-only JSON for clients that poll. Each response carries a strong ETag built from the owning program's (or
+# template's) version, and a matching If-None-Match gets a 304 before anything past the ownership check is loaded.
+
+
+@app.route("/api/programs/<int:program_id>/weeks/<int:week>")
+@protect_program
+def api_program_week(program_id, week):
+    current_program = g.program
+    return conditional_json(
+        f"program-{program_id}-{current_program.version}",
+        lambda: program_week_data(current_program, week)
+    )
+
+
+def program_week_data(program, week):
+    if program.is_lazy and not 1 <= week <= program.weeks:
+        return abort(404)
+    if is_materialized(program, week):
+        workouts_in_week = load_week_workouts(program.id, week)
+        if not workouts_in_week and not program.is_lazy:
+            return abort(404)
+        workouts = [workout_data(workout, workout_id=workout.id) for workout in workouts_in_week]
+    else:
+        dummy_week = generate_week(program, week)
+        workouts = [workout_data(dummy_week.workout(session), session=session) for session in range(dummy_week.workout_count)]
+    return {
+        "program": {"id": program.id, "name": program.name, "weeks": program.weeks, "lazy": program.is_lazy},
+        "week": week,
+        "workouts": workouts
+    }
+
+
+@app.route("/api/workouts/<int:workout_id>")
+@protect_workout
+def api_workout(workout_id):
+    requested_workout = g.workout
+
+    def build():
+        loaded_workout = Workout.query.options(
+            selectinload(Workout.exercises).selectinload(Exercise.set_rows)
+        ).populate_existing().get(workout_id)
+        return {**workout_data(loaded_workout, workout_id=workout_id), "program_id": loaded_workout.program_id}
+
+    return conditional_json(f"program-{requested_workout.program_id}-{requested_workout.parent_program.version}", build)
+
+
+@app.route("/api/programs/<int:program_id>/weeks/<int:week>/materialize", methods=["POST"])
+@protect_program
+def api_materialize_week(program_id, week):
+    # Saves a lazy program's generated week so its sets can be logged, and returns it with the new ids. Saved weeks
+    # and eager programs are returned as they are.
+    current_program = g.program
+    if current_program.is_lazy and not 1 <= week <= current_program.weeks:
+        return abort(404)
+    if not is_materialized(current_program, week):
+        materialize_week(current_program, week)
+        refresh_summary_weeks(program_id, [week])
         db.session.commit()
-        return redirect(url_for('show_program', program_id=new_program.id, week=1))
-    return render_template("make-program.html", form=make_program_form, template_id=program_template_id)
+    return jsonify(program_week_data(current_program, week))
+
+
+@app.route("/api/workouts/<int:workout_id>/sets", methods=["PATCH"])
+@protect_workout
+def api_log_sets(workout_id):
+    requested_workout = g.workout
+    try:
+        set_updates = parse_set_updates(request.get_json(silent=True))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    if set_updates:
+        if log_sets(workout_id, set_updates) != len(set_updates):
+            db.session.rollback()
+            return jsonify({"error": "Some of the sets are not in this workout"}), 400
+        touch_program(requested_workout.program_id)
+        refresh_summary_weeks(requested_workout.program_id, [requested_workout.week])
+        db.session.commit()
+    return jsonify({"logged": len(set_updates)})
+
+
+def log_sets(workout_id, set_updates):
+    # Writes every update with one INSERT ... SELECT FROM (VALUES ...) ON CONFLICT: sets without a row get one, with
+    # their exercise's prescription for whatever the update leaves out, and rows that exist are updated in place.
+    # Only sets of the workout's exercises, up to each exercise's set count, match. Returns how many did.
+    rows = []
+    parameters = {"workout_id": workout_id}
+    for number, ((exercise_id, order), (completed, weight, reps)) in enumerate(set_updates.items()):
+        rows.append(f"(:exercise_id_{number}, :order_{number}, :completed_{number}, :weight_{number}, :reps_{number})")
+        parameters.update({
+            f"exercise_id_{number}": exercise_id,
+            f"order_{number}": order,
+            f"completed_{number}": completed,
+            f"weight_{number}": weight,
+            f"reps_{number}": reps
+        })
+    # VALUES columns are named column1, column2... in both SQLite and Postgres. SQLite needs the WHERE clause to
+    # tell the join's ON from the upsert's.
+    result = db.session.execute(text(f"""
+        INSERT INTO sets (exercise_id, "order", completed, weight, reps)
+        SELECT
+            exercises.id,
+            updates.column2,
+            updates.column3,
+            COALESCE(CAST(updates.column4 AS INTEGER), sets.weight, exercises.weight),
+            COALESCE(CAST(updates.column5 AS INTEGER), sets.reps, exercises.reps)
+        FROM (VALUES {", ".join(rows)}) AS updates
+        JOIN exercises ON exercises.id = updates.column1
+        LEFT JOIN sets ON sets.exercise_id = exercises.id AND sets."order" = updates.column2
+        WHERE exercises.workout_id = :workout_id AND updates.column2 <= exercises.set_count
+        ON CONFLICT (exercise_id, "order") DO UPDATE SET
+            completed = excluded.completed, weight = excluded.weight, reps = excluded.reps
+    """), parameters)
+    return result.rowcount
+
+
+@app.route("/api/programs/<int:program_id>/analytics/progression")
+@protect_program
+def api_program_progression(program_id):
+    # Per exercise, each session's heaviest weight and best estimated 1RM; ?exercise=<type> for just one
+    current_program = g.program
+    exercise = request.args.get("exercise")
+    return conditional_json(
+        f"program-{program_id}-{current_program.version}",
+        lambda: {"exercises": progression_data(program_summary_rows(current_program, exercise), exercise)}
+    )
+
+
+@app.route("/api/programs/<int:program_id>/analytics/tonnage")
+@protect_program
+def api_program_tonnage(program_id):
+    # Per exercise, each week's tonnage (weight x reps of every set); ?exercise=<type> for just one
+    current_program = g.program
+    exercise = request.args.get("exercise")
+    return conditional_json(
+        f"program-{program_id}-{current_program.version}",
+        lambda: {"exercises": tonnage_data(program_summary_rows(current_program, exercise), exercise)}
+    )
+
+
+# With ANALYTICS_SUMMARY, the writes to a program's workouts and sets refresh the stored rows of the weeks they
+# changed, in their own transaction. Programs that have never been summarized, or that changed while the setting was
+# off, are summarized in full on their next read.
+
+
+def program_summary_rows(program, exercise=None):
+    # With an exercise, stored rows are read for its type only; computed rows still hold every type
+    if not app.config['ANALYTICS_SUMMARY']:
+        return compute_summary_rows(program)
+    if program.analytics_version != program.version:
+        # Lock the program, then check again: a concurrent read may have stored the rows while this one waited
+        program = Program.query.with_for_update().populate_existing().get(program.id)
+        if program.analytics_version != program.version:
+            rows = compute_summary_rows(program)
+            ExerciseSummary.query.filter_by(program_id=program.id).delete(synchronize_session=False)
+            insert_summary_rows(program, rows)
+            Program.query.filter_by(id=program.id).update({"analytics_version": program.version}, synchronize_session=False)
+            db.session.commit()
+            return rows
+        db.session.commit()
+    columns = [ExerciseSummary.type_id if column == "type" else getattr(ExerciseSummary, column) for column in SummaryRow._fields]
+    query = db.session.query(*columns).filter(ExerciseSummary.program_id == program.id)
+    if exercise is not None:
+        query = query.filter(ExerciseSummary.type_id == exercise_catalog.type_ids(program.user_id).get(exercise))
+    return [
+        SummaryRow(week, workout_date, exercise_catalog.name(type_id), *values)
+        for week, workout_date, type_id, *values in query
+    ]
+
+
+def refresh_summary_weeks(program_id, weeks):
+    # Recomputes the stored rows of the given weeks after a write to them, once touch_program has bumped the version
+    # (and taken the program's row lock). Only a summary that was current before the write is kept current; any other
+    # is left for the next read to recompute.
+    if not app.config['ANALYTICS_SUMMARY']:
+        return
+    # Not populate_existing(), which would skip the autoflush and drop the caller's unsaved changes to the program
+    version, analytics_version = db.session.query(Program.version, Program.analytics_version).filter(Program.id == program_id).one()
+    if analytics_version is None or analytics_version != version - 1:
+        return
+    program = Program.query.get(program_id)
+    weeks = sorted(set(weeks))
+    ExerciseSummary.query.filter(
+        ExerciseSummary.program_id == program_id, ExerciseSummary.week.in_(weeks)
+    ).delete(synchronize_session=False)
+    insert_summary_rows(program, compute_summary_rows(program, weeks))
+    Program.query.filter_by(id=program_id).update({"analytics_version": version}, synchronize_session=False)
+
+
+def insert_summary_rows(program, rows):
+    type_ids = exercise_catalog.type_ids(program.user_id)
+    summaries = []
+    for row in rows:
+        values = row._asdict()
+        values.update(type_id=type_ids[values.pop("type")], program_id=program.id)
+        summaries.append(values)
+    db.session.bulk_insert_mappings(ExerciseSummary, summaries)
+
+
+def compute_summary_rows(program, weeks=None):
+    # The saved workouts are summarized by the database: each exercise's prescribed sets (set_count less its set
+    # rows) and set rows are folded into per-exercise values, then grouped by session and exercise type. The casts
+    # keep Postgres from returning sums and ratios as Decimal. A lazy program's weeks that are not saved are
+    # summarized from its plan. Covers the whole program, or only the weeks given.
+    week_filter = "AND workouts.week IN :weeks" if weeks is not None else ""
+    summary_query = text(f"""
+        WITH exercise_values AS (
+            SELECT
+                workouts.week, workouts.date, exercises.type_id, exercises.weight, exercises.reps,
+                exercises.set_count - COUNT(sets.id) AS prescribed_sets,
+                COALESCE(SUM(sets.weight * sets.reps), 0) AS saved_tonnage,
+                COALESCE(SUM(CASE WHEN sets.completed THEN sets.weight * sets.reps ELSE 0 END), 0) AS completed_tonnage,
+                MAX(sets.weight) AS saved_top_weight,
+                MAX(CASE WHEN sets.completed THEN sets.weight END) AS completed_top_weight,
+                MAX(CASE WHEN sets.reps > 0 THEN sets.weight * (30 + sets.reps) END) AS saved_e1rm,
+                MAX(CASE WHEN sets.completed AND sets.reps > 0 THEN sets.weight * (30 + sets.reps) END) AS completed_e1rm
+            FROM workouts
+            JOIN exercises ON exercises.workout_id = workouts.id
+            LEFT JOIN sets ON sets.exercise_id = exercises.id AND sets."order" <= exercises.set_count
+            WHERE workouts.program_id = :program_id {week_filter}
+            GROUP BY exercises.id, workouts.week, workouts.date, exercises.type_id, exercises.set_count,
+                exercises.weight, exercises.reps
+        )
+        SELECT
+            week, date, type_id,
+            CAST(SUM(prescribed_sets * weight * reps + saved_tonnage) AS INTEGER),
+            CAST(SUM(completed_tonnage) AS INTEGER),
+            MAX(CASE WHEN prescribed_sets > 0 AND (saved_top_weight IS NULL OR weight > saved_top_weight)
+                THEN weight ELSE saved_top_weight END),
+            MAX(completed_top_weight),
+            CAST(MAX(CASE WHEN prescribed_sets > 0 AND reps > 0 AND (saved_e1rm IS NULL OR weight * (30 + reps) > saved_e1rm)
+                THEN weight * (30 + reps) ELSE saved_e1rm END) AS FLOAT) / 30,
+            CAST(MAX(completed_e1rm) AS FLOAT) / 30
+        FROM exercise_values
+        GROUP BY week, date, type_id
+    """)
+    parameters = {"program_id": program.id}
+    if weeks is not None:
+        summary_query = summary_query.bindparams(bindparam("weeks", expanding=True))
+        parameters["weeks"] = list(weeks)
+    result = db.session.execute(summary_query.columns(week=Integer, date=Date, type_id=Integer), parameters)
+    rows = [SummaryRow(week, workout_date, exercise_catalog.name(type_id), *values) for week, workout_date, type_id, *values in result]
+    if program.is_lazy and weeks is not None:
+        for week in weeks:
+            if not is_materialized(program, week) and 1 <= week <= program.weeks:
+                rows += generated_summary_rows(generate_week(program, week), skip_weeks=())
+    elif program.is_lazy:
+        generated_program = brain.expand_plan(
+            plan=program.plan,
+            starting_date=program.starting_date,
+            weeks=program.weeks,
+            starting_weights=program.starting_weights,
+            increments=program.increments,
+            progression=program.progression
+        )
+        rows += [
+            row for row in generated_summary_rows(generated_program, skip_weeks=set(program.materialized_weeks))
+            if row.week <= program.weeks
+        ]
+    return rows
+
+
+@app.route("/api/program-templates/<int:program_template_id>")
+@protect_program_template
+def api_program_template(program_template_id):
+    current_program_template = g.program_template
+    return conditional_json(
+        f"program-template-{program_template_id}-{current_program_template.version}",
+        lambda: program_template_data(program_template_id)
+    )
+
+
+def program_template_data(program_template_id):
+    workout_templates = WorkoutTemplate.query.filter_by(program_template_id=program_template_id).order_by(WorkoutTemplate.id).options(
+        selectinload(WorkoutTemplate.days),
+        selectinload(WorkoutTemplate.exercise_templates)
+    ).all()
+    program_template = g.program_template
+    return {
+        "id": program_template.id,
+        "name": program_template.name,
+        "workouts": [
+            {
+                "id": workout_template.id,
+                "name": workout_template.name,
+                "schedule_week": workout_template.schedule_week,
+                "days": sorted(day.id for day in workout_template.days),
+                "exercises": [
+                    {
+                        "id": exercise_template.id,
+                        "type": exercise_template.type,
+                        "sets": exercise_template.set_count,
+                        "reps": exercise_template.reps
+                    }
+                    for exercise_template in sorted(workout_template.exercise_templates, key=lambda exercise_template: exercise_template.id)
+                ]
+            }
+            for workout_template in workout_templates
+        ]
+    }
+
+
+# METRICS
+
+# Served only with INSTRUMENTATION, like /metrics: cache and pool numbers are nobody's business on a public deployment
+if app.config['INSTRUMENTATION']:
+    @app.route("/metrics/grid-cache")
+    def grid_cache_metrics():
+        return jsonify(grid_cache.stats())
+
+    @app.route("/metrics/db-pool")
+    def db_pool_metrics():
+        return jsonify(pool_stats(db.engine.pool))
 
 
 if __name__ == "__main__":
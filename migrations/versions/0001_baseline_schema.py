@@ -0,0 +1,124 @@
+"""Baseline schema and the days of the week
+
+Revision ID: 0001
+Revises:
+Create Date: 2021-10-01 00:00:00
+
+Databases created before migrations existed (with db.create_all()) already have this schema and should be stamped
+instead of upgraded: flask db stamp 0001
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=True),
+    sa.Column('password', sa.String(length=100), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    days = op.create_table('days',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('programTemplates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=250), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('workoutTemplates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=250), nullable=False),
+    sa.Column('program_template_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['program_template_id'], ['programTemplates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('workoutdays',
+    sa.Column('workout_id', sa.Integer(), nullable=False),
+    sa.Column('day_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['day_id'], ['days.id'], ),
+    sa.ForeignKeyConstraint(['workout_id'], ['workoutTemplates.id'], ),
+    sa.PrimaryKeyConstraint('workout_id', 'day_id')
+    )
+    op.create_table('exerciseTemplates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=200), nullable=False),
+    sa.Column('workout_template_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['workout_template_id'], ['workoutTemplates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('setTemplates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exerciseTemplates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('programs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('weeks', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('workouts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('week', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('program_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('exercises',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=200), nullable=False),
+    sa.Column('workout_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['workout_id'], ['workouts.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('sets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=False),
+    sa.Column('order', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Boolean(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Workout templates refer to days by id, Monday being 1
+    op.bulk_insert(days, [
+        {'id': number, 'name': name} for number, name in enumerate(
+            ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], start=1
+        )
+    ])
+
+
+def downgrade():
+    op.drop_table('sets')
+    op.drop_table('exercises')
+    op.drop_table('workouts')
+    op.drop_table('programs')
+    op.drop_table('setTemplates')
+    op.drop_table('exerciseTemplates')
+    op.drop_table('workoutdays')
+    op.drop_table('workoutTemplates')
+    op.drop_table('programTemplates')
+    op.drop_table('days')
+    op.drop_table('users')
@@ -0,0 +1,56 @@
+"""Program versions, lazy program columns and the jobs table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2021-10-02 00:00:00
+
+These models changed before migrations existed, so a database from before them needs this revision before running code
+that has any of them:
+* programs.version, which keys the cached week tables
+* programs.plan, starting_date, starting_weights, increments and materialized_weeks, which lazy programs are stored as
+* the jobs table, which background jobs are tracked in
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('programs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('plan', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('starting_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('starting_weights', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('increments', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('materialized_weeks', sa.JSON(), nullable=True))
+
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('jobs')
+
+    with op.batch_alter_table('programs', schema=None) as batch_op:
+        batch_op.drop_column('materialized_weeks')
+        batch_op.drop_column('increments')
+        batch_op.drop_column('starting_weights')
+        batch_op.drop_column('starting_date')
+        batch_op.drop_column('plan')
+        batch_op.drop_column('version')
@@ -0,0 +1,41 @@
+"""Indexes for the foreign keys and the week lookup
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2021-10-03 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_programTemplates_user_id'), 'programTemplates', ['user_id'], unique=False)
+    op.create_index(op.f('ix_workoutTemplates_program_template_id'), 'workoutTemplates', ['program_template_id'], unique=False)
+    op.create_index(op.f('ix_exerciseTemplates_workout_template_id'), 'exerciseTemplates', ['workout_template_id'], unique=False)
+    op.create_index(op.f('ix_setTemplates_exercise_id'), 'setTemplates', ['exercise_id'], unique=False)
+    op.create_index(op.f('ix_programs_user_id'), 'programs', ['user_id'], unique=False)
+    # Serves show_program's (program_id, week) lookup in date order, and every program_id filter on its own
+    op.create_index('ix_workouts_program_id_week_date', 'workouts', ['program_id', 'week', 'date'], unique=False)
+    op.create_index(op.f('ix_exercises_workout_id'), 'exercises', ['workout_id'], unique=False)
+    op.create_index(op.f('ix_sets_exercise_id'), 'sets', ['exercise_id'], unique=False)
+    op.create_index(op.f('ix_jobs_user_id'), 'jobs', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_jobs_user_id'), table_name='jobs')
+    op.drop_index(op.f('ix_sets_exercise_id'), table_name='sets')
+    op.drop_index(op.f('ix_exercises_workout_id'), table_name='exercises')
+    op.drop_index('ix_workouts_program_id_week_date', table_name='workouts')
+    op.drop_index(op.f('ix_programs_user_id'), table_name='programs')
+    op.drop_index(op.f('ix_setTemplates_exercise_id'), table_name='setTemplates')
+    op.drop_index(op.f('ix_exerciseTemplates_workout_template_id'), table_name='exerciseTemplates')
+    op.drop_index(op.f('ix_workoutTemplates_program_template_id'), table_name='workoutTemplates')
+    op.drop_index(op.f('ix_programTemplates_user_id'), table_name='programTemplates')
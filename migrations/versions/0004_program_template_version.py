@@ -0,0 +1,26 @@
+"""Version counter on program templates
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2021-10-10 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('programTemplates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('programTemplates', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,97 @@
+"""Set counts on exercise templates and exercises, with set rows only for overrides and completion
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2021-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exerciseTemplates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('set_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('reps', sa.Integer(), server_default='0', nullable=False))
+    # The add exercise form gives every set of a template the same reps
+    op.execute('''
+        UPDATE "exerciseTemplates" SET
+            set_count = (SELECT count(*) FROM "setTemplates" WHERE exercise_id = "exerciseTemplates".id),
+            reps = COALESCE((SELECT min(reps) FROM "setTemplates" WHERE exercise_id = "exerciseTemplates".id), 0)
+    ''')
+    op.drop_index(op.f('ix_setTemplates_exercise_id'), table_name='setTemplates')
+    op.drop_table('setTemplates')
+
+    with op.batch_alter_table('exercises', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('set_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('reps', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('weight', sa.Integer(), server_default='0', nullable=False))
+    # Number each exercise's sets 1, 2, 3... in the order they were shown, then take the exercise's reps and weight
+    # from its first set and delete the sets that match them and are not completed
+    op.execute('''
+        UPDATE sets SET "order" = (
+            SELECT count(*) FROM sets AS earlier WHERE earlier.exercise_id = sets.exercise_id AND earlier.id <= sets.id
+        )
+    ''')
+    op.execute('''
+        UPDATE exercises SET
+            set_count = (SELECT count(*) FROM sets WHERE exercise_id = exercises.id),
+            reps = COALESCE((SELECT reps FROM sets WHERE exercise_id = exercises.id AND "order" = 1), 0),
+            weight = COALESCE((SELECT weight FROM sets WHERE exercise_id = exercises.id AND "order" = 1), 0)
+    ''')
+    op.execute('''
+        DELETE FROM sets WHERE NOT completed AND EXISTS (
+            SELECT 1 FROM exercises
+            WHERE exercises.id = sets.exercise_id AND exercises.reps = sets.reps AND exercises.weight = sets.weight
+        )
+    ''')
+    op.drop_index(op.f('ix_sets_exercise_id'), table_name='sets')
+    op.create_index('ix_sets_exercise_id_order', 'sets', ['exercise_id', 'order'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_sets_exercise_id_order', table_name='sets')
+    op.create_index(op.f('ix_sets_exercise_id'), 'sets', ['exercise_id'], unique=False)
+    # Back to one row per set. The recreated rows get new ids, which the old code orders sets by.
+    op.execute('''
+        WITH RECURSIVE numbers(n) AS (
+            SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < (SELECT max(set_count) FROM exercises)
+        )
+        INSERT INTO sets (weight, reps, "order", completed, exercise_id)
+        SELECT exercises.weight, exercises.reps, numbers.n, false, exercises.id
+        FROM exercises JOIN numbers ON numbers.n <= exercises.set_count
+        WHERE NOT EXISTS (SELECT 1 FROM sets WHERE exercise_id = exercises.id AND "order" = numbers.n)
+        ORDER BY exercises.id, numbers.n
+    ''')
+    with op.batch_alter_table('exercises', schema=None) as batch_op:
+        batch_op.drop_column('weight')
+        batch_op.drop_column('reps')
+        batch_op.drop_column('set_count')
+
+    op.create_table('setTemplates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exerciseTemplates.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_setTemplates_exercise_id'), 'setTemplates', ['exercise_id'], unique=False)
+    op.execute('''
+        WITH RECURSIVE numbers(n) AS (
+            SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < (SELECT max(set_count) FROM "exerciseTemplates")
+        )
+        INSERT INTO "setTemplates" (reps, exercise_id)
+        SELECT "exerciseTemplates".reps, "exerciseTemplates".id
+        FROM "exerciseTemplates" JOIN numbers ON numbers.n <= "exerciseTemplates".set_count
+        ORDER BY "exerciseTemplates".id, numbers.n
+    ''')
+    with op.batch_alter_table('exerciseTemplates', schema=None) as batch_op:
+        batch_op.drop_column('reps')
+        batch_op.drop_column('set_count')
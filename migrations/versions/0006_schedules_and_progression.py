@@ -0,0 +1,30 @@
+"""Multi-week schedules on workout templates and progression settings on lazy programs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2021-10-24 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workoutTemplates', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('schedule_week', sa.Integer(), server_default='0', nullable=False))
+    with op.batch_alter_table('programs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('progression', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('programs', schema=None) as batch_op:
+        batch_op.drop_column('progression')
+    with op.batch_alter_table('workoutTemplates', schema=None) as batch_op:
+        batch_op.drop_column('schedule_week')
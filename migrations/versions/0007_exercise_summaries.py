@@ -0,0 +1,46 @@
+"""Analytics summary table
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2021-10-31 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('programs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('analytics_version', sa.Integer(), nullable=True))
+
+    op.create_table('exerciseSummaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('program_id', sa.Integer(), nullable=True),
+    sa.Column('week', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('type', sa.String(length=200), nullable=False),
+    sa.Column('tonnage', sa.Integer(), nullable=False),
+    sa.Column('completed_tonnage', sa.Integer(), nullable=False),
+    sa.Column('top_weight', sa.Integer(), nullable=True),
+    sa.Column('completed_top_weight', sa.Integer(), nullable=True),
+    sa.Column('e1rm', sa.Float(), nullable=True),
+    sa.Column('completed_e1rm', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['programs.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_exerciseSummaries_program_id_week_date_type', 'exerciseSummaries', ['program_id', 'week', 'date', 'type'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_exerciseSummaries_program_id_week_date_type', table_name='exerciseSummaries')
+    op.drop_table('exerciseSummaries')
+
+    with op.batch_alter_table('programs', schema=None) as batch_op:
+        batch_op.drop_column('analytics_version')
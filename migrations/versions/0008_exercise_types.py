@@ -0,0 +1,94 @@
+"""Exercise types table, with exercises, exercise templates and summaries referring to it by id
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2021-11-07 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# The shared exercises as of this revision
+SHARED_EXERCISES = [
+    "Bench Press", "Bent Over Row", "Curl", "Chin up", "Clean", "Deadlift", "Incline Bench Press", "Lunge",
+    "Overhead Press", "Pulldown", "Shoulder Press", "Seated Overhead Press", "Seated Row", "Squat"
+]
+
+
+def upgrade():
+    exercise_types = op.create_table('exerciseTypes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_exerciseTypes_user_id_name', 'exerciseTypes', ['user_id', 'name'], unique=True)
+    op.bulk_insert(exercise_types, [{'name': name} for name in SHARED_EXERCISES])
+    # Names saved before the list changed become shared types too
+    for table in ('exerciseTemplates', 'exercises'):
+        op.execute(f'''
+            INSERT INTO "exerciseTypes" (name)
+            SELECT DISTINCT type FROM "{table}"
+            WHERE type NOT IN (SELECT name FROM "exerciseTypes" WHERE user_id IS NULL)
+        ''')
+
+    for table in ('exerciseTemplates', 'exercises'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('type_id', sa.Integer(), nullable=True))
+        op.execute(f'''
+            UPDATE "{table}" SET type_id = (
+                SELECT id FROM "exerciseTypes" WHERE name = "{table}".type AND user_id IS NULL
+            )
+        ''')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('type_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key(f'fk_{table.lower()}_type_id', 'exerciseTypes', ['type_id'], ['id'])
+            batch_op.drop_column('type')
+        op.create_index(op.f(f'ix_{table}_type_id'), table, ['type_id'], unique=False)
+
+    # Summaries are recomputed on their next read
+    op.execute('DELETE FROM "exerciseSummaries"')
+    op.execute('UPDATE programs SET analytics_version = NULL')
+    op.drop_index('ix_exerciseSummaries_program_id_week_date_type', table_name='exerciseSummaries')
+    with op.batch_alter_table('exerciseSummaries', schema=None) as batch_op:
+        batch_op.drop_column('type')
+        batch_op.add_column(sa.Column('type_id', sa.Integer(), nullable=False))
+        batch_op.create_foreign_key('fk_exercisesummaries_type_id', 'exerciseTypes', ['type_id'], ['id'])
+    op.create_index('ix_exerciseSummaries_program_id_week_date_type_id', 'exerciseSummaries', ['program_id', 'week', 'date', 'type_id'], unique=True)
+    op.create_index(op.f('ix_exerciseSummaries_type_id'), 'exerciseSummaries', ['type_id'], unique=False)
+
+
+def downgrade():
+    op.execute('DELETE FROM "exerciseSummaries"')
+    op.execute('UPDATE programs SET analytics_version = NULL')
+    op.drop_index(op.f('ix_exerciseSummaries_type_id'), table_name='exerciseSummaries')
+    op.drop_index('ix_exerciseSummaries_program_id_week_date_type_id', table_name='exerciseSummaries')
+    with op.batch_alter_table('exerciseSummaries', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_exercisesummaries_type_id', type_='foreignkey')
+        batch_op.drop_column('type_id')
+        batch_op.add_column(sa.Column('type', sa.String(length=200), nullable=False))
+    op.create_index('ix_exerciseSummaries_program_id_week_date_type', 'exerciseSummaries', ['program_id', 'week', 'date', 'type'], unique=True)
+
+    for table in ('exercises', 'exerciseTemplates'):
+        op.drop_index(op.f(f'ix_{table}_type_id'), table_name=table)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('type', sa.String(length=200), nullable=True))
+        op.execute(f'''
+            UPDATE "{table}" SET type = (SELECT name FROM "exerciseTypes" WHERE id = "{table}".type_id)
+        ''')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('type', existing_type=sa.String(length=200), nullable=False)
+            batch_op.drop_constraint(f'fk_{table.lower()}_type_id', type_='foreignkey')
+            batch_op.drop_column('type_id')
+
+    op.drop_index('ix_exerciseTypes_user_id_name', table_name='exerciseTypes')
+    op.drop_table('exerciseTypes')
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that also counts checkouts, checkout timeouts and the time spent getting a connection, which includes
+    # waiting for one to be returned when the pool and its overflow are all checked out
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self.stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+def pool_options(database_uri, environ):
+    # Engine options for the connection pool, read from DB_POOL_* environment variables. Each gunicorn worker has its
+    # own pool, so a deployment opens up to workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+    if database_uri in ("sqlite://", "sqlite:///:memory:"):
+        # In-memory databases live in their single connection
+        return {}
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int(environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(environ.get("DB_POOL_TIMEOUT", 30)),
+        # Replace connections before the server or a proxy drops them for being idle too long
+        "pool_recycle": int(environ.get("DB_POOL_RECYCLE", 1800)),
+        # Test each connection on checkout, so one dropped while idle is replaced instead of failing the request
+        "pool_pre_ping": environ.get("DB_POOL_PRE_PING", "1") == "1",
+    }
+    if database_uri.startswith("sqlite"):
+        # Pooled connections are handed to whichever thread checks them out next
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def pool_stats(pool):
+    stats = {
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+    }
+    if isinstance(pool, TimedQueuePool):
+        with pool.stats_lock:
+            stats.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                wait_seconds=pool.wait_seconds,
+                max_wait_seconds=pool.max_wait_seconds
+            )
+    return stats
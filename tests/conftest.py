@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# The app tests seed their databases with the factories next to them
+TESTS = os.path.dirname(os.path.abspath(__file__))
+if TESTS not in sys.path:
+    sys.path.insert(0, TESTS)
+
+
+@pytest.fixture(scope="session")
+def main():
+    # The app on a migrated temporary SQLite database, or on the one in TEST_DATABASE_URL
+    from factories import load_app
+    main = load_app(os.environ.get("TEST_DATABASE_URL"))
+    with main.app.app_context():
+        yield main
+
+
+@pytest.fixture
+def lazy_programs(main, request):
+    # Parametrize with indirect=True: False for eager programs, True for lazy ones
+    main.app.config["LAZY_PROGRAMS"] = request.param
+    yield request.param
+    main.app.config["LAZY_PROGRAMS"] = False
+
+
+@pytest.fixture
+def analytics_summary(main):
+    # Programs' analytics are stored: the first read computes and stores them, writes refresh them
+    main.app.config["ANALYTICS_SUMMARY"] = True
+    yield
+    main.app.config["ANALYTICS_SUMMARY"] = False
@@ -0,0 +1,122 @@
+"""Factories shared by the tests and the benchmarks: the app on a migrated database, users, templates and programs, a
+logged-in test client and a statement counter."""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def load_app(database_url=None):
+    # main.py reads its configuration at import time, so the environment has to be set up first
+    if not database_url:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="musqlo-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    import main
+    from flask_migrate import upgrade
+    main.app.config["WTF_CSRF_ENABLED"] = False
+    with main.app.app_context():
+        # The same schema and indexes as production, days of the week included
+        upgrade(directory=os.path.join(ROOT, "migrations"))
+    return main
+
+
+def make_user(main, name="bench"):
+    new_user = main.User(email=f"{name}-{time.time_ns()}@example.com", name=name, password="")
+    main.db.session.add(new_user)
+    main.db.session.commit()
+    return new_user
+
+
+def make_program_template(main, user, days_per_week, exercises_per_workout, sets_per_exercise, reps=5):
+    from exercises import exercises
+    type_ids = main.exercise_catalog.type_ids()
+    new_program_template = main.ProgramTemplate(name="Benchmark", user=user)
+    main.db.session.add(new_program_template)
+    for day_id in range(1, days_per_week + 1):
+        new_workout_template = main.WorkoutTemplate(
+            name=f"Workout {day_id}",
+            parent_program_template=new_program_template,
+            days=[main.Day.query.get(day_id)]
+        )
+        main.db.session.add(new_workout_template)
+        for num in range(exercises_per_workout):
+            main.db.session.add(main.ExerciseTemplate(
+                type_id=type_ids[exercises[(day_id + num) % len(exercises)]],
+                set_count=sets_per_exercise,
+                reps=reps,
+                parent_workout_template=new_workout_template
+            ))
+    main.db.session.commit()
+    return new_program_template
+
+
+def template_exercises(program_template):
+    return list(dict.fromkeys(
+        exercise_template.type
+        for workout_template in program_template.workout_templates
+        for exercise_template in workout_template.exercise_templates
+    ))
+
+
+def make_program(main, user, program_template, weeks, starting_date=None):
+    from datetime import date
+    exercises = template_exercises(program_template)
+    if main.app.config["LAZY_PROGRAMS"]:
+        program_id = main.insert_lazy_program(
+            plan=main.brain.make_plan(program_template),
+            name="Benchmark",
+            user_id=user.id,
+            starting_date=starting_date or date(2021, 1, 4),
+            weeks=weeks,
+            starting_weights={exercise: 100 for exercise in exercises},
+            increments={exercise: 5 for exercise in exercises}
+        )
+        main.db.session.commit()
+        return main.Program.query.get(program_id)
+    dummy_program = main.brain.make_dummy_program(
+        program_template=program_template,
+        starting_date=starting_date or date(2021, 1, 4),
+        weeks=weeks,
+        starting_weights={exercise: 100 for exercise in exercises},
+        increments={exercise: 5 for exercise in exercises}
+    )
+    program_id = main.insert_program(dummy_program, "Benchmark", user.id)
+    main.db.session.commit()
+    return main.Program.query.get(program_id)
+
+
+def logged_in_client(main, user):
+    client = main.app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user.id)
+        session["_fresh"] = True
+    return client
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.executions = []  # (statement, parameters, executemany)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.executions.append((statement, parameters, executemany))
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        from sqlalchemy import event
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
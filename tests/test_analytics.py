@@ -0,0 +1,32 @@
+"""Stored analytics summaries stay equal to computing them afresh after the writes that refresh them."""
+import pytest
+
+from factories import make_user, make_program_template, make_program, logged_in_client
+
+
+def stored_and_computed(main, program_id):
+    program = main.Program.query.get(program_id)
+    assert program.analytics_version == program.version
+    stored = sorted(main.program_summary_rows(program))
+    computed = sorted(main.compute_summary_rows(program))
+    main.db.session.remove()
+    return stored, computed
+
+
+@pytest.mark.parametrize("weeks, deleted_week", [(1, 1), (4, 2), (4, 4)])
+def test_deleting_a_week_renumbers_stored_rows(main, analytics_summary, weeks, deleted_week):
+    # One workout a week, so deleting it empties its week and every later week moves up one. Programs are generated
+    # with at least two weeks, so a one-week program has a week 2 past its week count.
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    program_id = make_program(main, user, make_program_template(main, user, 1, 2, 3), weeks).id
+    workout = main.Workout.query.filter_by(program_id=program_id, week=deleted_week).one()
+    workout_id = workout.id
+    last_week = main.db.session.query(main.func.max(main.Workout.week)).filter_by(program_id=program_id).scalar()
+    main.db.session.remove()
+    assert client.get(f"/api/programs/{program_id}/analytics/tonnage").status_code == 200
+
+    assert client.get(f"/week/{deleted_week}/workouts/{workout_id}/delete").status_code == 302
+    stored, computed = stored_and_computed(main, program_id)
+    assert stored == computed
+    assert max(row.week for row in stored) == last_week - 1
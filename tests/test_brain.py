@@ -0,0 +1,270 @@
+"""Brain.expand_plan against the original day-by-day generator, on randomly generated templates."""
+import random
+from collections import namedtuple
+from datetime import date, timedelta
+
+import pytest
+
+from brain import Brain
+from exercises import exercises
+
+# Stand-ins for the template models, with the attributes both generators read
+ProgramTemplate = namedtuple("ProgramTemplate", ["id", "version", "workout_templates"])
+WorkoutTemplate = namedtuple("WorkoutTemplate", ["name", "days", "exercise_templates", "schedule_week"])
+Day = namedtuple("Day", ["id"])
+ExerciseTemplate = namedtuple("ExerciseTemplate", ["type", "set_count", "reps", "set_templates"])
+SetTemplate = namedtuple("SetTemplate", ["reps"])
+
+# A Monday; the tests start programs on each day of its week
+MONDAY = date(2021, 1, 4)
+
+
+# REFERENCE: THE ORIGINAL GENERATOR, WHICH STEPS THROUGH THE PROGRAM ONE DAY AT A TIME
+
+class ReferenceProgram:
+    def __init__(self, starting_date, weeks, starting_weights, increments):
+        self.starting_date = starting_date
+        self.weeks = weeks
+        self.starting_weights = starting_weights
+        self.increments = increments
+        self.workouts = []
+
+
+class ReferenceWorkout:
+    def __init__(self, name, week, date, parent_program):
+        self.name = name
+        self.week = week
+        self.date = date
+        self.parent_program = parent_program
+        self.exercises = []
+
+
+class ReferenceExercise:
+    def __init__(self, exercise_type):
+        self.type = exercise_type
+        self.sets = []
+
+
+class ReferenceSet:
+    def __init__(self, weight, reps, order):
+        self.weight = weight
+        self.reps = reps
+        self.order = order
+
+
+def reference_program(program_template, starting_date, weeks, starting_weights, increments):
+    new_program = ReferenceProgram(
+        starting_date=starting_date,
+        weeks=weeks,
+        starting_weights=dict(starting_weights),
+        increments=increments
+    )
+
+    week = 1
+    first_pass = True
+    while week <= new_program.weeks:
+        while week == 1:
+            if first_pass:
+
+                # Find first and last days of current week
+                first_day_of_the_week = new_program.starting_date
+                last_day_of_the_week = first_day_of_the_week
+                while last_day_of_the_week.weekday() != 6:
+                    last_day_of_the_week += timedelta(1)
+
+            workout_date = first_day_of_the_week
+            while workout_date <= last_day_of_the_week:
+                for workout_template in program_template.workout_templates:
+                    for day in workout_template.days:
+                        if day.id - 1 == workout_date.weekday():
+                            new_workout = reference_workout(workout_template, new_program, week, workout_date)
+                            reference_update_weights(new_workout)
+                            break
+                workout_date += timedelta(1)
+
+            # Check if any dummy workouts were created
+            if new_program.workouts:
+                week += 1
+            else:
+                first_day_of_the_week = last_day_of_the_week + timedelta(1)
+                last_day_of_the_week = first_day_of_the_week + timedelta(6)
+                first_pass = False
+
+        first_day_of_the_week = last_day_of_the_week + timedelta(1)
+        last_day_of_the_week = first_day_of_the_week + timedelta(6)
+
+        workout_date = first_day_of_the_week
+        while workout_date <= last_day_of_the_week:
+            for workout_template in program_template.workout_templates:
+                for day in workout_template.days:
+                    if day.id - 1 == workout_date.weekday():
+                        new_workout = reference_workout(workout_template, new_program, week, workout_date)
+                        reference_update_weights(new_workout)
+                        break
+            workout_date += timedelta(1)
+        week += 1
+    return new_program
+
+
+def reference_workout(workout_template, program, week, date):
+    new_workout = ReferenceWorkout(name=workout_template.name, week=week, date=date, parent_program=program)
+    program.workouts.append(new_workout)
+    for exercise_template in workout_template.exercise_templates:
+        new_exercise = ReferenceExercise(exercise_type=exercise_template.type)
+        new_workout.exercises.append(new_exercise)
+        set_order = 1
+        for set_template in exercise_template.set_templates:
+            new_exercise.sets.append(ReferenceSet(
+                weight=program.starting_weights[new_exercise.type],
+                reps=set_template.reps,
+                order=set_order
+            ))
+            set_order += 1
+    return new_workout
+
+
+def reference_update_weights(workout):
+    for exercise in workout.exercises:
+        workout.parent_program.starting_weights[exercise.type] += workout.parent_program.increments[exercise.type]
+
+
+def reference_rows(program):
+    # In the shape of DummyProgram.rows()
+    return [
+        (workout.date, workout.week, workout.name, exercise.type, set.order, set.reps, set.weight)
+        for workout in program.workouts
+        for exercise in workout.exercises
+        for set in exercise.sets
+    ]
+
+
+# RANDOM TEMPLATES
+
+def random_template(rng, template_id):
+    workout_templates = []
+    for number in range(rng.randint(1, 5)):
+        exercise_templates = []
+        for _ in range(rng.randint(0, 4)):
+            set_count = rng.randint(0, 5)
+            reps = rng.randint(1, 12)
+            exercise_templates.append(ExerciseTemplate(
+                type=rng.choice(exercises),
+                set_count=set_count,
+                reps=reps,
+                set_templates=[SetTemplate(reps)] * set_count
+            ))
+        workout_templates.append(WorkoutTemplate(
+            name=f"Workout {number + 1}",
+            # Any weekdays, possibly none, as long as one of the template's workouts is on some day
+            days=[Day(day_id) for day_id in sorted(rng.sample(range(1, 8), rng.randint(number == 0, 7)))],
+            exercise_templates=exercise_templates,
+            schedule_week=0
+        ))
+    return ProgramTemplate(id=template_id, version=0, workout_templates=workout_templates)
+
+
+def template_weights(rng, program_template):
+    types = {
+        exercise_template.type
+        for workout_template in program_template.workout_templates
+        for exercise_template in workout_template.exercise_templates
+    }
+    return {exercise_type: rng.randint(0, 300) for exercise_type in types}, {exercise_type: rng.randint(0, 10) for exercise_type in types}
+
+
+def generated_rows(program_template, starting_date, weeks, starting_weights, increments):
+    brain = Brain()
+    return list(brain.expand_plan(brain.make_plan(program_template), starting_date, weeks, starting_weights, increments).rows())
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_reference_generator(seed):
+    rng = random.Random(seed)
+    program_template = random_template(rng, seed)
+    starting_weights, increments = template_weights(rng, program_template)
+    weeks = rng.randint(1, 8)
+    for weekday in range(7):
+        starting_date = MONDAY + timedelta(weekday)
+        expected = reference_rows(reference_program(program_template, starting_date, weeks, starting_weights, increments))
+        assert generated_rows(program_template, starting_date, weeks, starting_weights, increments) == expected, (
+            f"start {starting_date:%a}, {weeks} weeks, {program_template}"
+        )
+
+
+@pytest.mark.parametrize("weeks", [1, 2, 5])
+def test_empty_first_week(weeks):
+    # Workouts on Monday and Wednesday only: starting on the Thursday leaves the rest of that week empty, so week 1 is
+    # the whole next week
+    program_template = ProgramTemplate(id=1, version=0, workout_templates=[
+        WorkoutTemplate("A", [Day(1)], [ExerciseTemplate("Squat", 3, 5, [SetTemplate(5)] * 3)], 0),
+        WorkoutTemplate("B", [Day(3)], [ExerciseTemplate("Bench Press", 2, 8, [SetTemplate(8)] * 2)], 0),
+    ])
+    starting_date = MONDAY + timedelta(3)
+    starting_weights, increments = {"Squat": 100, "Bench Press": 60}, {"Squat": 5, "Bench Press": 2}
+    rows = generated_rows(program_template, starting_date, weeks, starting_weights, increments)
+    assert rows == reference_rows(reference_program(program_template, starting_date, weeks, starting_weights, increments))
+    assert rows[0][:3] == (MONDAY + timedelta(7), 1, "A")
+
+
+def test_no_weeks():
+    program_template = random_template(random.Random(0), 0)
+    starting_weights, increments = template_weights(random.Random(0), program_template)
+    assert generated_rows(program_template, MONDAY, 0, starting_weights, increments) == []
+
+
+@pytest.mark.parametrize("weekday", range(7))
+def test_schedule_starts_at_first_week_with_workouts(weekday):
+    # A 3-week schedule with nothing on its first week: programs start on its second week, then rotate through the
+    # third and the empty first
+    squat = (("Squat", (5, 5)),)
+    plan = [[] for _ in range(7)]
+    plan[0] = [("A", squat, 2)]
+    plan[4] = [("B", squat, 3)]
+    rows = list(Brain().expand_plan(plan, MONDAY + timedelta(weekday), 6, {"Squat": 100}, {"Squat": 5}).rows())
+    workouts = sorted({(week, name) for workout_date, week, name, *set_values in rows})
+    if weekday == 0:
+        assert workouts == [(1, "A"), (2, "B"), (4, "A"), (5, "B")]
+    else:
+        # The rest of the starting week has none of schedule week 2's workouts, so week 1 is the next whole week
+        assert workouts[0] == (1, "A")
+        assert rows[0][0] == MONDAY + timedelta(7)
+
+
+def random_plan(rng):
+    # Workouts on any weekdays of a schedule of up to four weeks, some of them possibly empty
+    plan = [[] for _ in range(7)]
+    for number in range(rng.randint(1, 5)):
+        exercises_and_reps = tuple((rng.choice(exercises), (5,) * rng.randint(0, 5)) for _ in range(rng.randint(0, 4)))
+        for weekday in rng.sample(range(7), rng.randint(1, 7)):
+            plan[weekday].append((f"Workout {number + 1}", exercises_and_reps, rng.randint(0, 4)))
+    return plan
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_count_sessions_matches_schedule(seed):
+    rng = random.Random(seed)
+    plan = random_plan(rng)
+    starting_date = MONDAY + timedelta(rng.randint(0, 6))
+    weeks = rng.randint(1, 30)
+    skip_weeks = frozenset(rng.sample(range(1, weeks + 1), rng.randint(0, weeks)))
+    today = starting_date + timedelta(rng.randint(-10, 7 * weeks + 10))
+    brain = Brain()
+
+    sessions = [
+        (week, workout_date, workout) for week, workout_date, workout, done, deload in brain.make_schedule(plan, starting_date, weeks)
+        if week <= weeks and week not in skip_weeks
+    ]
+    expected = (
+        len(sessions),
+        sum(len(reps_per_set) for week, workout_date, workout in sessions for exercise_type, reps_per_set in workout[1]),
+        min((workout_date for week, workout_date, workout in sessions if workout_date >= today), default=None)
+    )
+    assert brain.count_sessions(plan, starting_date, weeks, skip_weeks, today) == expected
+
+
+def test_weights_past_32_bits():
+    # Weights grow by their increment every session, without bound
+    squat = (("Squat", (5,)),)
+    plan = [[("A", squat, 0)] for _ in range(7)]
+    program = Brain().expand_plan(plan, MONDAY, 2, {"Squat": 3_000_000_000}, {"Squat": 100_000})
+    assert [weight for *columns, weight in program.rows()] == [3_000_000_000 + 100_000 * n for n in range(14)]
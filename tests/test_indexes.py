@@ -0,0 +1,167 @@
+"""The app's queries go through indexes: every statement a round of requests issues is explained, and none may read a
+whole table.
+
+A migrated database is seeded, then the dashboard, the program, workout and template pages, exports, the JSON API,
+analytics (with and without an exercise filter) and set logging, make_program and every delete route are requested, with
+one of the user's own exercise types in use. Their SELECT, INSERT ... SELECT, UPDATE and DELETE statements are recorded
+and explained.
+
+SQLite: EXPLAIN QUERY PLAN; full scans show up as "SCAN <table>" without an index.
+Postgres (TEST_DATABASE_URL): EXPLAIN (FORMAT JSON) with enable_seqscan off, so that the tiny seeded tables don't make
+sequential scans look cheaper; full scans show up as "Seq Scan" nodes.
+
+Deleting a row also looks up the rows whose foreign keys refer to it, which neither EXPLAIN shows, so every foreign key
+must lead an index or the primary key as well.
+"""
+import json
+import re
+
+import pytest
+from sqlalchemy import inspect
+
+from factories import make_user, make_program_template, make_program, template_exercises, logged_in_client, QueryCounter
+
+# Row sources that may be read in full, and why
+SMALL_TABLES = {
+    "days": "the seven days of the week, seeded by the first migration and never written to",
+    "alembic_version": "a single row, read by migrations only",
+    "updates": "not a table: the VALUES list of the sets being logged, which log_sets joins against",
+    "exercise_values": "not a table: compute_summary_rows' per-exercise rows, already limited to one program through an index",
+}
+
+# Foreign keys without an index of their own, and why
+UNINDEXED_FOREIGN_KEYS = {
+    ("workoutdays", "day_id"): "days are never deleted, and workout days are only looked up by workout",
+}
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def record_requests(main):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    program_template = make_program_template(main, user, 3, 3, 3)
+    # One of the user's own exercise types, in the template that is deleted and in one left for the user delete
+    custom_type_id = main.exercise_catalog.add(user.id, "Sled Push")
+    program_template.workout_templates[0].exercise_templates[0].type_id = custom_type_id
+    make_program_template(main, user, 1, 1, 1).workout_templates[0].exercise_templates[0].type_id = custom_type_id
+    main.db.session.commit()
+    program_template_id = program_template.id
+    workout_template_id = program_template.workout_templates[0].id
+    exercise_template_id = program_template.workout_templates[0].exercise_templates[0].id
+    make_program_data = {"name": "Check", "weeks": 4, "starting_date": "2021-01-04"}
+    for count, exercise in enumerate(template_exercises(program_template)):
+        make_program_data[f"exercises-{count}-starting_weight"] = 100
+        make_program_data[f"exercises-{count}-increment"] = 5
+    program_id = make_program(main, user, program_template, 4).id
+    workout_ids = [workout_id for workout_id, in main.db.session.query(main.Workout.id).filter_by(program_id=program_id, week=2)]
+    main.db.session.remove()
+
+    log_sets_data = {"sets": [
+        {"exercise_id": exercise.id, "order": 1, "completed": True}
+        for exercise in main.Workout.query.get(workout_ids[0]).exercises
+    ]}
+    main.db.session.remove()
+
+    requests = [
+        ("GET", "/dashboard"),
+        ("GET", f"/programs/{program_id}/week/2"),
+        ("GET", f"/workouts/{workout_ids[0]}"),
+        ("GET", f"/program-templates/{program_template_id}"),
+        ("GET", f"/workout-templates/{workout_template_id}"),
+        ("GET", f"/programs/{program_id}/export.csv"),
+        ("GET", f"/api/programs/{program_id}/weeks/2"),
+        ("GET", f"/api/workouts/{workout_ids[0]}"),
+        ("GET", f"/api/program-templates/{program_template_id}"),
+        ("GET", f"/api/programs/{program_id}/analytics/progression"),
+        ("GET", f"/api/programs/{program_id}/analytics/tonnage"),
+        ("GET", f"/api/programs/{program_id}/analytics/progression?exercise=Sled%20Push"),
+        ("POST", f"/api/programs/{program_id}/weeks/2/materialize"),
+        ("PATCH", f"/api/workouts/{workout_ids[0]}/sets"),
+        ("POST", f"/program-templates/{program_template_id}/make_program"),
+        ("GET", f"/week/2/workouts/{workout_ids[0]}/delete"),
+        ("GET", f"/programs/{program_id}/delete"),
+        ("GET", f"/exercise-templates/{exercise_template_id}/delete"),
+        ("GET", f"/workout-templates/{workout_template_id}/delete"),
+        ("GET", f"/program-templates/{program_template_id}/delete"),
+        ("GET", "/user/delete"),
+    ]
+    executions = []
+    for method, url in requests:
+        with QueryCounter(main.db.engine) as counter:
+            if method == "PATCH":
+                response = client.patch(url, json=log_sets_data)
+            elif url.endswith("/materialize"):
+                response = client.post(url)
+            elif method == "POST":
+                response = client.post(url, data=make_program_data)
+            else:
+                response = client.get(url)
+                response.get_data()
+        assert response.status_code < 400, (url, response.status_code)
+        main.db.session.remove()
+        executions += [(url, statement, parameters) for statement, parameters, executemany in counter.executions
+                       if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"))
+                       and (not statement.lstrip().upper().startswith("INSERT") or " SELECT" in statement.upper())]
+    return executions
+
+
+def sqlite_full_scans(cursor, statement, parameters):
+    cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+    return [match.group(1) for match in (SQLITE_FULL_SCAN.match(row[-1]) for row in cursor.fetchall()) if match]
+
+
+def postgres_full_scans(cursor, statement, parameters):
+    cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    tables = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            tables.append(node["Relation Name"])
+        nodes += node.get("Plans", [])
+    return tables
+
+
+def test_queries_use_indexes(main, analytics_summary):
+    executions = record_requests(main)
+    connection = main.db.engine.raw_connection()
+    cursor = connection.cursor()
+    if main.db.engine.dialect.name == "postgresql":
+        cursor.execute("SET enable_seqscan = off")
+        full_scans = postgres_full_scans
+    else:
+        full_scans = sqlite_full_scans
+
+    failures = []
+    seen = set()
+    try:
+        for url, statement, parameters in executions:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            tables = [table for table in full_scans(cursor, statement, parameters) if table not in SMALL_TABLES]
+            if tables:
+                failures.append(f"FULL SCAN of {', '.join(tables)} in {url}:\n    {' '.join(statement.split())}")
+    finally:
+        connection.rollback()
+        connection.close()
+    assert not failures, f"{len(failures)} of {len(seen)} statements read a whole table:\n" + "\n".join(failures)
+
+
+def test_foreign_keys_are_indexed(main):
+    inspector = inspect(main.db.engine)
+    failures = []
+    for table in inspector.get_table_names():
+        leading_columns = [index["column_names"] for index in inspector.get_indexes(table)]
+        leading_columns.append(inspector.get_pk_constraint(table)["constrained_columns"])
+        for foreign_key in inspector.get_foreign_keys(table):
+            columns = foreign_key["constrained_columns"]
+            if (table, ", ".join(columns)) in UNINDEXED_FOREIGN_KEYS:
+                continue
+            if not any(index_columns[:len(columns)] == columns for index_columns in leading_columns):
+                failures.append(f"{table} ({', '.join(columns)}) -> {foreign_key['referred_table']}")
+    assert not failures, "Foreign keys without an index:\n" + "\n".join(failures)
@@ -0,0 +1,56 @@
+"""The make program form turns away values that programs can't be generated or stored with."""
+import pytest
+
+from factories import make_user, make_program_template, template_exercises, logged_in_client
+
+
+def make_program_data(program_template, weeks=4, starting_weight=100, increment=5, starting_date="2021-01-04"):
+    data = {"name": "Bounds", "weeks": weeks, "starting_date": starting_date}
+    for count, exercise in enumerate(template_exercises(program_template)):
+        data[f"exercises-{count}-starting_weight"] = starting_weight
+        data[f"exercises-{count}-increment"] = increment
+    return data
+
+
+@pytest.mark.parametrize("lazy_programs", [False, True], indirect=True, ids=["eager", "lazy"])
+@pytest.mark.parametrize("values", [
+    {"starting_weight": 3_000_000_000},
+    {"increment": 3_000_000_000},
+    {"starting_weight": -1},
+    {"weeks": 0},
+    {"weeks": 3_000_000_000},
+    {"weeks": 521},
+    {"weeks": 1, "starting_date": "9999-12-20"},
+], ids=lambda values: ", ".join(f"{name}={value}" for name, value in values.items()))
+def test_out_of_range_values_are_rejected(main, lazy_programs, values):
+    user = make_user(main)
+    user_id = user.id
+    client = logged_in_client(main, user)
+    program_template = make_program_template(main, user, 2, 2, 2)
+    url = f"/program-templates/{program_template.id}/make_program"
+    data = make_program_data(program_template, **values)
+    main.db.session.remove()
+    response = client.post(url, data=data)
+    # The form again, with its errors
+    assert response.status_code == 200
+    assert b'class="text-danger"' in response.data
+    assert main.Program.query.filter_by(user_id=user_id).count() == 0
+
+
+@pytest.mark.parametrize("lazy_programs", [False, True], indirect=True, ids=["eager", "lazy"])
+def test_longest_program_can_be_read(main, lazy_programs):
+    # As many weeks as the form allows, ending as late as it allows
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    program_template = make_program_template(main, user, 1, 1, 1)
+    url = f"/program-templates/{program_template.id}/make_program"
+    data = make_program_data(program_template, weeks=520, starting_date="9989-12-01")
+    main.db.session.remove()
+    response = client.post(url, data=data)
+    assert response.status_code == 302
+    program_id = int(response.location.split("/programs/")[1].split("/")[0])
+    for url in (f"/programs/{program_id}/week/520", f"/programs/{program_id}/export.csv",
+                f"/api/programs/{program_id}/analytics/tonnage"):
+        response = client.get(url)
+        response.get_data()
+        assert response.status_code == 200, url
@@ -0,0 +1,49 @@
+"""The SQL statements each page issues stay within a fixed bound however big the program is, for eager and lazy programs."""
+import pytest
+
+from factories import make_user, make_program_template, make_program, logged_in_client, QueryCounter
+
+SIZES = [
+    # weeks, days per week, exercises per workout, sets per exercise
+    (2, 2, 2, 2),
+    (12, 4, 5, 5),
+    (52, 6, 6, 5),
+]
+
+# Includes the statement Flask-Login issues to load the user
+QUERY_BOUNDS = {
+    "show_program": 5,
+    "show_program_generated": 2,
+    "show_workout": 4,
+    "show_program_template": 3,
+}
+
+
+def page_urls(main, user, lazy, weeks, days, exercises_per_workout, sets):
+    program_template = make_program_template(main, user, days, exercises_per_workout, sets)
+    program = make_program(main, user, program_template, weeks)
+    urls = {"show_program_template": f"/program-templates/{program_template.id}"}
+    if lazy:
+        # Week 2 is saved, as if it had been edited; week 1 is still generated
+        main.materialize_week(program, 2)
+        main.db.session.commit()
+        urls["show_program_generated"] = f"/programs/{program.id}/week/1"
+    workout = main.Workout.query.filter_by(program_id=program.id, week=2).first()
+    urls["show_program"] = f"/programs/{program.id}/week/2"
+    urls["show_workout"] = f"/workouts/{workout.id}"
+    main.db.session.remove()
+    return urls
+
+
+@pytest.mark.parametrize("lazy_programs", [False, True], indirect=True, ids=["eager", "lazy"])
+@pytest.mark.parametrize("size", SIZES, ids=["x".join(map(str, size)) for size in SIZES])
+def test_query_bounds(main, lazy_programs, size):
+    user = make_user(main)
+    client = logged_in_client(main, user)
+    for page, url in page_urls(main, user, lazy_programs, *size).items():
+        with QueryCounter(main.db.engine) as counter:
+            response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        assert counter.count <= QUERY_BOUNDS[page], (
+            f"{page} issued {counter.count} queries for a {size[0]}-week program:\n  " + "\n  ".join(counter.statements)
+        )